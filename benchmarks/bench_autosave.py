@@ -0,0 +1,137 @@
+# benchmarks/bench_autosave.py
+# Draft autosave: input latency, diff size, and crash recovery
+#
+#   python benchmarks/bench_autosave.py                 -> 15-line invoice
+#   python benchmarks/bench_autosave.py --rows 60 --lock-ms 800
+#
+# Types an invoice into an offscreen InvoiceForm one keystroke at a time
+# (setText per character, so every textChanged / itemChanged handler runs)
+# with autosave off and then on, and reports the GUI-thread cost per
+# keystroke and per autosave tick. While typing, another connection holds
+# the database write lock for --lock-ms now and then, so writes stall the
+# way they would behind a busy desk. Then a second form, as after a crash,
+# restores the draft and must end up with the same state.
+# Exits 1 if the restored form differs or a draft write failed.
+
+import sqlite3
+import statistics
+import threading
+import time
+
+import harness
+import database
+
+ROW_TEXT = [("Ocean Freight", "1250.00", "1"), ("THC", "8500", "2"), ("Documentation", "1500", "1")]
+
+
+def hold_lock(db_path, ms, stop):
+    while not stop.is_set():
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        time.sleep(ms / 1000)
+        conn.execute("COMMIT")
+        conn.close()
+        stop.wait(0.5)
+
+
+def type_into(app, form, rows, tick_every):
+    """Type header fields and rows; returns per-keystroke ms and per-tick ms."""
+    keys, ticks = [], []
+    n = 0
+
+    def key(widget_set, text):
+        nonlocal n
+        for i in range(1, len(text) + 1):
+            t0 = time.perf_counter()
+            widget_set(text[:i])
+            keys.append((time.perf_counter() - t0) * 1000)
+            n += 1
+            if n % tick_every == 0:
+                t0 = time.perf_counter()
+                form.autosave.save()
+                ticks.append((time.perf_counter() - t0) * 1000)
+                app.processEvents()
+
+    key(form.teBillTo.setPlainText, "Apex Logistics 12, Industrial Estate, Mumbai")
+    for k in ("vessel_flight", "mbl_no", "gross_weight", "volume_cbm", "ref_no"):
+        w = form.ship_fields.get(k) or form.cons_fields.get(k)
+        if w is not None:
+            key(w.setText, f"{k.upper()}-12345")
+
+    for i in range(rows):
+        form.add_row()
+        r = form.table.rowCount() - 1
+        desc, rate, qty = ROW_TEXT[i % len(ROW_TEXT)]
+        form.set_row_description(r, f"{desc} {i}")
+        key(form.table.item(r, 4).setText, rate)
+        key(form.table.item(r, 5).setText, qty)
+        key(form.table.item(r, 8).setText, "9")
+        key(form.table.item(r, 10).setText, "9")
+    form.autosave.save()
+    return keys, ticks
+
+
+def summary(ms):
+    return (f"median {statistics.median(ms):.3f} ms, p99 {harness.percentile(ms, 0.99):.3f} ms, "
+            f"max {max(ms):.3f} ms")
+
+
+def main():
+    p = harness.parser("Draft autosave benchmark")
+    p.add_argument("--rows", type=int, default=15)
+    p.add_argument("--tick-every", type=int, default=8, help="keystrokes per autosave tick")
+    p.add_argument("--lock-ms", type=float, default=300)
+    args = p.parse_args()
+
+    app = harness.qt_app()
+
+    with harness.generated_db("drafts.db", empty=True):
+        from invoice_form import InvoiceForm
+
+        form = InvoiceForm()
+        form.preview.setVisible(False)
+        form.autosave.enabled = False
+        keys_off, _ = type_into(app, form, args.rows, 10**9)
+        form.autosave.mark_clean()
+        form.close()
+
+        form = InvoiceForm()
+        form.preview.setVisible(False)
+        stop = threading.Event()
+        locker = threading.Thread(target=hold_lock, args=(database.DB_PATH, args.lock_ms, stop))
+        locker.start()
+        try:
+            keys_on, ticks = type_into(app, form, args.rows, args.tick_every)
+        finally:
+            form.autosave.flush(timeout_ms=30000)
+            stop.set()
+            locker.join()
+        app.processEvents()
+        st = form.autosave.stats
+        before = form.draft_snapshot()
+        n_fields, n_rows = len(before["fields"]), len(before["rows"])
+
+        # "Crash": a fresh form on the same database restores the draft
+        recovered = InvoiceForm()
+        recovered.preview.setVisible(False)
+        draft = recovered.autosave.load()
+        t0 = time.perf_counter()
+        recovered.restore_draft(draft)
+        restore_ms = (time.perf_counter() - t0) * 1000
+        after = recovered.draft_snapshot()
+        same = before["fields"] == after["fields"] and before["rows"] == after["rows"]
+
+    print(f"keystroke, autosave off: {summary(keys_off)} ({len(keys_off)} keys)")
+    print(f"keystroke, autosave on:  {summary(keys_on)}")
+    print(f"autosave tick (GUI):     {summary(ticks)} ({len(ticks)} ticks)")
+    print(f"draft writes:            {st['writes']} (worker max {st['write_ms']:.0f} ms "
+          f"behind {args.lock_ms:.0f} ms locks), {st['failures']} failures")
+    print(f"written per tick:        {st['fields'] / max(1, st['ticks']):.1f} fields, "
+          f"{st['rows'] / max(1, st['ticks']):.1f} rows (form has {n_fields} fields, {n_rows} rows)")
+    print(f"recovery:                {len(draft['rows'])} rows restored in {restore_ms:.0f} ms, "
+          f"state {'identical' if same else 'DIFFERS'}")
+    return 0 if same and not st["failures"] else 1
+
+
+if __name__ == "__main__":
+    harness.run(main)
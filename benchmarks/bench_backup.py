@@ -0,0 +1,88 @@
+# benchmarks/bench_backup.py
+# Save latency while an online backup of a large database runs
+#
+#   python benchmarks/bench_backup.py                    -> scale 0.2, WAL
+#   python benchmarks/bench_backup.py --journal DELETE
+#
+# A writer thread saves an invoice every --interval seconds, first with no
+# backup running (baseline), then while backup_now() copies the database.
+# The snapshot is then verified and restored into a scratch file.
+# Exits 1 if a save fails, save p95 during the backup exceeds
+# --max-p95-ms, or the snapshot does not verify.
+
+import os
+import threading
+import time
+
+import harness
+import database
+from backup import backup_now, list_backups, restore_backup, verify_backup
+
+
+def saves_until(stop, interval, out, errors, tag):
+    i = 0
+    while not stop.is_set():
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            database.insert_invoice({
+                "invoice_number": f"SAN/INV/BKP/{tag}/{i}", "date": "2025-03-31",
+                "type": "INVOICE", "total_amount": 1180.0,
+            }, harness.sample_items())
+        except Exception as e:
+            errors.append(str(e))
+        out.append((time.perf_counter() - t0) * 1000)
+        time.sleep(interval)
+
+
+def main():
+    p = harness.parser("Write latency during online backup", scale=0.2, journal="WAL")
+    p.add_argument("--interval", type=float, default=0.01)
+    p.add_argument("--baseline-seconds", type=float, default=3.0)
+    p.add_argument("--max-p95-ms", type=float, default=100.0)
+    args = p.parse_args()
+
+    with harness.generated_db("big.db", scale=args.scale, journal=args.journal) as db:
+        tmp = db.tmp
+        print(f"database:  {os.path.getsize(db.path) / 2**20:.0f} MB, journal {args.journal.upper()}")
+
+        errors = []
+
+        base = []
+        stop = threading.Event()
+        t = threading.Thread(target=saves_until, args=(stop, args.interval, base, errors, "A"))
+        t.start()
+        time.sleep(args.baseline_seconds)
+        stop.set()
+        t.join()
+
+        during = []
+        stop = threading.Event()
+        t = threading.Thread(target=saves_until, args=(stop, args.interval, during, errors, "B"))
+        t.start()
+        try:
+            manifest = backup_now(os.path.join(tmp, "backups"))
+        finally:
+            stop.set()
+            t.join()
+
+        res = verify_backup(list_backups(os.path.join(tmp, "backups"))[0][0])
+        restored = os.path.join(tmp, "restored.db")
+        restore_backup(os.path.join(tmp, "backups", manifest["file"]), restored)
+
+    p95 = harness.percentile(during, 0.95)
+    print(f"backup:    {manifest['seconds']:.2f} s ({manifest['steps']} steps, "
+          f"{manifest['restarts']} restarts), {manifest['db_size'] / 2**20:.0f} MB -> "
+          f"{manifest['gz_size'] / 2**20:.1f} MB gz")
+    print(f"baseline:  {harness.latency(base)}")
+    print(f"during:    {harness.latency(during)}")
+    print(f"verify:    {'ok' if res['ok'] else '; '.join(res['problems'])}, "
+          f"{res['rows'].get('invoices')} invoices; restore ok")
+    if errors:
+        print(f"errors:    {len(errors)}, first: {errors[0]}")
+
+    return 1 if errors or not res["ok"] or p95 > args.max_p95_ms else 0
+
+
+if __name__ == "__main__":
+    harness.run(main)
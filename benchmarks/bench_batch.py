@@ -0,0 +1,115 @@
+# benchmarks/bench_batch.py
+# Month-end batch invoicing: one invoice per open job
+#
+#   python benchmarks/bench_batch.py                 -> scale 0.05 (~1,000 open jobs)
+#   python benchmarks/bench_batch.py --scale 0.2 --pdf
+#
+# On a generated database, bills every open job from the customer's usual
+# charges (charge_usage) two ways, each on its own copy of the file:
+#   per job     what saving each invoice through the form costs: get_job,
+#               the customer's addresses / GSTIN / suggestions, compute,
+#               get_next_invoice_number() and insert_invoice(), each write
+#               its own transaction
+#   batch       batch_invoicing.run_batch(): all reads up front, saves
+#               GROUP_SIZE invoices per transaction (plus a dry run first)
+# Checks both saved the same invoices (per-job totals) under a gapless run
+# of numbers. Exits 1 on mismatch.
+
+import os
+
+import harness
+import batch_invoicing
+import database
+from fx_rates import convert_items, rate_book
+from gst_rules import compute_invoice, rate_table
+from settings_manager import get_next_invoice_number
+
+DATE = "2025-06-30"
+
+
+def per_job():
+    charges = {c["charge_name"].strip().lower(): c for c in database.list_charges()}
+    table, book = rate_table(), rate_book()
+    saved = 0
+    for j in database.iter_jobs(status="OPEN", row="dict"):
+        job = database.get_job(j["id"])
+        cid = job["customer_id"]
+        items = batch_invoicing.template_items(database.get_charge_suggestions(cid), charges)
+        if not items:
+            continue
+        if convert_items(items, DATE, book, job.get("exchange_rate")):
+            continue
+        addresses = database.get_addresses_for_consignee(cid)
+        header = batch_invoicing.job_header(
+            job, addresses[0] if addresses else None, database.get_consignee(cid)["gstin"], DATE)
+        header["total_amount"] = compute_invoice(items, header["supply_type"], DATE, table)["total"]
+        header["invoice_number"] = get_next_invoice_number()
+        database.insert_invoice(header, items)
+        saved += 1
+    return saved
+
+
+def billed(since_id):
+    conn = database.get_conn()
+    rows = conn.execute(
+        "SELECT job_id, invoice_number, total_amount FROM invoices WHERE id > ? ORDER BY id",
+        (since_id,)).fetchall()
+    conn.close()
+    return [tuple(r) for r in rows]
+
+
+def _max_id():
+    conn = database.get_conn()
+    n = conn.execute("SELECT COALESCE(MAX(id), 0) FROM invoices").fetchone()[0]
+    conn.close()
+    return n
+
+
+def _gapless(numbers):
+    seq = [int(n.rsplit("/", 1)[1]) for n in numbers]
+    return seq == list(range(seq[0], seq[0] + len(seq))) if seq else True
+
+
+def main():
+    p = harness.parser("Batch invoicing benchmark", scale=0.05)
+    p.add_argument("--pdf", action="store_true", help="also queue a PDF per invoice")
+    args = p.parse_args()
+
+    with harness.generated_db("batch_a.db", scale=args.scale) as db:
+        src = db.path
+        dst = harness.copy_db(src, os.path.join(db.tmp, "batch_b.db"))
+
+        start = _max_id()
+        naive_s, n_naive = harness.timed(per_job)
+        naive = billed(start)
+
+        database.DB_PATH = dst
+        database.init_db()
+        start = _max_id()
+        dry = batch_invoicing.run_batch(DATE, rebill=True, dry_run=True)
+        if args.pdf:
+            import pdf_generator
+            pdf_generator.OUT_DIR = os.path.join(db.tmp, "pdf")
+            os.makedirs(pdf_generator.OUT_DIR, exist_ok=True)
+        report = batch_invoicing.run_batch(DATE, rebill=True, pdf=args.pdf)
+        batch = billed(start)
+
+    by_job = {job_id: total for job_id, _, total in naive}
+    bad = sum(1 for job_id, _, total in batch if abs(by_job.get(job_id, -1) - total) > 1e-6)
+    bad += abs(len(batch) - len(naive))
+    bad += not _gapless([n for _, n, _ in batch])
+    bad += dry["numbers"] != [n for _, n, _ in batch]
+
+    print(f"{len(batch)} invoices, {report['lines']} lines, {len(report['skipped'])} jobs skipped")
+    print(f"per job:   {harness.throughput(naive_s, n_naive, 'docs')}")
+    print(f"dry run:   {harness.throughput(dry['seconds'], dry['built'], 'docs')}")
+    print(f"batch:     {harness.throughput(report['seconds'], report['saved'], 'docs')}; "
+          f"build {report['build_s']:.2f} s, save {report['save_s']:.2f} s")
+    if report["pdf"]:
+        p = report["pdf"]
+        print(f"pdf:       {p['rendered']} rendered in {p['seconds']:.2f} s, {len(p['errors'])} errors")
+    return harness.check(bad, "mismatches (totals, count, gapless numbers, dry-run numbers)")
+
+
+if __name__ == "__main__":
+    harness.run(main)
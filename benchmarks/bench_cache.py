@@ -0,0 +1,115 @@
+# benchmarks/bench_cache.py
+# Read cache: page-build / job-pick workload, and staleness under writes
+#
+#   python benchmarks/bench_cache.py                 -> scale 0.05
+#   python benchmarks/bench_cache.py --scale 0.2
+#
+# Workload (what the invoice pages do): build the dropdowns (customers,
+# open jobs, charges), then for --picks jobs call get_job twice (apply_job,
+# save_document) and load the customer's addresses. Run --rounds times
+# with SANSHIP_READ_CACHE off and on; reports time and SQL statements run.
+#
+# Staleness: a second connection (standing in for another desk) updates
+# jobs, addresses and charges between cached reads, while this process
+# saves drafts and closes jobs. Every read is compared with the table.
+# Exits 1 on any stale read.
+
+import random
+import sqlite3
+
+import harness
+import database
+
+
+def workload(rnd, job_ids, picks):
+    database.list_customers()
+    database.list_open_jobs_for_dropdown()
+    database.list_charges()
+    for job_id in rnd.sample(job_ids, picks):
+        job = database.get_job(job_id)          # apply_job
+        database.get_addresses_for_customer(job["customer_id"])
+        database.get_job(job_id)                # save_document
+
+
+def run(cache, rounds, job_ids, picks):
+    database.READ_CACHE = cache
+    database.clear_cache()
+    database.reset_cache_stats()
+    database.reset_query_stats()
+    database.enable_query_trace()
+    rnd = random.Random(1)
+    seconds, _ = harness.timed(lambda: [workload(rnd, job_ids, picks) for _ in range(rounds)])
+    database.disable_query_trace()
+    statements = sum(q["calls"] for q in database.query_stats())
+    return seconds, statements
+
+
+def staleness(rnd, n, job_ids):
+    other = sqlite3.connect(database.DB_PATH)
+    other.row_factory = sqlite3.Row
+    stale = 0
+    hot = job_ids[:20]
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            jid = rnd.choice(hot)
+            other.execute("UPDATE jobs SET vessel_flight=? WHERE id=?", (f"MV EXT {i}", jid))
+            other.commit()
+            stale += database.get_job(jid)["vessel_flight"] != f"MV EXT {i}"
+        elif kind == 1:
+            other.execute("UPDATE charges_master SET cgst_rate=? WHERE id=1", (i % 18,))
+            other.commit()
+            stale += database.get_charge(1)["cgst_rate"] != i % 18
+        elif kind == 2:
+            cid = database.get_job(rnd.choice(hot))["customer_id"]
+            other.execute("UPDATE consignee_addresses SET pincode=? WHERE consignee_id=?", (str(400000 + i), cid))
+            other.commit()
+            stale += any(a["pincode"] != str(400000 + i) for a in database.get_addresses_for_customer(cid))
+        else:
+            jid = rnd.choice(hot)
+            database.close_job(jid)
+            stale += database.get_job(jid)["status"] != "CLOSED"
+            other.execute("UPDATE jobs SET status='OPEN' WHERE id=?", (jid,))
+            other.commit()
+            stale += database.get_job(jid)["status"] != "OPEN"
+        # Unrelated commits (autosave) must not flush the cache
+        database.save_draft_changes("bench", "INVOICE", {"tick": str(i)}, {}, 0)
+        for jid in hot:
+            row = other.execute("SELECT * FROM jobs WHERE id=?", (jid,)).fetchone()
+            stale += database.get_job(jid) != dict(row)
+    other.close()
+    return stale
+
+
+def main():
+    p = harness.parser("Read cache benchmark", scale=0.05)
+    p.add_argument("--rounds", type=int, default=5)
+    p.add_argument("--picks", type=int, default=50)
+    p.add_argument("--writes", type=int, default=400)
+    args = p.parse_args()
+
+    with harness.generated_db("cache.db", scale=args.scale):
+        conn = database.get_conn()
+        job_ids = [r[0] for r in conn.execute("SELECT id FROM jobs WHERE status='OPEN'")]
+        conn.close()
+
+        off_s, off_q = run(False, args.rounds, job_ids, args.picks)
+        on_s, on_q = run(True, args.rounds, job_ids, args.picks)
+        st = database.cache_stats()
+        hits = sum(v["hits"] for k, v in st.items() if k != "entries")
+        misses = sum(v["misses"] for k, v in st.items() if k != "entries")
+        print(f"cache off: {off_s * 1000:8.1f} ms, {off_q} statements")
+        print(f"cache on:  {on_s * 1000:8.1f} ms, {on_q} statements "
+              f"({hits} hits / {misses} misses, {st['entries']} entries)")
+
+        database.reset_cache_stats()
+        stale = staleness(random.Random(2), args.writes, job_ids)
+        st = database.cache_stats()
+        print(f"writes:    {args.writes} external/local; "
+              f"jobs {st['jobs']['hits']} hits, {st['jobs']['external_invalidations']} external "
+              f"+ {st['jobs']['local_invalidations']} local invalidations")
+    return harness.check(stale, "stale reads")
+
+
+if __name__ == "__main__":
+    harness.run(main)
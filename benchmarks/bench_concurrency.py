@@ -0,0 +1,104 @@
+# benchmarks/bench_concurrency.py
+# Long report reads vs. a stream of saves, running at the same time
+#
+#   python benchmarks/bench_concurrency.py                  -> WAL + read_snapshot (default)
+#   python benchmarks/bench_concurrency.py --journal DELETE -> old rollback-journal behaviour
+#
+# Exits 1 if a save fails, a save waits longer than --max-write-ms, or the
+# reader's snapshot changes while it is open.
+
+import os
+import threading
+import time
+
+import harness
+import database
+
+
+def reader(duration, result):
+    """A slow report: walks invoice_items in small chunks inside one snapshot."""
+    t0 = time.perf_counter()
+    rows = 0
+    with database.read_snapshot() as snap:
+        before = snap.execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+        cur = snap.execute("SELECT * FROM invoice_items ORDER BY id")
+        while time.perf_counter() - t0 < duration:
+            chunk = cur.fetchmany(500)
+            if not chunk:
+                cur = snap.execute("SELECT * FROM invoice_items ORDER BY id")
+                continue
+            rows += len(chunk)
+            time.sleep(0.005)
+        after = snap.execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+    result.update(
+        seconds=time.perf_counter() - t0, rows=rows,
+        stable=(before == after), before=before, after=after,
+    )
+
+
+def writer(stop, result, interval):
+    latencies, errors = [], []
+    i = 0
+    while not stop.is_set():
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            database.insert_invoice({
+                "invoice_number": f"SAN/INV/CONC/{os.getpid()}/{i}",
+                "date": "2025-03-31",
+                "type": "INVOICE",
+                "total_amount": 1180.0,
+            }, harness.sample_items())
+        except Exception as e:
+            errors.append(str(e))
+        latencies.append((time.perf_counter() - t0) * 1000)
+        time.sleep(interval)
+    result.update(latencies=latencies, errors=errors)
+
+
+def main():
+    p = harness.parser("Concurrent report reads and saves", scale=0.02, journal="WAL")
+    p.add_argument("--seconds", type=float, default=8.0)
+    p.add_argument("--interval", type=float, default=0.02)
+    p.add_argument("--max-write-ms", type=float, default=1000.0)
+    args = p.parse_args()
+
+    with harness.generated_db("conc.db", scale=args.scale, journal=args.journal):
+        r_res, w_res = {}, {}
+        stop = threading.Event()
+        tw = threading.Thread(target=writer, args=(stop, w_res, args.interval))
+
+        def read_guarded():
+            try:
+                reader(args.seconds, r_res)
+            except Exception as e:
+                r_res.update(error=str(e))
+
+        tr = threading.Thread(target=read_guarded)
+        tw.start()
+        tr.start()
+        tr.join()
+        stop.set()
+        tw.join()
+
+    lat = w_res["latencies"]
+    print(f"journal:        {args.journal.upper()}")
+    print(f"reader:         {r_res.get('seconds', 0):.2f} s, {r_res.get('rows', 0)} rows, "
+          f"snapshot stable={r_res.get('stable')} {r_res.get('error', '')}")
+    print(f"saves:          {len(lat)} ok={len(lat) - len(w_res['errors'])} "
+          f"errors={len(w_res['errors'])}")
+    print(f"save latency:   {harness.latency(lat)}")
+    if w_res["errors"]:
+        print(f"first error:    {w_res['errors'][0]}")
+
+    failed = (
+        w_res["errors"]
+        or "error" in r_res
+        or not r_res.get("stable")
+        or (lat and max(lat) > args.max_write_ms)
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    harness.run(main)
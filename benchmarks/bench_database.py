@@ -0,0 +1,325 @@
+# benchmarks/bench_database.py
+# Benchmark suite for database.py with stored baselines
+#
+#   python benchmarks/bench_database.py --scale 0.1 --save   -> record baseline
+#   python benchmarks/bench_database.py --scale 0.1          -> compare, exit 1 on regression
+#
+# Every public function of database.py has a case below or an entry in
+# EXCLUDED saying why it is not timed; the run fails (exit 1) when one
+# has neither, so a new function cannot slip past the suite.
+# Write cases go through the real write path (queue, cache invalidation);
+# delete / update cases work on rows their add case created earlier in
+# the same run.
+
+import inspect
+import itertools
+import json
+import os
+import random
+import statistics
+import time
+
+import harness
+import database
+
+BASELINE_PATH = os.path.join(harness.BENCH_DIR, "db_baseline.json")
+
+DEFAULT_THRESHOLD = 1.5   # fail when median > baseline * threshold
+
+# Public functions deliberately not timed
+EXCLUDED = {
+    "enable_query_trace": "tracing switch, no database work",
+    "disable_query_trace": "tracing switch, no database work",
+    "is_query_trace_enabled": "tracing switch, no database work",
+    "query_stats": "in-memory counters",
+    "reset_query_stats": "in-memory counters",
+    "write_queue_stats": "in-memory counters",
+    "cache_stats": "in-memory counters",
+    "reset_cache_stats": "in-memory counters",
+    "clear_cache": "in-memory cache reset",
+    "seed_default_charges": "legacy seeding; writes the old 'active' column, "
+                            "seed_default_charges_if_empty is the live path",
+}
+
+
+def _count(rows):
+    return sum(1 for _ in rows)
+
+
+def _last_id(table):
+    conn = database.get_conn()
+    rid = conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0]
+    conn.close()
+    return rid
+
+
+def build_cases(volumes, seed=7):
+    rnd = random.Random(seed)
+    n_jobs = volumes["jobs"]
+    n_cons = volumes["consignees"]
+    n_inv = volumes["invoices"]
+    counter = itertools.count(int(time.time()) * 1000)
+    made = {"consignees": [], "addresses": [], "charges": [], "rates": [], "drafts": [], "hashes": []}
+
+    for month in range(1, 13):
+        database.set_currency_rate("USD", f"2025-{month:02d}-01", 82.0 + month / 10)
+    charge_ids = [c["id"] for c in database.list_charges()]
+    _, doc_lines = database.get_document(1)
+
+    def items(n=8):
+        return [dict(it, rate=r, amount=r, taxable_amount=r)
+                for it, r in zip(harness.sample_items(n, "Ocean Freight", "996521"),
+                                 (round(rnd.uniform(500, 50000), 2) for _ in range(n)))]
+
+    def insert_invoice():
+        lines = items()
+        database.insert_invoice({
+            "invoice_number": f"SAN/INV/BENCH/{next(counter)}", "date": "2025-01-01",
+            "type": "INVOICE", "job_id": rnd.randint(1, n_jobs),
+            "total_amount": sum(it["total_amt"] for it in lines),
+        }, lines)
+
+    def save_invoice():
+        # An edit of a saved document: one line re-priced, one added
+        header, lines = database.get_document(rnd.randint(1, n_inv))
+        if lines:
+            lines[0]["rate"] = lines[0]["taxable_amount"] = round(rnd.uniform(500, 50000), 2)
+        lines.append(dict(items(1)[0], sr_no=len(lines) + 1))
+        database.save_invoice(header, lines)
+
+    def insert_job():
+        database.insert_job({
+            "job_no": f"SAN/JOB/BENCH/{next(counter)}",
+            "customer_id": rnd.randint(1, n_cons), "status": "OPEN",
+        })
+
+    def add_consignee():
+        made["consignees"].append(database.add_consignee(f"Bench Consignee {next(counter)}"))
+
+    def add_address():
+        database.add_consignee_address(rnd.randint(1, n_cons), "Branch", "12 Dock Road",
+                                       "Maharashtra", "27", "400001", "India", 0)
+        made["addresses"].append(_last_id("consignee_addresses"))
+
+    def add_charge():
+        database.add_charge(f"Bench charge {next(counter)}", "996719", "INR", 9, 9)
+        made["charges"].append(_last_id("charges_master"))
+
+    def update_charge():
+        cid = rnd.choice(made["charges"])
+        database.update_charge(cid, f"Bench charge {next(counter)}", "996719", "INR", 6, 6,
+                               effective_from="2025-04-01")
+
+    def set_currency_rate():
+        d = f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+        database.set_currency_rate("EUR", d, 90.0)
+        made["rates"].append(d)
+
+    def put_export_cache():
+        h = f"{next(counter):040x}"
+        database.put_export_cache(h, "SAN/INV/BENCH/1", f"/tmp/{h}.pdf", 1024)
+        made["hashes"].append(h)
+
+    def save_draft():
+        owner = f"bench-{next(counter)}"
+        database.save_draft_changes(owner, "INVOICE", {"consignee": "Apex"},
+                                    {r: '["THC", "996719", "INR", "1000"]' for r in range(8)}, 8)
+        made["drafts"].append(owner)
+
+    def write_group():
+        with database.write_group() as step:
+            step(insert_job)
+            step(insert_job)
+
+    def read_snapshot():
+        with database.read_snapshot() as snap:
+            database.get_invoice(rnd.randint(1, n_inv), snapshot=snap)
+
+    def get_conn():
+        database.get_conn().close()
+
+    def get_read_conn():
+        database.get_read_conn().close()
+
+    def diff_items():
+        edited = [dict(it, rate=it["rate"] + 1) for it in doc_lines[::2]]
+        database.diff_items(doc_lines, edited)
+
+    doc_numbers = [r["invoice_number"] for r in itertools.islice(
+        database.iter_invoices(columns=("invoice_number",), row="dict"), 0, 500)]
+    job = {"job_no": "SAN/JOB/1", "gross_weight": "12,345.6 KGS", "volume_cbm": "23.456 CBM",
+           "packages": "120 PKGS"}
+
+    # (name, callable, calls per round)
+    return [
+        # settings / connections
+        ("get_setting", lambda: database.get_setting("inv_counter"), 200),
+        ("set_setting", lambda: database.set_setting("bench_key", str(next(counter))), 20),
+        ("get_conn", get_conn, 200),
+        ("get_read_conn", get_read_conn, 200),
+        ("read_snapshot", read_snapshot, 50),
+        ("table_generation", lambda: database.table_generation("jobs"), 200),
+        ("table_versions", database.table_versions, 200),
+        # jobs
+        ("list_jobs", database.list_jobs, 1),
+        ("list_jobs_for_dropdown", database.list_jobs_for_dropdown, 1),
+        ("list_open_jobs_for_dropdown", database.list_open_jobs_for_dropdown, 1),
+        ("get_job", lambda: database.get_job(rnd.randint(1, n_jobs)), 200),
+        ("insert_job", insert_job, 20),
+        ("close_job", lambda: database.close_job(rnd.randint(1, n_jobs)), 20),
+        ("write_group", write_group, 10),
+        ("run_write_group", lambda: database.run_write_group([(insert_job, (), {})] * 2), 10),
+        # consignees / addresses
+        ("list_consignees", database.list_consignees, 1),
+        ("list_consignees_search", lambda: database.list_consignees("Logistics 1"), 1),
+        ("list_consignees_with_address_labels", database.list_consignees_with_address_labels, 1),
+        ("get_consignee", lambda: database.get_consignee(rnd.randint(1, n_cons)), 200),
+        ("add_consignee", add_consignee, 20),
+        ("update_consignee",
+         lambda: database.update_consignee(rnd.choice(made["consignees"]), f"Bench {next(counter)}"), 20),
+        ("delete_consignee", lambda: database.delete_consignee(made["consignees"].pop()), 20),
+        ("get_addresses_for_consignee",
+         lambda: database.get_addresses_for_consignee(rnd.randint(1, n_cons)), 200),
+        ("list_default_addresses", database.list_default_addresses, 1),
+        ("add_consignee_address", add_address, 20),
+        ("update_address", lambda: database.update_address(
+            rnd.choice(made["addresses"]), "Branch", "14 Dock Road", "Maharashtra", "27",
+            "400001", "India", 0), 20),
+        ("delete_address", lambda: database.delete_address(made["addresses"].pop()), 20),
+        ("list_customers", database.list_customers, 1),
+        ("get_customer", lambda: database.get_customer(rnd.randint(1, n_cons)), 200),
+        ("get_addresses_for_customer",
+         lambda: database.get_addresses_for_customer(rnd.randint(1, n_cons)), 200),
+        # invoices
+        ("get_invoice", lambda: database.get_invoice(rnd.randint(1, n_inv)), 200),
+        ("get_invoice_items", lambda: database.get_invoice_items(rnd.randint(1, n_inv)), 200),
+        ("get_document", lambda: database.get_document(rnd.randint(1, n_inv)), 200),
+        ("get_document_by_number",
+         lambda: database.get_document(invoice_number=rnd.choice(doc_numbers)), 200),
+        ("diff_items", diff_items, 200),
+        ("insert_invoice", insert_invoice, 20),
+        ("save_invoice", save_invoice, 20),
+        ("list_invoiced_job_ids", database.list_invoiced_job_ids, 1),
+        ("put_export_cache", put_export_cache, 20),
+        ("get_export_cache", lambda: database.get_export_cache(made["hashes"][-50:]), 50),
+        ("delete_export_cache", lambda: database.delete_export_cache(made["hashes"].pop()), 20),
+        # charges / rates
+        ("list_charges", database.list_charges, 50),
+        ("get_charge", lambda: database.get_charge(rnd.choice(charge_ids)), 200),
+        ("add_charge", add_charge, 20),
+        ("update_charge", update_charge, 20),
+        ("delete_charge", lambda: database.delete_charge(made["charges"].pop()), 20),
+        ("get_charge_rate", lambda: database.get_charge_rate(
+            rnd.choice(charge_ids), f"2025-{rnd.randint(1, 12):02d}-15"), 200),
+        ("list_charge_rates", database.list_charge_rates, 20),
+        ("ensure_charge_rates", database.ensure_charge_rates, 1),
+        ("set_currency_rate", set_currency_rate, 20),
+        ("get_currency_rate", lambda: database.get_currency_rate(
+            "USD", f"2025-{rnd.randint(1, 12):02d}-15"), 200),
+        ("list_currency_rates", database.list_currency_rates, 20),
+        ("delete_currency_rate", lambda: database.delete_currency_rate("EUR", made["rates"].pop()), 20),
+        # charge history / drafts
+        ("get_charge_suggestions", lambda: database.get_charge_suggestions(rnd.randint(1, n_cons)), 200),
+        ("list_charge_templates", database.list_charge_templates, 20),
+        ("rebuild_charge_usage", database.rebuild_charge_usage, 1),
+        ("save_draft_changes", save_draft, 20),
+        ("get_draft", lambda: database.get_draft(rnd.choice(made["drafts"]), "INVOICE"), 200),
+        ("discard_draft", lambda: database.discard_draft(made["drafts"].pop(), "INVOICE"), 20),
+        # lanes
+        ("job_metrics", lambda: database.job_metrics(job), 200),
+        ("normalize_job_metrics", database.normalize_job_metrics, 1),
+        ("rebuild_lane_cube", database.rebuild_lane_cube, 1),
+        ("query_lanes", database.query_lanes, 20),
+        ("list_lane_values", database.list_lane_values, 20),
+        # streaming exports
+        ("iter_jobs", lambda: _count(database.iter_jobs(columns=("id", "job_no", "pol", "pod"))), 1),
+        ("iter_consignees", lambda: _count(database.iter_consignees()), 1),
+        ("iter_charges", lambda: _count(database.iter_charges()), 20),
+        ("iter_invoices", lambda: _count(database.iter_invoices("2025-01-01", "2025-03-31")), 1),
+        ("iter_invoice_items", lambda: _count(database.iter_invoice_items(rnd.randint(1, n_inv))), 200),
+        # startup
+        ("init_db", database.init_db, 1),
+        ("ensure_job_metrics_schema", database.ensure_job_metrics_schema, 1),
+        ("ensure_invoice_schema", database.ensure_invoice_schema, 1),
+        ("ensure_charges_schema", database.ensure_charges_schema, 1),
+        ("seed_default_charges_if_empty", database.seed_default_charges_if_empty, 1),
+    ]
+
+
+def uncovered(cases):
+    """Public database.py functions with neither a case nor an EXCLUDED entry."""
+    names = {name for name, _, _ in cases}
+    public = {
+        name for name, fn in inspect.getmembers(database, inspect.isfunction)
+        if not name.startswith("_") and fn.__module__ == "database"
+    }
+    return sorted(public - names - set(EXCLUDED))
+
+
+def run(cases, rounds=5):
+    results = {}
+    for name, fn, number in cases:
+        fn()   # warm-up
+        samples = []
+        for _ in range(rounds):
+            seconds, _ = harness.timed(lambda: [fn() for _ in range(number)])
+            samples.append(seconds / number)
+        results[name] = statistics.median(samples)
+    return results
+
+
+def compare(results, baseline, threshold):
+    failures = []
+    for name, median in results.items():
+        base = baseline.get(name)
+        ratio = median / base if base else None
+        flag = ""
+        if ratio is not None and ratio > threshold:
+            flag = "  REGRESSION"
+            failures.append(name)
+        print(
+            f"{name:36s} {median * 1000:10.3f} ms"
+            + (f"  (baseline {base * 1000:.3f} ms, x{ratio:.2f}){flag}" if base else "")
+        )
+    return failures
+
+
+def main():
+    p = harness.parser("Benchmark database.py", scale=0.1)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--rounds", type=int, default=5)
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    p.add_argument("--save", action="store_true", help="store results as the new baseline")
+    args = p.parse_args()
+
+    with harness.generated_db("bench.db", scale=args.scale, seed=args.seed) as db:
+        cases = build_cases(db.counts)
+        missing = uncovered(cases)
+        results = run(cases, rounds=args.rounds)
+
+    key = f"scale={args.scale}"
+    stored = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            stored = json.load(f)
+
+    failures = compare(results, stored.get(key, {}), args.threshold)
+    if missing:
+        print(f"\nno case and not in EXCLUDED: {', '.join(missing)}")
+        return 1
+
+    if args.save:
+        stored[key] = results
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+        print(f"baseline saved: {BASELINE_PATH} [{key}]")
+        return 0
+
+    if failures:
+        print(f"\n{len(failures)} regression(s) over x{args.threshold}: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,132 @@
+# benchmarks/bench_edit.py
+# Editing saved documents: load, change a few lines, save again
+#
+#   python benchmarks/bench_edit.py                  -> scale 0.05, 2,000 edits
+#   python benchmarks/bench_edit.py --scale 0.2 --docs 5000
+#
+# On a generated database (two copies of the file), opens --docs saved
+# documents and times:
+#   two queries   get_invoice() + get_invoice_items() per document
+#   joined        database.get_document(), one query per document
+# then edits each one (one rate changed, the last line removed, a line
+# added) and saves it two ways:
+#   rewrite       UPDATE the header, DELETE every item row, INSERT them all
+#                 again, move the revenue in lane_cube (a save without a diff)
+#   diff          database.save_invoice(): only the changed rows
+# and times saving the edited documents a second time (nothing to write).
+# Checks both copies end with the same items per document, that the second
+# save wrote nothing, and that no invoice number was duplicated. Exits 1 on
+# mismatch.
+
+import os
+import random
+
+import harness
+import database
+
+
+def edit(items, rnd):
+    """One rate changed, the last line removed, a copy of the first added."""
+    items = [dict(it) for it in items]
+    if not items:
+        return items
+    it = items[rnd.randrange(len(items))]
+    it["rate"] = round(it["rate"] * 1.1, 2)
+    it["amount"] = round(it["rate"] * it["qty"], 2)
+    it["taxable_amount"] = round(it["amount"] * (it["fx_rate"] or 1), 2)
+    it["total_amt"] = round(it["taxable_amount"] + it["cgst_amt"] + it["sgst_amt"] + it["igst_amt"], 2)
+    last = max(it["sr_no"] for it in items)
+    if len(items) > 1:
+        items.pop()
+    added = {k: v for k, v in items[0].items() if k != "id"}
+    added["sr_no"] = last + 1
+    items.append(added)
+    return items
+
+
+@database._queued_write        # same writer queue as save_invoice
+def rewrite(header, items):
+    conn = database.get_conn()
+    cur = conn.cursor()
+    fields = {k: v for k, v in header.items() if k != "id"}
+    old = cur.execute("SELECT SUM(taxable_amount) FROM invoice_items WHERE invoice_id=?",
+                      (header["id"],)).fetchone()[0]
+    database._cube_add_invoice(cur, header["id"], -(old or 0))
+    cur.execute(f"UPDATE invoices SET {', '.join(f'{k}=?' for k in fields)} WHERE id=?",
+                [*fields.values(), header["id"]])
+    cur.execute("DELETE FROM invoice_items WHERE invoice_id=?", (header["id"],))
+    database._insert_items(cur, header["id"], items)
+    database._cube_add_invoice(cur, header["id"], database._revenue(items))
+    conn.commit()
+    conn.close()
+
+
+def saved_items(ids):
+    conn = database.get_conn()
+    rows = conn.execute(
+        f"SELECT invoice_id, {', '.join(database.ITEM_COLUMNS)} FROM invoice_items "
+        f"WHERE invoice_id IN ({','.join('?' * len(ids))}) ORDER BY invoice_id, sr_no, id",
+        ids).fetchall()
+    conn.close()
+    return [tuple(r) for r in rows]
+
+
+def _duplicates():
+    conn = database.get_conn()
+    n = conn.execute("""
+        SELECT COUNT(*) FROM (SELECT invoice_number FROM invoices
+                              GROUP BY invoice_number HAVING COUNT(*) > 1)
+    """).fetchone()[0]
+    conn.close()
+    return n
+
+
+def main():
+    p = harness.parser("Saved document edit benchmark", scale=0.05)
+    p.add_argument("--docs", type=int, default=2000)
+    args = p.parse_args()
+
+    with harness.generated_db("edit_a.db", scale=args.scale) as db:
+        dst = harness.copy_db(db.path, os.path.join(db.tmp, "edit_b.db"))
+        conn = database.get_conn()
+        all_ids = [r[0] for r in conn.execute("SELECT id FROM invoices")]
+        conn.close()
+        ids = random.Random(5).sample(all_ids, min(args.docs, len(all_ids)))
+
+        two_s, two = harness.timed(lambda: [(database.get_invoice(i), database.get_invoice_items(i)) for i in ids])
+        joined_s, docs = harness.timed(lambda: [database.get_document(i) for i in ids])
+        bad = sum(1 for a, b in zip(two, docs) if a != b)
+
+        rnd = random.Random(11)
+        edits = [(header, edit(items, rnd)) for header, items in docs]
+        n_lines = sum(len(items) for _, items in edits)
+
+        rewrite_s, _ = harness.timed(lambda: [rewrite(header, items) for header, items in edits])
+        rewritten = saved_items(ids)
+
+        database.DB_PATH = dst
+        database.init_db()
+        diff_s, saved = harness.timed(lambda: [database.save_invoice(header, items)[1] for header, items in edits])
+        stats = {k: sum(s[k] for s in saved) for k in ("inserted", "updated", "deleted", "unchanged")}
+        bad += saved_items(ids) != rewritten
+
+        # Saving the same documents again (a second click) writes nothing
+        reloaded = [database.get_document(header["id"]) for header, _ in edits]
+        again_s, again = harness.timed(lambda: [database.save_invoice(header, items)[1] for header, items in reloaded])
+        bad += sum(1 for s in again if s["inserted"] or s["updated"] or s["deleted"])
+        bad += _duplicates()
+
+    n = len(ids)
+    print(f"{n} documents, {n_lines} lines after edit; diff wrote {stats['updated']} updates, "
+          f"{stats['inserted']} inserts, {stats['deleted']} deletes, left {stats['unchanged']} rows")
+    print(f"load, two queries: {harness.throughput(two_s, n, 'docs')}")
+    print(f"load, joined:      {harness.throughput(joined_s, n, 'docs')}")
+    print(f"save, rewrite:     {harness.throughput(rewrite_s, n, 'docs', f'{n_lines} rows written')}")
+    written = stats["updated"] + stats["inserted"] + stats["deleted"]
+    print(f"save, diff:        {harness.throughput(diff_s, n, 'docs', f'{written} rows written')}")
+    print(f"re-save, diff:     {harness.throughput(again_s, n, 'docs', 'unchanged, 0 rows written')}")
+    return harness.check(bad, "mismatches (loads, saved items, re-save writes, duplicate numbers)")
+
+
+if __name__ == "__main__":
+    harness.run(main)
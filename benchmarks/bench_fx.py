@@ -0,0 +1,104 @@
+# benchmarks/bench_fx.py
+# Currency conversion of foreign-currency invoice lines
+#
+#   python benchmarks/bench_fx.py                    -> scale 0.034 (~100k lines)
+#   python benchmarks/bench_fx.py --scale 0.2
+#
+# Loads a daily USD / EUR rate history over the datagen date range
+# (weekdays only, so weekend invoices use Friday's rate), then converts
+# and recomputes every saved invoice at the rate on its date:
+#   per-line lookup   an indexed currency_rates SELECT per foreign line,
+#                     then compute_invoice()
+#   rate book         list_currency_rates() once into fx_rates.RateBook,
+#                     convert_items() + compute_invoice() per invoice
+# Exits 1 if the two disagree on any invoice total.
+
+import random
+from datetime import timedelta
+
+import harness
+import database
+import fx_rates
+import gst_rules
+from datagen import START_DATE
+
+BASE_RATES = {"USD": 82.0, "EUR": 89.0}
+
+
+def load_rates(rnd, days=900):
+    conn = database.get_conn()
+    rows = []
+    for cur, rate in BASE_RATES.items():
+        for d in range(days + 1):
+            day = START_DATE + timedelta(days=d)
+            rate *= 1 + rnd.uniform(-0.004, 0.004)
+            if day.weekday() < 5:
+                rows.append((cur, day.strftime("%Y-%m-%d"), round(rate, 4)))
+    conn.executemany(
+        "INSERT INTO currency_rates (currency, rate_date, rate) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def invoices():
+    conn = database.get_conn()
+    docs = {}
+    for r in conn.execute("""
+        SELECT i.id, i.date, it.description, it.hsn_sac, it.cur, it.rate, it.qty,
+               it.cgst_rate, it.sgst_rate
+        FROM invoice_items it JOIN invoices i ON i.id = it.invoice_id
+        ORDER BY i.id, it.sr_no
+    """):
+        r = dict(r)
+        docs.setdefault(r.pop("id"), (r["date"], []))[1].append(r)
+    conn.close()
+    return docs
+
+
+def per_line(docs):
+    conn = database.get_conn()
+    totals = {}
+    for inv_id, (date, items) in docs.items():
+        items = [dict(it) for it in items]
+        for it in items:
+            if fx_rates.is_foreign(it["cur"]):
+                r = conn.execute(
+                    "SELECT rate FROM currency_rates WHERE currency=? AND rate_date<=? "
+                    "ORDER BY rate_date DESC LIMIT 1", (it["cur"], date)).fetchone()
+                it["fx_rate"] = r["rate"] if r else 1.0
+        totals[inv_id] = gst_rules.compute_invoice(items, gst_rules.INTRA, date)["total"]
+    conn.close()
+    return totals
+
+
+def rate_book(docs):
+    book = fx_rates.rate_book()
+    return {
+        inv_id: gst_rules.compute_invoice([dict(it) for it in items], gst_rules.INTRA, date, fx=book)["total"]
+        for inv_id, (date, items) in docs.items()
+    }
+
+
+def main():
+    p = harness.parser("Currency conversion benchmark", scale=0.034)
+    args = p.parse_args()
+
+    with harness.generated_db("fx.db", scale=args.scale):
+        n_rates = load_rates(random.Random(7))
+        docs = invoices()
+        n_lines = sum(len(items) for _, items in docs.values())
+        n_foreign = sum(fx_rates.is_foreign(it["cur"]) for _, items in docs.values() for it in items)
+
+        naive_s, naive = harness.timed(lambda: per_line(docs))
+        fast_s, fast = harness.timed(lambda: rate_book(docs))
+
+    bad = sum(1 for k, v in naive.items() if abs(fast[k] - v) > 1e-6 * max(1.0, abs(v)))
+    print(f"{len(docs)} invoices, {n_lines} lines ({n_foreign} foreign), {n_rates} rate rows")
+    print(f"per-line lookup: {harness.throughput(naive_s, n_lines, 'lines')}")
+    print(f"rate book:       {harness.throughput(fast_s, n_lines, 'lines', 'incl. compile')}")
+    return harness.check(bad, "invoice totals disagree")
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,117 @@
+# benchmarks/bench_gst.py
+# GST rule engine: whole-invoice recompute with the compiled rate table
+#
+#   python benchmarks/bench_gst.py                   -> 100k lines
+#   python benchmarks/bench_gst.py --lines 1000000
+#
+# Builds invoices of 1-12 lines over the datagen charges, half with the GST
+# rates typed and half left for the HSN/SAC rate table, and bills each to a
+# random state. Times:
+#   per-line lookup   rates fetched from charges_master for each line
+#                     (one SELECT per line, what a naive batch would do)
+#   engine            supply_type() per invoice + compute_invoice() with
+#                     one RateTable compiled up front
+# Checks every line's tax equals its rate split for the supply type and
+# that intra / inter totals of the same lines agree. Exits 1 on mismatch.
+
+import random
+
+import harness
+import database
+import gst_rules
+from datagen import CHARGES, STATES
+
+
+def make_invoices(rnd, n_lines):
+    invoices = []
+    left = n_lines
+    while left > 0:
+        k = min(left, rnd.randint(1, 12))
+        left -= k
+        items = []
+        for sr in range(1, k + 1):
+            name, hsn, cur = rnd.choice(CHARGES)
+            it = {"sr_no": sr, "description": name, "hsn_sac": hsn, "cur": cur,
+                  "rate": round(rnd.uniform(500, 50000), 2), "qty": float(rnd.randint(1, 4))}
+            if rnd.random() < 0.5:
+                it.update(cgst_rate=9.0, sgst_rate=9.0)
+            items.append(it)
+        invoices.append((rnd.choice(STATES)[1], items))
+    return invoices
+
+
+def per_line_lookup(invoices):
+    conn = database.get_conn()
+    home = gst_rules.home_state_code()
+    for place, items in invoices:
+        inter = place != home
+        for it in items:
+            r = conn.execute(
+                "SELECT cgst_rate, sgst_rate, igst_rate FROM charges_master "
+                "WHERE hsn_sac=? AND is_active=1 ORDER BY id DESC LIMIT 1",
+                (it["hsn_sac"],),
+            ).fetchone()
+            taxable = it["rate"] * it["qty"]
+            gst = (r["igst_rate"] or r["cgst_rate"] + r["sgst_rate"]) if inter else r["cgst_rate"] + r["sgst_rate"]
+            it["total_amt"] = taxable + taxable * gst / 100
+    conn.close()
+
+
+def engine(invoices, table):
+    home = gst_rules.home_state_code()
+    totals = []
+    for place, items in invoices:
+        supply = gst_rules.supply_type(place, home)
+        totals.append(gst_rules.compute_invoice(items, supply, "2025-06-30", table))
+    return totals
+
+
+def check(invoices, table):
+    bad = 0
+    for place, items in invoices:
+        for supply in (gst_rules.INTRA, gst_rules.INTER):
+            lines = [dict(it) for it in items]
+            t = gst_rules.compute_invoice(lines, supply, table=table)
+            for it in lines:
+                tax = it["cgst_amt"] + it["sgst_amt"] + it["igst_amt"]
+                split_ok = (it["igst_amt"] == 0) if supply == gst_rules.INTRA else \
+                    (it["cgst_amt"] == 0 == it["sgst_amt"])
+                bad += not split_ok or abs(tax - it["taxable_amount"] * 0.18) > 1e-6
+            if supply == gst_rules.INTRA:
+                intra_total = t["total"]
+            else:
+                bad += abs(t["total"] - intra_total) > 1e-6
+    return bad
+
+
+def main():
+    p = harness.parser("GST engine benchmark")
+    p.add_argument("--lines", type=int, default=100_000)
+    args = p.parse_args()
+
+    rnd = random.Random(5)
+    with harness.generated_db("gst.db", empty=True):
+        conn = database.get_conn()
+        conn.executemany(
+            "INSERT INTO charges_master (charge_name, hsn_sac, currency, cgst_rate, sgst_rate, igst_rate, is_active) "
+            "VALUES (?, ?, ?, 9, 9, 18, 1)", CHARGES)
+        conn.commit()
+        conn.close()
+
+        invoices = make_invoices(rnd, args.lines)
+        compile_s, table = harness.timed(gst_rules.rate_table)
+        naive_s, _ = harness.timed(lambda: per_line_lookup(invoices))
+        engine_s, _ = harness.timed(lambda: engine(invoices, table))
+
+        bad = check(invoices, table)
+
+    inter = sum(1 for place, _ in invoices if place != gst_rules.HOME_STATE_CODE)
+    print(f"{args.lines} lines on {len(invoices)} invoices ({inter} inter-state); "
+          f"rate table compiled in {compile_s * 1000:.2f} ms")
+    print(f"per-line lookup: {harness.throughput(naive_s, args.lines, 'lines')}")
+    print(f"engine:          {harness.throughput(engine_s, args.lines, 'lines')}")
+    return harness.check(bad, "mismatched lines / totals")
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,137 @@
+# benchmarks/bench_lanes.py
+# Lane analytics: cube slices vs. aggregating jobs / invoices directly
+#
+#   python benchmarks/bench_lanes.py                 -> scale 0.2 (20k jobs, 100k invoices)
+#   python benchmarks/bench_lanes.py --scale 1.0
+#
+# Times the one-off migration (normalize_job_metrics + rebuild_lane_cube),
+# a set of typical slices through query_lanes() against the same answer
+# computed from jobs / invoices / invoice_items, then saves --saves jobs
+# with an invoice each through insert_job / insert_invoice and checks the
+# incrementally kept cube equals a full rebuild.
+# Exits 1 if the cube disagrees with the rebuild.
+
+import random
+
+import harness
+import database
+
+# The raw-table equivalent of query_lanes(group_by=(...)) for job-linked data
+RAW_SQL = """
+    SELECT {dims}
+           COUNT(DISTINCT j.id) AS shipments,
+           SUM(j.gross_weight_kg) / 1000.0 AS tonnes,
+           SUM(t.taxable) AS revenue
+    FROM jobs j
+    LEFT JOIN invoices i ON i.job_id = j.id
+    LEFT JOIN (SELECT invoice_id, SUM(taxable_amount) AS taxable
+               FROM invoice_items GROUP BY invoice_id) t ON t.invoice_id = i.id
+    WHERE 1 {where}
+    {group}
+    ORDER BY revenue DESC LIMIT 500
+"""
+RAW_DIMS = {
+    "month": "substr(j.etd, 1, 7)",
+    "pol": "j.pol",
+    "pod": "j.pod",
+    "customer_id": "j.customer_id",
+}
+
+
+def slices(values):
+    month_lo, month_hi = values["month"][len(values["month"]) // 2], values["month"][-1]
+    pol, pod = values["pol"][0], values["pod"][1]
+    return [
+        ("all lanes", {"group_by": ("pol", "pod")}),
+        ("lanes, last half", {"group_by": ("pol", "pod"), "month_from": month_lo, "month_to": month_hi}),
+        ("one lane by month", {"group_by": ("month",), "pol": pol, "pod": pod}),
+        ("customers on a lane", {"group_by": ("customer_id",), "pol": pol, "pod": pod}),
+        ("one customer by lane", {"group_by": ("pol", "pod"), "customer_id": 1}),
+        ("POL by month", {"group_by": ("month", "pol")}),
+    ]
+
+
+def raw_query(conn, spec):
+    dims = [RAW_DIMS[d] for d in database.LANE_DIMS if d in spec["group_by"]]
+    where, params = "", []
+    for key, col in (("month_from", "substr(j.etd, 1, 7) >= ?"), ("month_to", "substr(j.etd, 1, 7) <= ?"),
+                     ("pol", "j.pol = ?"), ("pod", "j.pod = ?"), ("customer_id", "j.customer_id = ?")):
+        if spec.get(key):
+            where += f" AND {col}"
+            params.append(spec[key])
+    sql = RAW_SQL.format(
+        dims="".join(d + ", " for d in dims), where=where,
+        group=("GROUP BY " + ", ".join(dims)) if dims else "",
+    )
+    return conn.execute(sql, params).fetchall()
+
+
+def _cube():
+    conn = database.get_conn()
+    rows = conn.execute(
+        "SELECT month, pol, pod, customer_id, shipments, round(gross_kg, 3), "
+        "round(volume_m3, 3), round(revenue, 2) FROM lane_cube ORDER BY 1, 2, 3, 4"
+    ).fetchall()
+    conn.close()
+    return [tuple(r) for r in rows]
+
+
+def save_jobs(rnd, n, n_customers):
+    ports = database.list_lane_values()["pol"]
+    for i in range(n):
+        etd = f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+        jid = database.insert_job({
+            "job_no": f"SAN/JOB/LANE/{i:05d}", "customer_id": rnd.randint(1, n_customers),
+            "pol": rnd.choice(ports), "pod": rnd.choice(ports), "etd": etd, "eta": etd,
+            "gross_weight": rnd.choice([f"{rnd.uniform(100, 25000):,.1f} KGS",
+                                        f"{rnd.uniform(0.1, 25):.2f} MT"]),
+            "volume_cbm": f"{rnd.uniform(1, 68):.3f} CBM", "packages": f"{rnd.randint(1, 900)} PKGS",
+            "status": "OPEN",
+        })
+        taxable = round(rnd.uniform(1000, 90000), 2)
+        database.insert_invoice({
+            "invoice_number": f"SAN/INV/LANE/{i:05d}", "date": etd, "type": "INVOICE",
+            "job_id": jid, "total_amount": taxable * 1.18,
+        }, [{
+            "sr_no": 1, "description": "Ocean Freight", "hsn_sac": "996521", "cur": "INR",
+            "rate": taxable, "qty": 1.0, "amount": taxable, "taxable_amount": taxable,
+            "cgst_rate": 9.0, "cgst_amt": taxable * 0.09, "sgst_rate": 9.0,
+            "sgst_amt": taxable * 0.09, "total_amt": taxable * 1.18,
+        }])
+
+
+def main():
+    p = harness.parser("Lane cube benchmark", scale=0.2)
+    p.add_argument("--saves", type=int, default=500)
+    p.add_argument("--runs", type=int, default=5)
+    args = p.parse_args()
+
+    rnd = random.Random(3)
+    with harness.generated_db("lanes.db", scale=args.scale) as db:
+        n = db.counts
+        norm_s, _ = harness.timed(database.normalize_job_metrics)
+        cube_s, cells = harness.timed(database.rebuild_lane_cube)
+        print(f"migration: {n['jobs']} jobs normalized in {norm_s:.2f} s, "
+              f"cube of {cells} cells built in {cube_s:.2f} s")
+
+        values = database.list_lane_values()
+        conn = database.get_conn()
+        print(f"{'slice':<24} {'rows':>6} {'cube ms':>9} {'raw ms':>9}")
+        for name, spec in slices(values):
+            rows = database.query_lanes(**spec)
+            cube_ms = harness.median_ms(lambda: database.query_lanes(**spec), args.runs)
+            raw_ms = harness.median_ms(lambda: raw_query(conn, spec), max(1, args.runs // 2))
+            print(f"{name:<24} {len(rows):>6} {cube_ms:>9.2f} {raw_ms:>9.1f}")
+        conn.close()
+
+        save_s, _ = harness.timed(lambda: save_jobs(rnd, args.saves, n["consignees"]))
+        incremental = _cube()
+        database.rebuild_lane_cube()
+        same = incremental == _cube()
+        print(f"saves:     {args.saves} jobs + invoices in {save_s:.2f} s; incremental cube "
+              f"{'matches' if same else 'DIFFERS FROM'} rebuild ({len(incremental)} cells)")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,88 @@
+# benchmarks/bench_maintenance.py
+# Effect of maintenance on a "year-old" file: size and probe-query times
+#
+#   python benchmarks/bench_maintenance.py               -> legacy file (auto_vacuum=NONE)
+#   python benchmarks/bench_maintenance.py --new-file    -> file created by init_db (INCREMENTAL)
+#
+# Builds a generated database, simulates a year of churn (charges added
+# and soft-deleted, consignees with their addresses deleted, cancelled
+# invoices purged), then a first pass (run_convert() on a legacy file, the
+# one-time CLI step; run_maintenance() on a new one) and a routine idle
+# pass after more churn.
+
+import os
+import random
+import sqlite3
+
+import harness
+import database
+import maintenance
+
+
+def churn(db_path, rnd, fraction):
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+
+    # Charges created and retired over the year
+    cur.executemany(
+        "INSERT INTO charges_master (charge_name, hsn_sac, currency, cgst_rate, sgst_rate, is_active) "
+        "VALUES (?, '996719', 'INR', 9, 9, 0)",
+        [(f"Retired charge {i} " + "x" * 200,) for i in range(2000)]
+    )
+    n_cons = cur.execute("SELECT MAX(id) FROM consignees").fetchone()[0]
+    gone = rnd.sample(range(1, n_cons + 1), int(n_cons * fraction))
+    cur.executemany("DELETE FROM consignee_addresses WHERE consignee_id=?", [(c,) for c in gone])
+    cur.executemany("DELETE FROM consignees WHERE id=?", [(c,) for c in gone])
+
+    n_inv = cur.execute("SELECT MAX(id) FROM invoices").fetchone()[0]
+    purged = rnd.sample(range(1, n_inv + 1), int(n_inv * fraction))
+    cur.executemany("DELETE FROM invoice_items WHERE invoice_id=?", [(i,) for i in purged])
+    cur.executemany("DELETE FROM invoices WHERE id=?", [(i,) for i in purged])
+    cur.execute("DELETE FROM charges_master WHERE is_active = 0 AND charge_name LIKE 'Retired charge%'")
+    conn.commit()
+    conn.close()
+
+
+def show(label, rec):
+    b, a = rec["before"], rec["after"]
+    print(f"--- {label}")
+    print(f"file:      {b['file_bytes'] / 2**20:.1f} MB -> {a['file_bytes'] / 2**20:.1f} MB "
+          f"(free pages {b['freelist']} -> {a['freelist']}, auto_vacuum {b['auto_vacuum']} -> {a['auto_vacuum']})")
+    for name, ms in b["probes_ms"].items():
+        print(f"  {name:<26} {ms:>8.2f} ms -> {a['probes_ms'].get(name, 0):>8.2f} ms")
+    print(f"steps:     {rec['steps']}")
+
+
+def main():
+    p = harness.parser("Maintenance effect on a churned database", scale=0.05)
+    p.add_argument("--churn", type=float, default=0.3, help="fraction deleted per round")
+    p.add_argument("--new-file", action="store_true")
+    args = p.parse_args()
+
+    rnd = random.Random(11)
+    with harness.generated_db("aged.db", scale=args.scale) as gen:
+        db, tmp = gen.path, gen.tmp
+        if not args.new_file:
+            conn = sqlite3.connect(db, isolation_level=None)
+            conn.execute("PRAGMA auto_vacuum=NONE")
+            conn.execute("VACUUM")
+            conn.close()
+            database.init_db()
+
+        maintenance.LOG_PATH = os.path.join(tmp, "maintenance.log")
+        churn(db, rnd, args.churn)
+        first = maintenance.run_maintenance if args.new_file else maintenance.run_convert
+        show("first pass", first())
+
+        churn(db, rnd, args.churn)
+        show("routine pass", maintenance.run_maintenance())
+
+        opt = maintenance.run_optimize()
+        print(f"--- optimize on shutdown: {opt['seconds'] * 1000:.1f} ms")
+        with open(maintenance.LOG_PATH, encoding="utf-8") as f:
+            print(f"log:       {sum(1 for _ in f)} records")
+    return 0
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,124 @@
+# benchmarks/bench_multiprocess.py
+# Stress test: several app processes saving invoices and jobs into one data.db
+#
+#   python benchmarks/bench_multiprocess.py                   -> 4 processes x 3 threads x 100 saves
+#   python benchmarks/bench_multiprocess.py --no-queue        -> plain per-call commits, for comparison
+#   python benchmarks/bench_multiprocess.py --journal DELETE  -> rollback journal (network-share setup)
+#   python benchmarks/bench_multiprocess.py --busy-ms 20      -> short busy timeout, so contention
+#                                                         has to be absorbed by backoff
+#
+# Every worker process imports database.py as the app does, so saves go
+# through its writer thread, busy timeout and backoff. Exits 1 if a save
+# fails or the row counts do not match what the workers reported.
+
+import multiprocessing as mp
+import os
+import sqlite3
+import threading
+import time
+
+import harness
+
+
+def worker(db_path, proc, threads, saves, use_queue, journal, busy_ms, out):
+    os.environ["SANSHIP_WRITE_QUEUE"] = "1" if use_queue else "0"
+    os.environ["SANSHIP_JOURNAL_MODE"] = journal
+    os.environ["SANSHIP_BUSY_TIMEOUT_MS"] = str(busy_ms)
+    import database
+    database.DB_PATH = db_path
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def desk(t):
+        for i in range(saves):
+            t0 = time.perf_counter()
+            try:
+                if i % 3 == 0:
+                    database.insert_job({"job_no": f"SAN/JOB/MP/{proc}/{t}/{i}", "status": "OPEN"})
+                else:
+                    database.insert_invoice({
+                        "invoice_number": f"SAN/INV/MP/{proc}/{t}/{i}",
+                        "date": "2025-03-31", "type": "INVOICE", "total_amount": 4720.0,
+                    }, harness.sample_items(4, "Ocean Freight", "996521"))
+                ok = True
+            except sqlite3.Error as e:
+                ok = False
+                err = f"{type(e).__name__}: {e}"
+            ms = (time.perf_counter() - t0) * 1000
+            with lock:
+                latencies.append(ms)
+                if not ok:
+                    errors.append(err)
+
+    ts = [threading.Thread(target=desk, args=(t,)) for t in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+
+    out.put({
+        "proc": proc, "latencies": latencies, "errors": errors,
+        "stats": database.write_queue_stats(),
+    })
+
+
+def main():
+    p = harness.parser("Multi-process write stress test", journal="WAL")
+    p.add_argument("--procs", type=int, default=4)
+    p.add_argument("--threads", type=int, default=3)
+    p.add_argument("--saves", type=int, default=100, help="per thread")
+    p.add_argument("--busy-ms", type=int, default=5000)
+    p.add_argument("--no-queue", action="store_true")
+    args = p.parse_args()
+
+    ctx = mp.get_context("spawn")
+    with harness.generated_db("stress.db", scale=0.01, journal=args.journal) as db:
+        db_path = db.path
+
+        out = ctx.Queue()
+        procs = [
+            ctx.Process(target=worker, args=(
+                db_path, n, args.threads, args.saves, not args.no_queue,
+                args.journal.upper(), args.busy_ms, out,
+            ))
+            for n in range(args.procs)
+        ]
+        t0 = time.perf_counter()
+        for pr in procs:
+            pr.start()
+        results = [out.get() for _ in procs]
+        for pr in procs:
+            pr.join()
+        seconds = time.perf_counter() - t0
+
+        conn = sqlite3.connect(db_path)
+        saved = conn.execute("SELECT COUNT(*) FROM invoices WHERE invoice_number LIKE 'SAN/INV/MP/%'").fetchone()[0]
+        saved += conn.execute("SELECT COUNT(*) FROM jobs WHERE job_no LIKE 'SAN/JOB/MP/%'").fetchone()[0]
+        conn.close()
+
+    lat = [ms for r in results for ms in r["latencies"]]
+    errors = [e for r in results for e in r["errors"]]
+    attempted = args.procs * args.threads * args.saves
+
+    print(f"mode:       {'plain commits' if args.no_queue else 'writer queue'}, "
+          f"journal {args.journal.upper()}, busy timeout {args.busy_ms} ms, "
+          f"{args.procs} procs x {args.threads} threads")
+    print(f"saves:      {attempted} attempted, {attempted - len(errors)} ok, "
+          f"{len(errors)} failed, {saved} in db, {seconds:.2f} s "
+          f"({saved / seconds:.0f}/s)")
+    print(f"latency:    {harness.latency(lat)}")
+    if not args.no_queue:
+        groups = sum(r["stats"]["groups"] for r in results)
+        print(f"groups:     {groups} commits, "
+              f"max group {max(r['stats']['max_group'] for r in results)}, "
+              f"busy retries {sum(r['stats']['retries'] for r in results)}, "
+              f"gave up {sum(r['stats']['busy_failures'] for r in results)}")
+    if errors:
+        print(f"first error: {errors[0]}")
+
+    return 1 if errors or saved != attempted - len(errors) else 0
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,106 @@
+# benchmarks/bench_paste.py
+# Pasting an Excel rate sheet into the item grid
+#
+#   python benchmarks/bench_paste.py                 -> 1,000 rows
+#   python benchmarks/bench_paste.py --rows 100
+#
+# Builds a tab-separated block (Description, HSN, Cur, Rate, Qty, then the
+# computed Amount / Taxable columns as Excel would carry them, CGST %, ...)
+# with a header line, thousands separators and "%" signs, two thirds of the
+# descriptions from the charges master. Fills an offscreen InvoiceForm:
+#   row by row   add_row() + set the description + setText per cell, with
+#                itemChanged live (what entering the sheet by hand costs)
+#   paste        paste_items(): one charges lookup, signals held, one
+#                recalculation pass
+# Exits 1 if the two grids end with different items.
+
+import random
+
+import harness
+import database
+
+EXTRA_CHARGES = ["Ocean Freight", "THC", "Documentation", "BL Fee", "DO Charges", "Seal Charges"]
+HEADER = "Description\tHSN/SAC\tCur\tRate\tQty\tAmount\tTaxable\tCGST %\tCGST\tSGST %\tSGST\tTotal"
+
+
+def rate_sheet(rnd, rows, names):
+    lines = [HEADER]
+    for i in range(rows):
+        desc = rnd.choice(names) if rnd.random() < 0.67 else f"Special handling {i}"
+        rate = rnd.uniform(100, 90000)
+        qty = rnd.randint(1, 5)
+        lines.append("\t".join([
+            desc, "996719", "INR", f"{rate:,.2f}", str(qty),
+            f"{rate * qty:,.2f}", f"{rate * qty:,.2f}", "9%", "", "9%", "", "",
+        ]))
+    return "\n".join(lines) + "\n"
+
+
+def by_hand(form, text):
+    """Row-by-row entry through the normal per-cell signal path."""
+    lines = text.splitlines()[1:]
+    for line in lines:
+        cells = line.split("\t")
+        form.add_row()
+        r = form.table.rowCount() - 1
+        form.set_row_description(r, cells[0])
+        for c, v in ((2, cells[1]), (3, cells[2]), (4, cells[3].replace(",", "")),
+                     (5, cells[4]), (8, cells[7].rstrip("%")), (10, cells[9].rstrip("%"))):
+            form.table.item(r, c).setText(v)
+
+
+def counted(form):
+    calls = {"rows": 0}
+    original = form._calc_row
+
+    def calc(*args):
+        calls["rows"] += 1
+        original(*args)
+    form._calc_row = calc
+    return calls
+
+
+def main():
+    p = harness.parser("Bulk paste benchmark")
+    p.add_argument("--rows", type=int, default=1000)
+    args = p.parse_args()
+
+    app = harness.qt_app()
+
+    with harness.generated_db("paste.db", empty=True):
+        for name in EXTRA_CHARGES:
+            database.add_charge(name, "996719", "INR", 9, 9)
+        names = [c["charge_name"] for c in database.list_charges()]
+        text = rate_sheet(random.Random(4), args.rows, names)
+
+        from invoice_form import InvoiceForm
+
+        results = {}
+        for label, fill in (("row by row", lambda f: by_hand(f, text)),
+                            ("paste", lambda f: f.paste_items(text))):
+            form = InvoiceForm()
+            form.preview.setVisible(False)
+            calls = counted(form)
+            seconds, _ = harness.timed(lambda: (fill(form), app.processEvents()))
+            items = form.collect_items()
+            results[label] = (seconds, calls["rows"], items)
+            form.autosave.enabled = False
+            form.close()
+
+    for label, (seconds, recalcs, items) in results.items():
+        print(f"{label:<11} {len(items):>5} rows in {seconds:6.2f} s "
+              f"({seconds / max(1, len(items)) * 1000:.2f} ms/row), "
+              f"{recalcs} row recalculations, total {sum(i['total_amt'] for i in items):,.2f}")
+
+    a, b = results["row by row"][2], results["paste"][2]
+    same = len(a) == len(b) == args.rows and all(
+        x["description"] == y["description"] and abs(x["total_amt"] - y["total_amt"]) < 0.005
+        for x, y in zip(a, b)
+    )
+    matched = sum(1 for i in b if i["description"] in names)
+    print(f"grids {'match' if same else 'DIFFER'}; {matched} rows mapped to the charges master")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,57 @@
+# benchmarks/bench_pdf.py
+# PDF render benchmark: asset cache on/off, page compression on/off
+#
+#   python benchmarks/bench_pdf.py -n 200
+#   python benchmarks/bench_pdf.py -n 200 --ttf    (embed reportlab's bundled Vera TTFs)
+
+import os
+import statistics
+import tempfile
+
+import harness
+import pdf_assets
+import pdf_generator
+
+
+def _run(n, compress, cached):
+    items = harness.sample_items(8, "Ocean Freight", "996521", rate=1250.0)
+    times, sizes = [], []
+    for i in range(n):
+        if not cached:
+            pdf_assets.clear_pdf_assets()
+        header = {
+            "invoice_number": f"BENCH/{i:05d}", "date": "2025-01-01",
+            "bill_to": "Apex Exports\n12 Industrial Estate\nMaharashtra - 400001\nIndia",
+        }
+        seconds, path = harness.timed(lambda: pdf_generator.generate_invoice_pdf(header, items, compress=compress))
+        times.append(seconds)
+        sizes.append(os.path.getsize(path))
+    return statistics.median(times) * 1000, statistics.mean(sizes)
+
+
+def main():
+    p = harness.parser("Benchmark generate_invoice_pdf")
+    p.add_argument("-n", type=int, default=100)
+    p.add_argument("--ttf", action="store_true")
+    args = p.parse_args()
+
+    if args.ttf:
+        pdf_assets.TTF_FONTS = {
+            "regular": ("BenchVera", "Vera.ttf", "Times-Roman"),
+            "bold": ("BenchVera-Bold", "VeraBd.ttf", "Times-Bold"),
+        }
+
+    with tempfile.TemporaryDirectory() as out:
+        pdf_generator.OUT_DIR = out
+        print(f"fonts: {pdf_assets.get_fonts()}  logo: {pdf_assets.get_logo() is not None}")
+        print(f"{'mode':28s} {'median ms':>10s} {'avg bytes':>10s}")
+        for cached in (False, True):
+            for compress in (False, True):
+                ms, size = _run(args.n, compress, cached)
+                label = f"{'cached' if cached else 'uncached'} / " \
+                        f"{'compressed' if compress else 'uncompressed'}"
+                print(f"{label:28s} {ms:10.2f} {size:10.0f}")
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,120 @@
+# benchmarks/bench_prefill.py
+# Charge history: suggestion query cost and form prefill time
+#
+#   python benchmarks/bench_prefill.py                 -> scale 0.05
+#   python benchmarks/bench_prefill.py --scale 0.2
+#
+# On a generated database:
+#   - get_charge_suggestions() (charge_usage) against the same answer
+#     computed from invoice_items on every pick, for the busiest customers
+#   - --saves invoices through insert_invoice, then checks the incrementally
+#     kept charge_usage equals a full rebuild_charge_usage()
+#   - an offscreen InvoiceForm: time from picking a customer to a filled,
+#     recalculated item table
+# Exits 1 if the incremental index and the rebuild disagree.
+
+import random
+import statistics
+
+import harness
+import database
+
+# What prefill would have to run without charge_usage
+HISTORY_SQL = """
+    SELECT lower(trim(it.description)) AS charge_key, COUNT(*) AS uses, MAX(i.date) AS last_used
+    FROM invoice_items it
+    JOIN invoices i ON i.id = it.invoice_id
+    LEFT JOIN jobs j ON j.id = i.job_id
+    WHERE COALESCE(i.customer_id, j.customer_id) = ?
+    GROUP BY 1 ORDER BY uses DESC, last_used DESC LIMIT ?
+"""
+
+
+def _usage_snapshot():
+    conn = database.get_conn()
+    rows = conn.execute(
+        "SELECT customer_id, charge_key, last_rate, uses, last_used FROM charge_usage "
+        "ORDER BY customer_id, charge_key"
+    ).fetchall()
+    conn.close()
+    return [tuple(r) for r in rows]
+
+
+def _save_invoices(rnd, n, customers, charges):
+    for i in range(n):
+        lines = rnd.sample(charges, rnd.randint(3, 8))
+        items = []
+        for sr, name in enumerate(lines, start=1):
+            rate = round(rnd.uniform(500, 20000), 2)
+            items.append({
+                "sr_no": sr, "description": name, "hsn_sac": "996719", "cur": "INR",
+                "rate": rate, "qty": 1.0, "amount": rate, "taxable_amount": rate,
+                "cgst_rate": 9.0, "cgst_amt": rate * 0.09, "sgst_rate": 9.0,
+                "sgst_amt": rate * 0.09, "total_amt": rate * 1.18,
+            })
+        database.insert_invoice({
+            "invoice_number": f"SAN/INV/PF/{i}",
+            "date": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "type": "INVOICE", "customer_id": rnd.choice(customers),
+            "total_amount": sum(it["total_amt"] for it in items),
+        }, items)
+
+
+def form_prefill(customer_id):
+    app = harness.qt_app()
+    from invoice_form import InvoiceForm
+
+    form = InvoiceForm()
+    idx = form.cbCustomer.findData(customer_id)
+    seconds, _ = harness.timed(lambda: (form.cbCustomer.setCurrentIndex(idx), app.processEvents()))
+    items = form.collect_items()
+    return seconds, items
+
+
+def main():
+    p = harness.parser("Charge history prefill benchmark", scale=0.05)
+    p.add_argument("--customers", type=int, default=20)
+    p.add_argument("--saves", type=int, default=300)
+    p.add_argument("--runs", type=int, default=5)
+    args = p.parse_args()
+
+    rnd = random.Random(5)
+    with harness.generated_db("prefill.db", scale=args.scale):
+        rebuild_s, indexed = harness.timed(database.rebuild_charge_usage)
+        print(f"rebuild:     {indexed} (customer, charge) rows in {rebuild_s:.2f} s")
+
+        conn = database.get_conn()
+        busiest = [r[0] for r in conn.execute(
+            "SELECT j.customer_id FROM invoices i JOIN jobs j ON j.id = i.job_id "
+            "GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT ?", (args.customers,)
+        )]
+        charges = [r[0] for r in conn.execute("SELECT DISTINCT description FROM invoice_items LIMIT 40")]
+        conn.close()
+
+        indexed_ms = [harness.median_ms(lambda c=c: database.get_charge_suggestions(c), args.runs) for c in busiest]
+
+        def scan(c):
+            conn = database.get_conn()
+            conn.execute(HISTORY_SQL, (c, database.PREFILL_LIMIT)).fetchall()
+            conn.close()
+        scan_ms = [harness.median_ms(lambda c=c: scan(c), args.runs) for c in busiest]
+        print(f"suggestions: charge_usage median {statistics.median(indexed_ms):.2f} ms, "
+              f"invoice_items scan median {statistics.median(scan_ms):.2f} ms "
+              f"({len(busiest)} busiest customers)")
+
+        save_s, _ = harness.timed(lambda: _save_invoices(rnd, args.saves, busiest, charges))
+        incremental = _usage_snapshot()
+        database.rebuild_charge_usage()
+        rebuilt = _usage_snapshot()
+        same = incremental == rebuilt
+        print(f"saves:       {args.saves} in {save_s:.2f} s; incremental index "
+              f"{'matches' if same else 'DIFFERS FROM'} rebuild ({len(rebuilt)} rows)")
+
+        seconds, items = form_prefill(busiest[0])
+        print(f"form:        customer pick -> {len(items)} lines filled in {seconds * 1000:.0f} ms, "
+              f"total {sum(it['total_amt'] for it in items):,.2f}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,94 @@
+# benchmarks/bench_rates.py
+# Effective-dated charge rates: re-pricing historical invoice lines
+#
+#   python benchmarks/bench_rates.py                 -> scale 0.034 (~100k lines)
+#   python benchmarks/bench_rates.py --scale 0.2
+#
+# Gives every datagen charge a few rate changes across the data's date
+# range (update_charge with effective_from), then re-prices every saved
+# line at the rate in force on its invoice date, intra- or inter-state by
+# the customer's GSTIN:
+#   per-line lookup   get_charge_rate-style indexed SELECT per line
+#   rate table        list_charge_rates() once into gst_rules.RateTable,
+#                     reprice_line() (bisect) per line
+# Exits 1 if the two disagree on any line.
+
+import random
+
+import harness
+import database
+import gst_rules
+
+CHANGE_DATES = ["2023-10-01", "2024-04-01", "2024-07-01", "2025-01-01", "2025-07-01"]
+SLABS = [(2.5, 2.5), (6.0, 6.0), (9.0, 9.0), (14.0, 14.0)]
+
+LINES_SQL = """
+    SELECT it.id, it.description, it.hsn_sac, it.rate, it.qty, i.date,
+           substr(c.gstin, 1, 2) AS place
+    FROM invoice_items it
+    JOIN invoices i ON i.id = it.invoice_id
+    LEFT JOIN jobs j ON j.id = i.job_id
+    LEFT JOIN consignees c ON c.id = j.customer_id
+"""
+
+
+def add_history(rnd):
+    changes = 0
+    for ch in database.list_charges():
+        for d in rnd.sample(CHANGE_DATES, rnd.randint(1, 3)):
+            cgst, sgst = rnd.choice(SLABS)
+            database.update_charge(ch["id"], ch["charge_name"], ch["hsn_sac"], ch["currency"],
+                                   cgst, sgst, effective_from=d)
+            changes += 1
+    return changes
+
+
+def per_line(lines, home):
+    conn = database.get_conn()
+    cur = conn.cursor()
+    ids = {c["charge_name"].strip().lower(): c["id"] for c in database.list_charges()}
+    out = {}
+    for ln in lines:
+        r = database._charge_rate_at(cur, ids[ln["description"].strip().lower()], ln["date"])
+        taxable = ln["rate"] * ln["qty"]
+        gst = r["igst_rate"] if gst_rules.supply_type(ln["place"], home) == gst_rules.INTER \
+            else r["cgst_rate"] + r["sgst_rate"]
+        out[ln["id"]] = taxable + taxable * gst / 100
+    conn.close()
+    return out
+
+
+def rate_table(lines, home):
+    table = gst_rules.rate_table()
+    out = {}
+    for ln in lines:
+        it = gst_rules.reprice_line(dict(ln), gst_rules.supply_type(ln["place"], home), ln["date"], table)
+        out[ln["id"]] = it["total_amt"]
+    return out
+
+
+def main():
+    p = harness.parser("Charge rate history benchmark", scale=0.034)
+    args = p.parse_args()
+
+    rnd = random.Random(6)
+    with harness.generated_db("rates.db", scale=args.scale):
+        changes = add_history(rnd)
+
+        conn = database.get_conn()
+        lines = [dict(r) for r in conn.execute(LINES_SQL)]
+        conn.close()
+        home = gst_rules.home_state_code()
+
+        naive_s, naive = harness.timed(lambda: per_line(lines, home))
+        fast_s, fast = harness.timed(lambda: rate_table(lines, home))
+
+    bad = sum(1 for k, v in naive.items() if abs(fast[k] - v) > 1e-6)
+    print(f"{len(lines)} lines, {changes} rate changes over {len(CHANGE_DATES)} dates")
+    print(f"per-line lookup: {harness.throughput(naive_s, len(lines), 'lines')}")
+    print(f"rate table:      {harness.throughput(fast_s, len(lines), 'lines', 'incl. compile')}")
+    return harness.check(bad, "lines disagree")
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,73 @@
+# benchmarks/bench_rows.py
+# Memory / time: list_jobs() dict lists vs. iter_jobs() streaming rows
+#
+#   python benchmarks/bench_rows.py                 -> 100k jobs
+#   python benchmarks/bench_rows.py --jobs 20000
+#
+# Each case walks every job once (as an export would) and reports the
+# Python heap peak while doing so (tracemalloc) plus wall time measured in
+# a separate untraced pass. "kept" cases hold all rows in memory at once,
+# "streamed" cases only ever hold one fetchmany() chunk.
+
+import gc
+import tracemalloc
+
+import harness
+import database
+
+EXPORT_COLUMNS = ("id", "job_no", "pol", "pod", "etd", "status")
+
+
+def _consume(rows):
+    n = 0
+    for r in rows:
+        n += 1
+    return n
+
+
+def cases():
+    return [
+        ("list_jobs()                  kept", lambda: _consume(database.list_jobs())),
+        ("list(iter_jobs())  slots     kept", lambda: _consume(list(database.iter_jobs()))),
+        ("list(iter_jobs())  tuple     kept", lambda: _consume(list(database.iter_jobs(row="tuple")))),
+        ("iter_jobs()        dict  streamed", lambda: _consume(database.iter_jobs(row="dict"))),
+        ("iter_jobs()        slots streamed", lambda: _consume(database.iter_jobs())),
+        ("iter_jobs(6 cols)  slots streamed",
+         lambda: _consume(database.iter_jobs(columns=EXPORT_COLUMNS))),
+        ("iter_jobs(6 cols)  tuple streamed",
+         lambda: _consume(database.iter_jobs(columns=EXPORT_COLUMNS, row="tuple"))),
+    ]
+
+
+def measure(fn):
+    gc.collect()
+    seconds, rows = harness.timed(fn)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, seconds, peak
+
+
+def main():
+    p = harness.parser("list_* vs iter_* memory benchmark")
+    p.add_argument("--jobs", type=int, default=100_000)
+    args = p.parse_args()
+
+    volumes = {"consignees": 1000, "jobs": args.jobs, "invoices": 1, "items": 1}
+    with harness.generated_db("rows.db", volumes=volumes):
+
+        print(f"{'case':<36} {'rows':>8} {'seconds':>8} {'peak MB':>8}")
+        base = None
+        for name, fn in cases():
+            rows, seconds, peak = measure(fn)
+            base = base or peak
+            print(f"{name:<36} {rows:>8} {seconds:>8.3f} {peak / 2**20:>8.1f}"
+                  f"  ({peak / base:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,134 @@
+# benchmarks/bench_service.py
+# Localhost check for data_service.py: several desks saving at once
+#
+#   python benchmarks/bench_service.py                  -> 12 clients x 100 ops
+#   python benchmarks/bench_service.py --clients 3 --ops 500
+#
+# Starts a service on a free localhost port over a generated database and
+# drives it with DataClient threads (invoice + job saves, dropdown reads,
+# one deliberate duplicate job_no per client). With --direct the same saves
+# are also run straight against a second database, one commit per save.
+# Exits 1 if a save is lost, a duplicate is accepted, or another error occurs.
+
+import sqlite3
+import threading
+import time
+
+import harness
+import database
+from data_client import DataClient
+from data_service import start_in_thread
+
+ITEMS = harness.sample_items(4, "Ocean Freight", "996521")
+
+
+def desk(call, tag, ops, result):
+    saves, dup_rejected, errors = 0, 0, []
+    t0 = time.perf_counter()
+    for i in range(ops):
+        try:
+            if i % 4 == 0:
+                call("insert_job", {"job_no": f"SAN/JOB/SVC/{tag}/{i}", "status": "OPEN"})
+                saves += 1
+            elif i % 4 == 3:
+                call("list_open_jobs_for_dropdown")
+            else:
+                call("insert_invoice", {
+                    "invoice_number": f"SAN/INV/SVC/{tag}/{i}",
+                    "date": "2025-03-31", "type": "INVOICE", "total_amount": 4720.0,
+                }, ITEMS)
+                saves += 1
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+    # Same job_no twice: the second must fail alone, not take the group down
+    try:
+        call("insert_job", {"job_no": f"SAN/JOB/SVC/{tag}/0", "status": "OPEN"})
+        errors.append("duplicate job_no accepted")
+    except sqlite3.IntegrityError:
+        dup_rejected += 1
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+
+    result.update(
+        saves=saves, dup_rejected=dup_rejected, errors=errors,
+        seconds=time.perf_counter() - t0,
+    )
+
+
+def run_desks(make_call, clients, ops):
+    results = [{} for _ in range(clients)]
+    threads = [
+        threading.Thread(target=desk, args=(make_call(), f"D{n}", ops, results[n]))
+        for n in range(clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - t0
+
+
+def count_saved(db_path):
+    conn = sqlite3.connect(db_path)
+    inv = conn.execute("SELECT COUNT(*) FROM invoices WHERE invoice_number LIKE 'SAN/INV/SVC/%'").fetchone()[0]
+    jobs = conn.execute("SELECT COUNT(*) FROM jobs WHERE job_no LIKE 'SAN/JOB/SVC/%'").fetchone()[0]
+    conn.close()
+    return inv + jobs
+
+
+def report(label, results, seconds, saved):
+    saves = sum(r["saves"] for r in results)
+    errors = [e for r in results for e in r["errors"]]
+    print(f"{label:<8} {saves} saves in {seconds:.2f} s ({saves / seconds:.0f}/s), "
+          f"in db={saved}, duplicates rejected={sum(r['dup_rejected'] for r in results)}, "
+          f"errors={len(errors)}")
+    for e in errors[:3]:
+        print(f"         {e}")
+    return saves, errors
+
+
+def main():
+    p = harness.parser("Data service localhost check", scale=0.01)
+    p.add_argument("--clients", type=int, default=12)
+    p.add_argument("--ops", type=int, default=100)
+    p.add_argument("--direct", action="store_true", help="also run without the service")
+    args = p.parse_args()
+
+    failed = False
+    with harness.generated_db("service.db", scale=args.scale) as svc:
+        # Through the service
+        svc_db = svc.path
+        service, port, stop = start_in_thread(token="bench")
+        url = f"http://127.0.0.1:{port}"
+        try:
+            results, seconds = run_desks(
+                lambda: DataClient(url, token="bench").call, args.clients, args.ops
+            )
+            st = service.snapshot_stats()
+        finally:
+            stop()
+        saves, errors = report("service", results, seconds, count_saved(svc_db))
+        print(f"         {st['groups']} commits for {st['writes']} writes "
+              f"(avg group {st['avg_group']:.1f}, max {st['max_group']}), "
+              f"{st['reads']} reads")
+        failed |= bool(errors) or count_saved(svc_db) != saves
+        failed |= sum(r["dup_rejected"] for r in results) != args.clients
+
+    if not args.direct:
+        return 1 if failed else 0
+
+    # Direct: every desk opens the file, one commit per save
+    with harness.generated_db("direct.db", scale=args.scale) as direct:
+        results, seconds = run_desks(
+            lambda: (lambda op, *a, **kw: getattr(database, op)(*a, **kw)),
+            args.clients, args.ops,
+        )
+        report("direct", results, seconds, count_saved(direct.path))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,136 @@
+# benchmarks/bench_validate.py
+# Document validation throughput: the form's old three passes vs the engine
+#
+#   python benchmarks/bench_validate.py                  -> 100k documents
+#   python benchmarks/bench_validate.py --docs 1000000
+#
+# Builds documents of 1-12 lines as the grid holds them (cell text), with
+# a few zero rates / quantities / GST rates, bad GSTINs and inter-state
+# customers mixed in, then times:
+#   three passes   what save_document used to do: collect_items, then
+#                  validate_items_before_save, validate_items and a
+#                  per-row loop parsing the cells again
+#   engine         collect_items, then validation.validate_document (all
+#                  header and line rules, GSTIN checksum included)
+#   batch          validation.validate_batch over already parsed documents
+#   same rules     the engine with only the two rules the old passes had
+#                  (rules are data, so the rule set is just swapped)
+# Best of --repeat runs each. Checks that every row the old passes flagged
+# gets a finding from the engine. Exits 1 if one does not.
+
+import random
+
+import harness
+import validation
+from datagen import CHARGES, STATES
+from gst_rules import INTER, INTRA, gstin_check_char, supply_type
+
+HOME = "27"
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def _gstin(rnd, code):
+    g = f"{code}{''.join(rnd.choice(LETTERS) for _ in range(5))}{rnd.randint(0, 9999):04d}{rnd.choice(LETTERS)}1Z"
+    if rnd.random() < 0.01:
+        return g + rnd.choice("0123456789")      # check character usually wrong
+    return g + gstin_check_char(g)
+
+
+def make_docs(rnd, n):
+    docs = []
+    for _ in range(n):
+        state, code = rnd.choice(STATES)
+        supply = supply_type(code, HOME)
+        rows = []
+        for _ in range(rnd.randint(1, 12)):
+            name, hsn, cur = rnd.choice(CHARGES)
+            rate = "0" if rnd.random() < 0.01 else f"{rnd.uniform(500, 50000):.2f}"
+            qty = "0" if rnd.random() < 0.005 else str(rnd.randint(1, 4))
+            gst = "0" if rnd.random() < 0.01 else "9"
+            cgst, sgst, igst = (gst, gst, "0") if supply == INTRA else ("0", "0", str(2 * float(gst)))
+            # description, hsn, cur, rate, qty, cgst %, sgst %, igst %, ex. rate
+            rows.append([name, hsn, cur, rate, qty, cgst, sgst, igst, "83.1" if cur != "INR" else "1"])
+        header = {"date": "2025-06-30", "bill_to": f"{state} office", "place_of_supply": code,
+                  "supply_type": supply}
+        docs.append((header, rows, _gstin(rnd, code), {"state_code": code}))
+    return docs
+
+
+def collect(rows):
+    items = []
+    for r, (desc, hsn, cur, rate, qty, cgst, sgst, igst, fx) in enumerate(rows, start=1):
+        items.append({
+            "sr_no": r, "description": desc, "hsn_sac": hsn, "cur": cur,
+            "rate": float(rate or 0), "qty": float(qty or 0),
+            "cgst_rate": float(cgst or 0), "sgst_rate": float(sgst or 0),
+            "igst_rate": float(igst or 0), "fx_rate": float(fx or 1),
+        })
+    return items
+
+
+def three_passes(docs):
+    flagged = []
+    for header, rows, _, _ in docs:
+        items = collect(rows)
+        rows_hit = set()
+        for i, it in enumerate(items, start=1):       # validate_items_before_save
+            if it["rate"] <= 0 or it["qty"] <= 0:
+                rows_hit.add(i)
+            if it["cgst_rate"] <= 0 and it["sgst_rate"] <= 0 and it["igst_rate"] <= 0:
+                rows_hit.add(i)
+        for i, it in enumerate(items, start=1):       # validate_items
+            if it["rate"] == 0 or it["qty"] == 0:
+                rows_hit.add(i)
+            if it["cgst_rate"] == 0 and it["sgst_rate"] == 0 and it["igst_rate"] == 0:
+                rows_hit.add(i)
+        for i, cells in enumerate(rows, start=1):     # per-row loop over the cells
+            rate, qty = float(cells[3] or 0), float(cells[4] or 0)
+            cgst, sgst, igst = float(cells[5] or 0), float(cells[6] or 0), float(cells[7] or 0)
+            if header["supply_type"] == INTER:
+                cgst = sgst = 0
+            else:
+                igst = 0
+            if rate == 0 or qty == 0 or (cgst == 0 and sgst == 0 and igst == 0):
+                rows_hit.add(i)
+        flagged.append(rows_hit)
+    return flagged
+
+
+def engine(docs):
+    return [validation.validate_document(h, collect(rows), gstin, addr, HOME)
+            for h, rows, gstin, addr in docs]
+
+
+def main():
+    p = harness.parser("Validation engine benchmark", repeat=3)
+    p.add_argument("--docs", type=int, default=100_000)
+    args = p.parse_args()
+
+    docs = make_docs(random.Random(9), args.docs)
+    n_lines = sum(len(rows) for _, rows, _, _ in docs)
+
+    old_s, old = harness.best(lambda: three_passes(docs), args.repeat)
+    new_s, new = harness.best(lambda: engine(docs), args.repeat)
+    parsed = [(h, collect(rows), gstin, addr) for h, rows, gstin, addr in docs]
+    batch_s, _ = harness.best(lambda: validation.validate_batch(parsed, HOME), args.repeat)
+
+    rules = validation.HEADER_RULES, validation.LINE_RULES
+    validation.HEADER_RULES = ()
+    validation.LINE_RULES = tuple(r for r in rules[1] if r.code in ("rate_qty_zero", "gst_missing"))
+    same_s, _ = harness.best(lambda: engine(docs), args.repeat)
+    validation.HEADER_RULES, validation.LINE_RULES = rules
+
+    missed = sum(1 for hit, findings in zip(old, new) if hit - {f.row for f in findings})
+    n_err = sum(1 for f in new if validation.errors(f))
+    n_warn = sum(1 for f in new if validation.warnings(f))
+    print(f"{args.docs} documents, {n_lines} lines; engine: {n_err} with errors, {n_warn} with warnings")
+    n_rules = len(validation.HEADER_RULES) + len(validation.LINE_RULES)
+    print(f"three passes: {harness.throughput(old_s, args.docs, 'docs', '2 rules')}")
+    print(f"engine:       {harness.throughput(new_s, args.docs, 'docs', f'{n_rules} rules')}")
+    print(f"batch:        {harness.throughput(batch_s, args.docs, 'docs', 'parsed documents')}")
+    print(f"same rules:   {harness.throughput(same_s, args.docs, 'docs', '2 rules')}")
+    return harness.check(missed, "documents with rows the engine missed")
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,155 @@
+# benchmarks/harness.py
+# Shared plumbing for the benchmark scripts in this directory
+#
+#   import harness                  # first: puts src/ on sys.path
+#   import database
+#
+#   def main():
+#       args = harness.parser("What it measures", scale=0.05).parse_args()
+#       with harness.generated_db("fx.db", scale=args.scale) as db:
+#           seconds, totals = harness.timed(lambda: work(db.path))
+#       print(f"work:  {harness.throughput(seconds, len(totals), 'docs')}")
+#       return harness.check(bad, "totals disagree")
+#
+#   if __name__ == "__main__":
+#       harness.run(main)
+#
+# Every script works on its own generated database in a temporary
+# directory (never data.db), prints one line per measurement and exits 1
+# when its check fails.
+
+import argparse
+import contextlib
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+GeneratedDb = namedtuple("GeneratedDb", "path counts tmp")
+
+
+# =====================================================
+# SETUP
+# =====================================================
+def parser(description, **defaults):
+    """ArgumentParser with whichever common options get a default here:
+    scale (datagen scale), journal (journal mode), repeat (best of N)."""
+    p = argparse.ArgumentParser(description=description)
+    if "scale" in defaults:
+        p.add_argument("--scale", type=float, default=defaults["scale"])
+    if "journal" in defaults:
+        p.add_argument("--journal", default=defaults["journal"])
+    if "repeat" in defaults:
+        p.add_argument("--repeat", type=int, default=defaults["repeat"])
+    return p
+
+
+@contextlib.contextmanager
+def generated_db(name="bench.db", scale=0.05, volumes=None, seed=42, journal=None, empty=False):
+    """A generated database (or an empty one) in a temporary directory,
+    opened through database.py: DB_PATH set and init_db() run in the
+    journal mode under test. Yields GeneratedDb(path, counts, tmp)."""
+    # database.py reads its SANSHIP_* settings on import; scripts that set
+    # them (multiprocess workers) import it themselves, later
+    import database
+    from datagen import generate
+
+    if journal:
+        database.JOURNAL_MODE = journal.upper()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, name)
+        if empty:
+            database.DB_PATH = path
+            counts = {}
+        else:
+            counts = generate(path, seed=seed, scale=scale, log=lambda *a: None, volumes=volumes)
+        # datagen writes with journal_mode=OFF; re-apply the mode under test
+        database.init_db()
+        yield GeneratedDb(path, counts, tmp)
+
+
+def copy_db(src, dst):
+    """Page copy of src into dst (the same data for an A/B run)."""
+    with sqlite3.connect(src) as a, sqlite3.connect(dst) as b:
+        a.backup(b)
+    return dst
+
+
+def qt_app():
+    """The QApplication for form benchmarks (offscreen unless told otherwise)."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6 import QtWidgets
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def sample_items(n=1, description="THC", hsn_sac="996719", rate=1000.0):
+    """n identical INR lines at 9 + 9 % GST, as insert_invoice takes them."""
+    gst = rate * 0.09
+    return [{
+        "sr_no": sr, "description": description, "hsn_sac": hsn_sac, "cur": "INR",
+        "rate": rate, "qty": 1.0, "amount": rate, "taxable_amount": rate,
+        "cgst_rate": 9.0, "cgst_amt": gst, "sgst_rate": 9.0, "sgst_amt": gst,
+        "total_amt": rate + 2 * gst,
+    } for sr in range(1, n + 1)]
+
+
+# =====================================================
+# TIMING
+# =====================================================
+def timed(fn):
+    """(seconds, result) of one call."""
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def best(fn, repeat):
+    """(fastest seconds, last result) over repeat calls; this machine is noisy."""
+    fastest, result = None, None
+    for _ in range(repeat):
+        seconds, result = timed(fn)
+        fastest = seconds if fastest is None else min(fastest, seconds)
+    return fastest, result
+
+
+def median_ms(fn, runs):
+    return statistics.median(timed(fn)[0] * 1000 for _ in range(runs))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[max(0, int(len(values) * q) - 1)] if values else 0.0
+
+
+def latency(ms, label="saves"):
+    """'N saves, median .. ms, p95 .. ms, max .. ms' for a list of ms."""
+    if not ms:
+        return f"no {label}"
+    return (f"{len(ms)} {label}, median {statistics.median(ms):.1f} ms, "
+            f"p95 {percentile(ms, 0.95):.1f} ms, max {max(ms):.1f} ms")
+
+
+def throughput(seconds, n, unit, extra=""):
+    """'  1.23 s (4,567 unit/s, extra)'."""
+    return f"{seconds:6.2f} s ({n / seconds:,.0f} {unit}/s{', ' + extra if extra else ''})"
+
+
+# =====================================================
+# RESULT
+# =====================================================
+def check(bad, what, label="check:"):
+    """Print the check line; exit status 1 if anything was bad."""
+    print(f"{label:<18} {int(bad)} {what}")
+    return 1 if bad else 0
+
+
+def run(main):
+    sys.exit(main() or 0)
@@ -0,0 +1,355 @@
+# src/backup.py
+# Online backup of data.db: rotated, gzip-compressed snapshots
+#
+#   python src/backup.py now                 -> take a snapshot
+#   python src/backup.py list
+#   python src/backup.py verify PATH
+#   python src/backup.py restore PATH [--target data.db]   (app must be closed)
+#
+# Pages are copied PAGES_PER_STEP at a time with a short sleep in between,
+# so the writer thread keeps getting the lock while a backup runs. Under
+# WAL the copy holds one read transaction, so every step sees the same
+# snapshot and concurrent saves never force a restart. In rollback-journal
+# mode each step takes its own lock and a save in between restarts the
+# copy; after MAX_RESTARTS it finishes in a single step instead.
+#
+# Each snapshot is data-YYYYmmdd-HHMMSS.db.gz plus a .json manifest
+# (sha256 of the .gz, page count, row counts) used by verify.
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import database
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+BACKUP_DIR = os.path.join(BASE_DIR, "backups")
+
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005          # seconds between steps
+MAX_RESTARTS = 3
+KEEP = 7                    # snapshots kept by rotation
+INTERVAL_HOURS = 24
+
+COUNTED_TABLES = ("consignees", "consignee_addresses", "jobs", "invoices", "invoice_items", "charges_master")
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _row_counts(conn):
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+            for t in COUNTED_TABLES if t in tables}
+
+
+# =====================================================
+# SNAPSHOT
+# =====================================================
+class _Restarted(Exception):
+    pass
+
+
+def _copy_online(dst_path, pages, sleep, progress):
+    """Page-stepped sqlite3 backup of database.DB_PATH into dst_path."""
+    src = sqlite3.connect(database.DB_PATH, timeout=database.BUSY_TIMEOUT_MS / 1000,
+                          isolation_level=None)
+    dst = sqlite3.connect(dst_path)
+    stats = {"steps": 0, "restarts": 0, "pages": 0}
+    try:
+        wal = src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        if wal:
+            # Pin one snapshot for the whole copy; writers are not blocked
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+        last = [None]
+
+        def on_step(status, remaining, total):
+            stats["steps"] += 1
+            stats["pages"] = total
+            if last[0] is not None and remaining > last[0]:
+                stats["restarts"] += 1
+                if stats["restarts"] > MAX_RESTARTS:
+                    raise _Restarted()
+            last[0] = remaining
+            if progress:
+                progress(total - remaining, total)
+            time.sleep(sleep)
+
+        try:
+            src.backup(dst, pages=pages, progress=on_step)
+        except _Restarted:
+            # Saves keep landing between steps: copy the rest in one go
+            src.backup(dst, pages=-1)
+        if wal:
+            src.execute("COMMIT")
+    finally:
+        src.close()
+        dst.close()
+    return stats
+
+
+def backup_now(dest_dir=None, pages=PAGES_PER_STEP, sleep=STEP_SLEEP, keep=KEEP, progress=None):
+    """Take a compressed snapshot. Returns the manifest dict."""
+    dest_dir = dest_dir or BACKUP_DIR
+    os.makedirs(dest_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    gz_path = os.path.join(dest_dir, f"data-{stamp}.db.gz")
+
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=dest_dir) as tmp:
+        raw = os.path.join(tmp, "snapshot.db")
+        stats = _copy_online(raw, pages, sleep, progress)
+        copy_s = time.perf_counter() - t0
+
+        conn = sqlite3.connect(raw)
+        check = conn.execute("PRAGMA quick_check").fetchone()[0]
+        counts = _row_counts(conn)
+        conn.close()
+        if check != "ok":
+            raise sqlite3.DatabaseError(f"snapshot failed quick_check: {check}")
+
+        part = gz_path + ".part"
+        with open(raw, "rb") as f, gzip.open(part, "wb", compresslevel=6) as g:
+            shutil.copyfileobj(f, g, 1 << 20)
+        raw_size = os.path.getsize(raw)
+        os.replace(part, gz_path)
+
+    manifest = {
+        "file": os.path.basename(gz_path),
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "source": os.path.abspath(database.DB_PATH),
+        "sha256": _sha256(gz_path),
+        "db_size": raw_size,
+        "gz_size": os.path.getsize(gz_path),
+        "page_count": stats["pages"],
+        "steps": stats["steps"],
+        "restarts": stats["restarts"],
+        "rows": counts,
+        "copy_seconds": round(copy_s, 3),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    with open(gz_path[:-len(".db.gz")] + ".json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    rotate(dest_dir, keep)
+    return manifest
+
+
+def list_backups(dest_dir=None):
+    """Newest first: [(gz_path, manifest or None)]."""
+    dest_dir = dest_dir or BACKUP_DIR
+    if not os.path.isdir(dest_dir):
+        return []
+    out = []
+    for name in sorted(os.listdir(dest_dir), reverse=True):
+        if name.startswith("data-") and name.endswith(".db.gz"):
+            path = os.path.join(dest_dir, name)
+            out.append((path, _read_manifest(path)))
+    return out
+
+
+def _read_manifest(gz_path):
+    try:
+        with open(gz_path[:-len(".db.gz")] + ".json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def rotate(dest_dir=None, keep=KEEP):
+    for path, _ in list_backups(dest_dir)[keep:]:
+        for p in (path, path[:-len(".db.gz")] + ".json"):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+
+# =====================================================
+# VERIFY / RESTORE
+# =====================================================
+def _decompress(gz_path, out_path):
+    with gzip.open(gz_path, "rb") as g, open(out_path, "wb") as f:
+        shutil.copyfileobj(g, f, 1 << 20)
+
+
+def verify_backup(gz_path):
+    """Checksum, integrity_check and row counts against the manifest.
+
+    Returns {"ok": bool, "problems": [...], ...}.
+    """
+    problems = []
+    manifest = _read_manifest(gz_path)
+    if manifest is None:
+        problems.append("manifest missing")
+    elif _sha256(gz_path) != manifest["sha256"]:
+        problems.append("sha256 mismatch")
+
+    counts = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, "verify.db")
+        try:
+            _decompress(gz_path, raw)
+            conn = sqlite3.connect(raw)
+            check = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            counts = _row_counts(conn)
+            conn.close()
+            if check != "ok":
+                problems.append(f"integrity_check: {check}")
+        except (OSError, EOFError, zlib.error, sqlite3.DatabaseError) as e:
+            problems.append(f"unreadable: {e}")
+
+    if manifest and counts and counts != manifest.get("rows"):
+        problems.append("row counts differ from manifest")
+    return {"ok": not problems, "problems": problems, "rows": counts, "manifest": manifest}
+
+
+def restore_backup(gz_path, target=None):
+    """Replace target (default data.db) with a verified snapshot.
+
+    The current file is first saved as a snapshot of its own. Run this with
+    the app closed.
+    """
+    target = target or database.DB_PATH
+    result = verify_backup(gz_path)
+    if not result["ok"]:
+        raise ValueError(f"{os.path.basename(gz_path)}: {'; '.join(result['problems'])}")
+
+    if os.path.exists(target):
+        saved, database.DB_PATH = database.DB_PATH, target
+        try:
+            backup_now(os.path.join(os.path.dirname(os.path.abspath(target)), "backups", "pre-restore"),
+                       pages=-1, sleep=0)
+        finally:
+            database.DB_PATH = saved
+
+    part = target + ".restore"
+    _decompress(gz_path, part)
+    for suffix in ("-wal", "-shm"):
+        try:
+            os.remove(target + suffix)
+        except OSError:
+            pass
+    os.replace(part, target)
+    return result
+
+
+# =====================================================
+# SCHEDULER
+# =====================================================
+class BackupScheduler(threading.Thread):
+    """Takes a snapshot when the newest one is older than interval_hours."""
+
+    def __init__(self, interval_hours=INTERVAL_HOURS, dest_dir=None, keep=KEEP, on_done=None):
+        super().__init__(name="db-backup", daemon=True)
+        self.interval = interval_hours * 3600
+        self.dest_dir = dest_dir
+        self.keep = keep
+        self.on_done = on_done
+        self.stop_event = threading.Event()
+        self.last_error = None
+
+    def due_in(self):
+        backups = list_backups(self.dest_dir)
+        if not backups:
+            return 0
+        age = time.time() - os.path.getmtime(backups[0][0])
+        return max(0, self.interval - age)
+
+    def run(self):
+        # Let the app finish starting before the first copy
+        if self.stop_event.wait(60):
+            return
+        while not self.stop_event.is_set():
+            wait = self.due_in()
+            if wait > 0:
+                self.stop_event.wait(min(wait, 3600))
+                continue
+            try:
+                manifest = backup_now(self.dest_dir, keep=self.keep)
+                self.last_error = None
+                if self.on_done:
+                    self.on_done(manifest)
+            except Exception as e:
+                self.last_error = str(e)
+                self.stop_event.wait(600)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def start_backup_scheduler():
+    """Started by the app / data service; settings: backup_interval_h, backup_keep."""
+    try:
+        hours = float(database.get_setting("backup_interval_h") or INTERVAL_HOURS)
+        keep = int(database.get_setting("backup_keep") or KEEP)
+    except (TypeError, ValueError):
+        hours, keep = INTERVAL_HOURS, KEEP
+    if hours <= 0:
+        return None
+    sched = BackupScheduler(hours, keep=keep)
+    sched.start()
+    return sched
+
+
+# =====================================================
+# CLI
+# =====================================================
+def main():
+    p = argparse.ArgumentParser(description="data.db snapshots")
+    p.add_argument("--db", help="database file (default: data.db in the app folder)")
+    p.add_argument("--dir", help="backup folder (default: backups/)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("now")
+    sub.add_parser("list")
+    v = sub.add_parser("verify")
+    v.add_argument("path")
+    r = sub.add_parser("restore")
+    r.add_argument("path")
+    r.add_argument("--target")
+    args = p.parse_args()
+
+    if args.db:
+        database.DB_PATH = args.db
+
+    if args.cmd == "now":
+        m = backup_now(args.dir)
+        print(f"{m['file']}: {m['db_size'] / 2**20:.1f} MB -> {m['gz_size'] / 2**20:.1f} MB, "
+              f"{m['steps']} steps, {m['restarts']} restarts, {m['seconds']:.1f} s")
+    elif args.cmd == "list":
+        for path, m in list_backups(args.dir):
+            info = f"{m['created_at']}  {m['gz_size'] / 2**20:.1f} MB" if m else "(no manifest)"
+            print(f"{os.path.basename(path)}  {info}")
+    elif args.cmd == "verify":
+        res = verify_backup(args.path)
+        print("OK" if res["ok"] else "FAILED: " + "; ".join(res["problems"]))
+        return 0 if res["ok"] else 1
+    elif args.cmd == "restore":
+        try:
+            restore_backup(args.path, args.target)
+        except ValueError as e:
+            print(f"not restored: {e}")
+            return 1
+        print(f"restored {os.path.basename(args.path)} -> {args.target or database.DB_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,36 @@
 # src/base_invoice_form.py
 from email import header
+import csv
+import io
+import json
 import os
+import sqlite3
 from datetime import datetime
-from PyQt6 import QtWidgets, uic, QtCore
+from PyQt6 import QtWidgets, uic, QtCore, QtGui
 from PyQt6.QtWidgets import QTableWidgetItem, QMessageBox
 from pyparsing import col
 from sqlalchemy import desc
 from tomlkit import value
 
 from database import (
-    insert_invoice,
+    address_text,
+    get_document,
+    save_invoice,
     list_customers,
     get_addresses_for_customer,
     list_open_jobs_for_dropdown,
-    get_job, list_charges
+    get_job, list_charges, get_charge_suggestions, get_customer
 )
+from gst_rules import (
+    INTRA, INTER, compute_line, line_rates, place_of_supply, rate_table, supply_type
+)
+from fx_rates import convert_items, is_foreign, rate_book
+from validation import errors, format_findings, validate_document, warnings
 
 from settings_manager import get_next_invoice_number
-from pdf_generator import generate_invoice_pdf
+from pdf_export import export_invoice_pdf
+from preview_pane import PreviewPane
+from draft_autosave import DraftAutosave, row_cells
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 
@@ -29,6 +42,9 @@ class BaseInvoiceForm(QtWidgets.QWidget):
     DOCUMENT_TITLE = "TAX INVOICE"
     UI_FILE = None   # must be set by child
 
+    # Form field -> invoices column, where the names differ
+    HEADER_COLUMNS = {"consignee": "ship_consigne"}
+
     def __init__(self):
         super().__init__()
 
@@ -82,6 +98,37 @@ class BaseInvoiceForm(QtWidgets.QWidget):
         self.btnSave = self.findChild(QtWidgets.QPushButton, "btnSave")
         self.btnPDF = self.findChild(QtWidgets.QPushButton, "btnExportPDF")
 
+        # IGST and exchange rate columns go after Total so the designer's
+        # column indexes stay put; set_supply() shows either CGST + SGST or IGST
+        self.table.setColumnCount(16)
+        self.table.setHorizontalHeaderItem(13, QTableWidgetItem("IGST %"))
+        self.table.setHorizontalHeaderItem(14, QTableWidgetItem("IGST Amt"))
+        self.table.setHorizontalHeaderItem(15, QTableWidgetItem("Ex. Rate"))
+        self.supply = INTRA
+        self.place_of_supply = None
+        self.show_supply_columns()
+
+        # -------------------------------
+        # Preview pane (right of the form)
+        # -------------------------------
+        self.preview = PreviewPane(self.preview_snapshot)
+        self.build_preview_layout()
+
+        # Customer's usual charges (charge_usage), refreshed on customer pick
+        self.charge_history = []
+        self.btnPrefill = QtWidgets.QPushButton("Prefill from History")
+        self.btnPrefill.setToolTip("Add this customer's usual charges at their last-billed rates")
+        for lay in self.findChildren(QtWidgets.QHBoxLayout):
+            idx = lay.indexOf(self.btnDelRow)
+            if idx >= 0:
+                lay.insertWidget(idx + 1, self.btnPrefill)
+                break
+
+        # -------------------------------
+        # Draft autosave (crash recovery)
+        # -------------------------------
+        self.autosave = DraftAutosave(self.DOCUMENT_TYPE, self.draft_snapshot, self)
+
         # -------------------------------
         # Init
         # -------------------------------
@@ -97,6 +144,7 @@ class BaseInvoiceForm(QtWidgets.QWidget):
         )
 
         self.cbCustomer.currentIndexChanged.connect(self.load_addresses)
+        self.cbCustomer.currentIndexChanged.connect(self.load_charge_history)
         self.cbAddress.currentIndexChanged.connect(self.apply_address)
 
         if self.cbJob:
@@ -104,17 +152,109 @@ class BaseInvoiceForm(QtWidgets.QWidget):
 
         self.btnAddRow.clicked.connect(self.add_row)
         self.btnDelRow.clicked.connect(self.delete_row)
+        self.btnPrefill.clicked.connect(lambda: self.prefill_from_history())
         self.table.itemChanged.connect(self.recalculate_row)
 
+        # Ctrl+V on the grid (not inside a cell editor): paste an Excel block
+        self.pasteShortcut = QtGui.QShortcut(QtGui.QKeySequence.StandardKey.Paste, self.table)
+        self.pasteShortcut.setContext(QtCore.Qt.ShortcutContext.WidgetShortcut)
+        self.pasteShortcut.activated.connect(lambda: self.paste_items())
+
         self.btnSave.clicked.connect(self.save_document)
         self.btnPDF.clicked.connect(self.export_pdf)
 
+        # Any edit -> debounced preview refresh and draft autosave
+        for schedule in (self.preview.schedule, self.autosave.schedule):
+            for w in (self.teBillTo, self.teConsignee):
+                if w:
+                    w.textChanged.connect(schedule)
+            self.leDate.textChanged.connect(schedule)
+            for w in [*self.ship_fields.values(), *self.cons_fields.values()]:
+                if isinstance(w, QtWidgets.QDateEdit):
+                    w.dateChanged.connect(schedule)
+                elif w is not None:
+                    w.textChanged.connect(schedule)
+            self.table.itemChanged.connect(schedule)
+            self.table.model().rowsRemoved.connect(schedule)
+        for cb in (self.cbCustomer, self.cbAddress, self.cbJob):
+            if cb:
+                cb.currentIndexChanged.connect(self.autosave.schedule)
+
+        self.autosave.set_baseline()
+
+    # ==================================================
+    def build_preview_layout(self):
+        # Move the designer layout into a left-hand body widget
+        body = QtWidgets.QWidget()
+        body.setLayout(self.layout())
+
+        self.splitter = QtWidgets.QSplitter(QtCore.Qt.Orientation.Horizontal)
+        self.splitter.addWidget(body)
+        self.splitter.addWidget(self.preview)
+        self.splitter.setStretchFactor(0, 3)
+        self.splitter.setStretchFactor(1, 2)
+
+        root = QtWidgets.QHBoxLayout(self)
+        root.setContentsMargins(0, 0, 0, 0)
+        root.addWidget(self.splitter)
+
+        # Toggle button (and New / Open…) next to Save
+        self.btnPreview = QtWidgets.QPushButton("Preview")
+        self.btnPreview.setCheckable(True)
+        self.btnPreview.setChecked(True)
+        self.btnPreview.toggled.connect(self.preview.setVisible)
+        self.btnOpen = QtWidgets.QPushButton("Open…")
+        self.btnOpen.setToolTip(f"Open a saved {self.DOCUMENT_TITLE.lower()} to view or edit")
+        self.btnOpen.clicked.connect(self.open_document)
+        self.btnNew = QtWidgets.QPushButton("New")
+        self.btnNew.setToolTip(f"Start the next {self.DOCUMENT_TITLE.lower()} with a new number")
+        self.btnNew.clicked.connect(self.new_document)
+        for lay in body.findChildren(QtWidgets.QHBoxLayout):
+            idx = lay.indexOf(self.btnSave)
+            if idx >= 0:
+                lay.insertWidget(idx, self.btnPreview)
+                lay.insertWidget(idx, self.btnOpen)
+                lay.insertWidget(idx, self.btnNew)
+                break
+
     # ==================================================
     def init_document(self):
+        # Saved document this form edits (opened with Open…); None for a new one
+        self.document_id = None
         self.leInvoiceNo.setText(get_next_invoice_number())
         self.leInvoiceNo.setReadOnly(True)
         self.leDate.setText(datetime.now().strftime("%Y-%m-%d"))
 
+    def new_document(self):
+        """Empty the form for the next document, under a new number."""
+        dirty = self.autosave.is_dirty()
+        if self.document_id is None and not dirty:
+            return      # already a blank new document; keep its number
+        if dirty:
+            reply = QMessageBox.question(
+                self, "New", f"Discard the unsaved changes to this {self.DOCUMENT_TITLE.lower()}?")
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        self.reset_document()
+
+    def reset_document(self):
+        self.autosave.enabled = False
+        try:
+            if self.cbJob:
+                self.load_jobs()
+            self.lock_job_fields(False)
+            self.clear_job_fields()
+            self.cbCustomer.setCurrentIndex(0)
+            if self.teBillTo:
+                self.teBillTo.clear()
+            self.table.setRowCount(0)
+            self.set_supply(None)
+            self.init_document()
+        finally:
+            self.autosave.enabled = True
+        self.autosave.mark_clean()
+        self.preview.schedule()
+
     # ==================================================
     def load_customers(self):
         self.cbCustomer.clear()
@@ -140,14 +280,22 @@ class BaseInvoiceForm(QtWidgets.QWidget):
             self.cbJob.addItem(j["job_no"], j["id"])
 
     # ==================================================
-    def load_charge_dropdown(self, row):
+    def ranked_charges(self):
+        """Charges master with this customer's charges first (most used), then A-Z."""
+        rank = {h["charge_key"]: i for i, h in enumerate(
+            sorted(self.charge_history, key=lambda h: -h["uses"]))}
+        return sorted(
+            list_charges(),
+            key=lambda c: rank.get(c["charge_name"].strip().lower(), len(rank))
+        )
+
+    def load_charge_dropdown(self, row, charges=None):
         combo = QtWidgets.QComboBox()
         combo.setEditable(True)
         combo.setInsertPolicy(QtWidgets.QComboBox.InsertPolicy.NoInsert)
         combo.addItem("-- Type or Select Charge --", None)
 
-
-        for c in list_charges():
+        for c in (charges if charges is not None else self.ranked_charges()):
             combo.addItem(
                 c["charge_name"],
                 c
@@ -155,6 +303,8 @@ class BaseInvoiceForm(QtWidgets.QWidget):
         combo.currentIndexChanged.connect(
             lambda _, r=row, cb=combo: self.apply_charge_to_row(r, cb)
         )
+        combo.currentTextChanged.connect(self.preview.schedule)
+        combo.currentTextChanged.connect(self.autosave.schedule)
 
         self.table.setCellWidget(row, 1, combo)
 
@@ -174,14 +324,73 @@ class BaseInvoiceForm(QtWidgets.QWidget):
                 item = QTableWidgetItem()
                 self.table.setItem(row, col, item)
             item.setText(str(value))
+        # Rates in force on the invoice date, not necessarily today's
+        table = rate_table()
+        date = self.leDate.text()
+        cgst, sgst, _ = table.lookup_charge(charge["charge_name"], INTRA, date) or (
+            charge.get("cgst_rate") or 0, charge.get("sgst_rate") or 0, 0)
+        _, _, igst = table.lookup_charge(charge["charge_name"], INTER, date) or (0, 0, cgst + sgst)
+
         set_col(2, charge.get("hsn_sac", ""))        # HSN/SAC
         set_col(3, charge.get("currency", "INR"))   # CUR
-        set_col(8, charge.get("cgst_rate", 0))      # CGST %
-        set_col(10, charge.get("sgst_rate", 0))     # SGST %
+        set_col(8, f"{cgst:g}")                     # CGST %
+        set_col(10, f"{sgst:g}")                    # SGST %
+        set_col(13, f"{igst:g}")                    # IGST %
 
     # DO NOT manually call recalculate_row
     # itemChanged signal will auto-trigger calculations
 
+    # ==================================================
+    # CHARGE HISTORY PREFILL
+    # ==================================================
+    def set_row_description(self, r, text):
+        """Pick the master charge named text (filling HSN / CUR / GST), or
+        type it as a manual charge. Returns True if the master had it."""
+        combo = self.table.cellWidget(r, 1)
+        idx = combo.findText(text, QtCore.Qt.MatchFlag.MatchFixedString)
+        if idx > 0:
+            combo.setCurrentIndex(idx)
+            return True
+        combo.setEditText(text)
+        return False
+
+    def load_charge_history(self):
+        cid = self.cbCustomer.currentData()
+        self.charge_history = get_charge_suggestions(cid) if cid else []
+        # Picking a customer (or a job, which picks its customer) on a
+        # blank invoice fills the usual lines straight away
+        self.prefill_from_history(only_if_empty=True)
+
+    def prefill_from_history(self, only_if_empty=False):
+        """Add the customer's usual charges with last-billed rate and qty.
+
+        Charges already on the invoice are skipped; blank rows are reused.
+        """
+        if not self.charge_history:
+            return
+        filled = [r for r in range(self.table.rowCount()) if self.row_description(r)]
+        if only_if_empty and filled:
+            return
+        present = {self.row_description(r).lower() for r in filled}
+        blank = [r for r in range(self.table.rowCount()) if r not in filled]
+
+        for h in self.charge_history:
+            if h["charge_key"] in present:
+                continue
+            if blank:
+                r = blank.pop(0)
+            else:
+                self.add_row()
+                r = self.table.rowCount() - 1
+
+            if not self.set_row_description(r, h["description"]):
+                self.table.item(r, 2).setText(h["hsn_sac"] or "")
+                self.table.item(r, 3).setText(h["cur"] or "INR")
+                self.table.item(r, 8).setText(str(h["cgst_rate"] or 0))
+                self.table.item(r, 10).setText(str(h["sgst_rate"] or 0))
+            self.table.item(r, 5).setText(str(h["last_qty"] or 1))
+            self.table.item(r, 4).setText(str(h["last_rate"] or 0))
+
     # ==================================================
     def lock_job_fields(self, locked: bool):
         job_locked_fields = {"shipper", "consignee", "pol", "pod"}
@@ -296,15 +505,11 @@ class BaseInvoiceForm(QtWidgets.QWidget):
 
     # ==================================================
     def apply_address(self):
+        self.update_supply()
         addr = self.cbAddress.currentData()
         if not addr:
             return
-        text = (
-            f"{addr['label']}\n"
-            f"{addr['address']}\n"
-            f"{addr['state']} - {addr['pincode']}\n"
-            f"{addr['country']}"
-        )
+        text = address_text(addr)
         self.teBillTo.setPlainText(text)
         self.teConsignee.setPlainText(text)
 
@@ -312,14 +517,19 @@ class BaseInvoiceForm(QtWidgets.QWidget):
     # TABLE LOGIC (UNCHANGED)
     # ==================================================
     def add_row(self):
-        r = self.table.rowCount()
-        self.table.insertRow(r)
-        self.table.setItem(r, 0, QTableWidgetItem(str(r + 1)))
-
-        for c in range(2, 13):
-            self.table.setItem(r, c, QTableWidgetItem(""))
+        self.add_rows(1)
 
-        self.load_charge_dropdown(r)
+    def add_rows(self, n, charges=None):
+        """Append n blank rows (one charges lookup). Returns the first new row."""
+        first = self.table.rowCount()
+        charges = charges if charges is not None else self.ranked_charges()
+        self.table.setRowCount(first + n)
+        for r in range(first, first + n):
+            self.table.setItem(r, 0, QTableWidgetItem(str(r + 1)))
+            for c in range(2, self.table.columnCount()):
+                self.table.setItem(r, c, QTableWidgetItem(""))
+            self.load_charge_dropdown(r, charges)
+        return first
 
 
     def delete_row(self):
@@ -328,169 +538,305 @@ class BaseInvoiceForm(QtWidgets.QWidget):
             self.table.removeRow(r)
 
     def recalculate_row(self, item):
-        r = item.row()
+        if item.column() == 3:
+            # New currency: the old exchange rate no longer applies
+            fx = self.table.item(item.row(), 15)
+            if fx is not None and fx.text():
+                self.table.blockSignals(True)
+                fx.setText("")
+                self.table.blockSignals(False)
+        self.recalculate_rows([item.row()])
+
+    def recalculate_rows(self, rows):
+        """Recompute amount / GST / total cells with table signals held once."""
+        book = rate_book()      # one currency rate lookup for the whole batch
+        self.table.blockSignals(True)
+        try:
+            for r in rows:
+                self._calc_row(r, book)
+        finally:
+            self.table.blockSignals(False)
+
+    def _cell_text(self, r, c):
+        item = self.table.item(r, c)
+        return item.text().strip() if item else ""
+
+    def _cell_value(self, r, c):
+        try:
+            return float(self._cell_text(r, c) or 0)
+        except ValueError:
+            return 0.0
+
+    def _calc_row(self, r, book=None):
+        shown = self.SUPPLY_RATE_COLS[self.supply]
+        line = {
+            "rate": self._cell_value(r, 4),
+            "qty": self._cell_value(r, 5),
+            "hsn_sac": self._cell_text(r, 2),
+            "cur": self._cell_text(r, 3),
+        }
 
-        def val(col):
-            try:
-                return float(self.table.item(r, col).text() or 0)
-            except Exception:
-                return 0.0
+        # Foreign currency: typed exchange rate, else the rate on the
+        # invoice date, else the job's exchange rate
+        if is_foreign(line["cur"]):
+            if self._cell_text(r, 15):
+                line["fx_rate"] = self._cell_value(r, 15)
+            else:
+                job_rate = self.cons_fields.get("exchange_rate")
+                convert_items([line], self.leDate.text(), book,
+                              job_rate.text() if job_rate is not None else None)
+                if line["fx_rate"] != 1:
+                    self.table.item(r, 15).setText(f"{line['fx_rate']:g}")
+        elif self._cell_text(r, 15):
+            self.table.item(r, 15).setText("")
+        if any(self._cell_text(r, self.RATE_COLS[f]) for f in shown):
+            line.update({f: self._cell_value(r, self.RATE_COLS[f]) for f in shown})
+        else:
+            # GST % cells for this supply are blank (prefill / paste / charge
+            # pick fill CGST + SGST): carry the other cells' rate over, or
+            # take the HSN/SAC rate from the rate table
+            line.update({f: self._cell_value(r, c) for f, c in self.RATE_COLS.items()})
+            table = None
+            if line["hsn_sac"] and not any(line[f] for f in self.RATE_COLS):
+                table = rate_table()
+            rates = dict(zip(self.RATE_COLS, line_rates(line, self.supply, table, self.leDate.text())))
+            for f in shown:
+                if rates[f]:
+                    self.table.item(r, self.RATE_COLS[f]).setText(f"{rates[f]:g}")
+            line.update(rates)
+
+        compute_line(line, self.supply)
+
+        self._set(r, 6, line["amount"])             # Amount
+        self._set(r, 7, line["taxable_amount"])     # Taxable Amount
+        self._set(r, 9, line["cgst_amt"])           # CGST Amount
+        self._set(r, 11, line["sgst_amt"])          # SGST Amount
+        self._set(r, 14, line["igst_amt"])          # IGST Amount
+        self._set(r, 12, line["total_amt"])         # Total
 
-        rate = val(4)
-        qty = val(5)
-        cgst_rate = val(8)
-        sgst_rate = val(10)
 
-        taxable = rate * qty
-        cgst_amt = taxable * cgst_rate / 100
-        sgst_amt = taxable * sgst_rate / 100
-        total = taxable + cgst_amt + sgst_amt
+    def _set(self, r, c, v):
+        item = self.table.item(r, c)
+        if item is None:
+            self.table.setItem(r, c, QTableWidgetItem(f"{v:.2f}"))
+        else:
+            item.setText(f"{v:.2f}")
 
-        self._set(r, 6, taxable)       # Amount
-        self._set(r, 7, taxable)       # Taxable Amount
-        self._set(r, 9, cgst_amt)      # CGST Amount
-        self._set(r, 11, sgst_amt)     # SGST Amount
-        self._set(r, 12, total)        # Total
+    # ==================================================
+    # SUPPLY TYPE (CGST + SGST / IGST)
+    # ==================================================
+    RATE_COLS = {"cgst_rate": 8, "sgst_rate": 10, "igst_rate": 13}
+    SUPPLY_RATE_COLS = {INTRA: ("cgst_rate", "sgst_rate"), INTER: ("igst_rate",)}
 
+    def update_supply(self):
+        """Place of supply from the bill-to address, else the customer's GSTIN."""
+        addr = self.cbAddress.currentData()
+        gstin = None
+        if not (addr and addr.get("state_code")):
+            cid = self.cbCustomer.currentData()
+            gstin = (get_customer(cid) or {}).get("gstin") if cid else None
+        self.set_supply(place_of_supply(addr, gstin))
+
+    def set_supply(self, place, supply=None):
+        """Switch rows between CGST + SGST and IGST (9 + 9 <-> 18) and recompute."""
+        self.place_of_supply = place
+        supply = supply or supply_type(place)
+        if supply == self.supply:
+            return
+        old = self.SUPPLY_RATE_COLS[self.supply]
+        self.supply = supply
 
-    def _set(self, r, c, v):
+        rows = range(self.table.rowCount())
         self.table.blockSignals(True)
-        self.table.setItem(r, c, QTableWidgetItem(f"{v:.2f}"))
-        self.table.blockSignals(False)
+        try:
+            for r in rows:
+                typed = any(self._cell_text(r, self.RATE_COLS[f]) for f in old)
+                line = {f: self._cell_value(r, self.RATE_COLS[f]) for f in old}
+                for f, v in zip(self.RATE_COLS, line_rates(line, supply)):
+                    if f in self.SUPPLY_RATE_COLS[supply]:
+                        self.table.item(r, self.RATE_COLS[f]).setText(f"{v:g}" if typed else "")
+        finally:
+            self.table.blockSignals(False)
+
+        self.show_supply_columns()
+        self.recalculate_rows(rows)
+        self.preview.schedule()
+        self.autosave.schedule()
+
+    def show_supply_columns(self):
+        inter = self.supply == INTER
+        for c in (8, 9, 10, 11):
+            self.table.setColumnHidden(c, inter)
+        for c in (13, 14):
+            self.table.setColumnHidden(c, not inter)
 
     # ==================================================
+    # PASTE (Excel / TSV)
+    # ==================================================
+    PASTE_NUMERIC_COLS = (4, 5, 8, 10, 13, 15)  # rate, qty, CGST %, SGST %, IGST %, ex. rate
+    COMPUTED_COLS = (0, 6, 7, 9, 11, 12, 14)    # never taken from a paste
+
+    @staticmethod
+    def _paste_number(text):
+        t = text.strip().replace(",", "").rstrip("%").lstrip("₹$€£ ").strip()
+        try:
+            float(t)
+        except ValueError:
+            return None
+        return t
+
+    def paste_items(self, text=None):
+        """Paste a tab-separated block (copied from Excel) at the current cell.
+
+        Block columns land on grid columns from the current one (Description
+        if none is selected), extending the table as needed. A header line is
+        skipped; computed columns are ignored and every pasted row is
+        recalculated in one pass. Returns the number of rows pasted.
+        """
+        if text is None:
+            text = QtWidgets.QApplication.clipboard().text()
+        lines = [
+            row for row in csv.reader(io.StringIO(text), delimiter="\t")
+            if any(cell.strip() for cell in row)
+        ]
+        if not lines:
+            return 0
+
+        c0 = max(1, self.table.currentColumn())
+        r0 = self.table.currentRow()
+        r0 = r0 if r0 >= 0 else self.table.rowCount()
+
+        first = lines[0]
+        if any(
+            c0 + i in self.PASTE_NUMERIC_COLS and cell.strip() and self._paste_number(cell) is None
+            for i, cell in enumerate(first)
+        ):
+            lines = lines[1:]       # "Description  Rate  Qty ..." header line
+            if not lines:
+                return 0
+
+        charges = self.ranked_charges()
+        # combo item index by name; new rows' combos are built from `charges`
+        by_name = {c["charge_name"].strip().lower(): i + 1 for i, c in enumerate(charges)}
+
+        self.table.setUpdatesEnabled(False)
+        self.table.blockSignals(True)
+        try:
+            missing = r0 + len(lines) - self.table.rowCount()
+            if missing > 0:
+                self.add_rows(missing, charges)
+
+            for i, cells in enumerate(lines):
+                r = r0 + i
+                for j, cell in enumerate(cells):
+                    c = c0 + j
+                    if c >= self.table.columnCount():
+                        break
+                    if c in self.COMPUTED_COLS:
+                        continue
+                    if c == 1:
+                        self._paste_description(r, cell.strip(), by_name)
+                        continue
+                    if c in self.PASTE_NUMERIC_COLS:
+                        num = self._paste_number(cell)
+                        cell = num if num is not None else cell.strip()
+                    self.table.item(r, c).setText(cell.strip())
+
+            self.recalculate_rows(range(r0, r0 + len(lines)))
+        finally:
+            self.table.blockSignals(False)
+            self.table.setUpdatesEnabled(True)
+
+        self.preview.schedule()
+        self.autosave.schedule()
+        return len(lines)
+
+    def _paste_description(self, r, text, by_name):
+        combo = self.table.cellWidget(r, 1)
+        idx = by_name.get(text.lower(), -1)
+        if idx < 0 or combo.itemText(idx).strip().lower() != text.lower():
+            # not a master charge, or an older row whose combo is ordered differently
+            idx = combo.findText(text, QtCore.Qt.MatchFlag.MatchFixedString) if text else 0
+        combo.blockSignals(True)
+        if idx > 0:
+            combo.setCurrentIndex(idx)
+        else:
+            combo.setCurrentIndex(0)
+            combo.setEditText(text)
+        combo.blockSignals(False)
+        if idx > 0:
+            self.apply_charge_to_row(r, combo)      # HSN / CUR / GST from master
+
+    # ==================================================
+    def row_description(self, r):
+        # Column 1 is normally the charge combo; plain items are legacy rows
+        combo = self.table.cellWidget(r, 1)
+        if isinstance(combo, QtWidgets.QComboBox):
+            text = combo.currentText().strip()
+            if combo.currentIndex() == 0 and text == combo.itemText(0):
+                return ""
+            return text
+        item = self.table.item(r, 1)
+        return item.text().strip() if item else ""
+
+    ITEM_ID_ROLE = QtCore.Qt.ItemDataRole.UserRole     # on column 0 of a loaded row
+
     def collect_items(self):
         items = []
+        intra = self.supply == INTRA
         for r in range(self.table.rowCount()):
-            if not self.table.item(r, 1) or not self.table.item(r, 1).text().strip():
+            description = self.row_description(r)
+            if not description:
                 continue
-            items.append({
+            item = {
                 "sr_no": r + 1,
-                "description": self.table.item(r, 1).text(),
+                "description": description,
                 "hsn_sac": self.table.item(r, 2).text(),
                 "cur": self.table.item(r, 3).text(),
                 "rate": float(self.table.item(r, 4).text() or 0),
                 "qty": float(self.table.item(r, 5).text() or 0),
                 "amount": float(self.table.item(r, 6).text() or 0),
                 "taxable_amount": float(self.table.item(r, 7).text() or 0),
-                "cgst_rate": float(self.table.item(r, 8).text() or 0),
-                "cgst_amt": float(self.table.item(r, 9).text() or 0),
-                "sgst_rate": float(self.table.item(r, 10).text() or 0),
-                "sgst_amt": float(self.table.item(r, 11).text() or 0),
+                "cgst_rate": float(self.table.item(r, 8).text() or 0) if intra else 0.0,
+                "cgst_amt": float(self.table.item(r, 9).text() or 0) if intra else 0.0,
+                "sgst_rate": float(self.table.item(r, 10).text() or 0) if intra else 0.0,
+                "sgst_amt": float(self.table.item(r, 11).text() or 0) if intra else 0.0,
+                "igst_rate": 0.0 if intra else float(self.table.item(r, 13).text() or 0),
+                "igst_amt": 0.0 if intra else float(self.table.item(r, 14).text() or 0),
+                "fx_rate": float(self.table.item(r, 15).text() or 1),
                 "total_amt": float(self.table.item(r, 12).text() or 0),
-            })
+            }
+            item_id = self.table.item(r, 0).data(self.ITEM_ID_ROLE)
+            if item_id is not None:
+                item["id"] = item_id
+            items.append(item)
         return items
 
-    # ==================================================
-    def validate_items_before_save(self, items):
-        issues = []
-
-        for i, it in enumerate(items, start=1):
-            if it["rate"] <= 0 or it["qty"] <= 0:
-                issues.append(
-                    f"Row {i}: Rate or Quantity is zero"
-                )
-            if it["cgst_rate"] <= 0 and it["sgst_rate"] <= 0:
-                issues.append(
-                    f"Row {i}: CGST and SGST rates are empty"
-                )
-
-        return issues
-
-    # ==================================================    
-    def validate_items(self, items):
-        issues = []
-
-        for i, it in enumerate(items, start=1):
-            if it["rate"] == 0 or it["qty"] == 0:
-                issues.append(f"Row {i}: Rate or Quantity is zero")
-            if it["cgst_rate"] == 0 and it["sgst_rate"] == 0:
-                issues.append(f"Row {i}: GST rates are empty")
-
-        return issues
-    
     # ==================================================
     def save_document(self):
         job_id = self.cbJob.currentData()
         job = get_job(job_id) if job_id else None
-
         items = self.collect_items()
-        if not items:
-            QMessageBox.warning(self, "No Items", "Please add at least one item.")
-            return
-
-    # -------------------------------
-    # Soft validation (warnings)
-    # -------------------------------
-        issues = self.validate_items_before_save(items)
-        if issues:
-            msg = "The following issues were found:\n\n"
-            msg += "\n".join(f"• {i}" for i in issues)
-            msg += "\n\nDo you want to continue saving?"
-
-            reply = QMessageBox.warning(
-                self,
-                "Validation Warning",
-                msg,
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-
-            if reply == QMessageBox.StandardButton.No:
-                return
 
     # -------------------------------
-    # Hard validation (must fix)
-    # -------------------------------
-        issues = self.validate_items(items)
-        if issues:
-            QMessageBox.warning(
-                self,
-                "Validation Error",
-                "Please fix the following issues before saving:\n\n" + "\n".join(issues)
-            )
-            return
-    # -------------------------------
-    # Per-row safety checks
-    # -------------------------------
-        for r in range(self.table.rowCount()):
-            desc = self.table.item(r, 1)
-            if not desc or not desc.text().strip():
-                continue
-
-            rate = float(self.table.item(r, 4).text() or 0)
-            qty = float(self.table.item(r, 5).text() or 0)
-            cgst = float(self.table.item(r, 8).text() or 0)
-            sgst = float(self.table.item(r, 10).text() or 0)
-
-            if rate == 0 or qty == 0:
-                QMessageBox.warning(
-                    self,
-                    "Invalid Item",
-                    f"Row {r+1}: Rate or Quantity cannot be zero"
-                )
-                return
-            if cgst == 0 and sgst == 0:
-                QMessageBox.warning(
-                    self,
-                    "GST Missing",
-                    f"Row {r+1}: CGST and SGST cannot both be zero"
-                )
-                return
-    # -------------------------------
-    # Save invoice
+    # Header
     # -------------------------------
         header = {
+            "id": self.document_id,
             "invoice_number": self.leInvoiceNo.text(),
             "date": self.leDate.text(),
             "type": self.DOCUMENT_TYPE,
 
             "job_id": job_id,
             "job_no": job.get("job_no") if job else None,
+            "customer_id": self.cbCustomer.currentData(),
             "bill_to": self.teBillTo.toPlainText(),
             "consignee_preview": self.teConsignee.toPlainText(),
+            "place_of_supply": self.place_of_supply,
+            "supply_type": self.supply,
 
             **{
-                k: (
+                self.HEADER_COLUMNS.get(k, k): (
                 v.date().toString("yyyy-MM-dd")
                 if isinstance(v, QtWidgets.QDateEdit)
                 else v.text()
@@ -503,24 +849,280 @@ class BaseInvoiceForm(QtWidgets.QWidget):
             "total_amount": sum(i["total_amt"] for i in items),
         }
 
-        insert_invoice(header, items)
-        QMessageBox.information(
-            self,
-            "Saved",
-            f"{self.DOCUMENT_TITLE} saved successfully"
+    # -------------------------------
+    # Validation: errors block, warnings ask
+    # -------------------------------
+        cid = header["customer_id"]
+        findings = validate_document(
+            header, items,
+            gstin=(get_customer(cid) or {}).get("gstin") if cid else None,
+            address=self.cbAddress.currentData(),
         )
+        if errors(findings):
+            QMessageBox.warning(
+                self,
+                "Validation Error",
+                "Please fix the following issues before saving:\n\n" + format_findings(errors(findings))
+            )
+            return
+        if warnings(findings):
+            reply = QMessageBox.warning(
+                self,
+                "Validation Warning",
+                "The following issues were found:\n\n" + format_findings(warnings(findings))
+                + "\n\nDo you want to continue saving?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if reply == QMessageBox.StandardButton.No:
+                return
+
+        # An opened document is updated in place; a new one is inserted, and
+        # never over another document already saved under its number
+        try:
+            _, stats = save_invoice(header, items)
+        except sqlite3.IntegrityError:
+            if self.document_id is not None:
+                raise
+            reply = QMessageBox.question(
+                self,
+                "Number in use",
+                f"{self.DOCUMENT_TITLE} {header['invoice_number']} is already saved.\n\n"
+                f"Save this one under the next number instead?"
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+            header["invoice_number"] = get_next_invoice_number()
+            self.leInvoiceNo.setText(header["invoice_number"])
+            _, stats = save_invoice(header, items)
+
+        if not (stats["inserted"] or stats["updated"] or stats["deleted"]):
+            message = f"{self.DOCUMENT_TITLE} {header['invoice_number']} is already saved (no changes)"
+        elif stats["updated"] or stats["deleted"] or stats["unchanged"]:
+            message = (f"{self.DOCUMENT_TITLE} {header['invoice_number']} updated "
+                       f"({stats['updated']} rows changed, {stats['inserted']} added, "
+                       f"{stats['deleted']} removed)")
+        else:
+            message = f"{self.DOCUMENT_TITLE} {header['invoice_number']} saved successfully"
+        # The form moves on to the next document; Open… to edit this one again
+        self.reset_document()
+        QMessageBox.information(self, "Saved", message)
+
+    # ==================================================
+    # OPEN SAVED DOCUMENT
+    # ==================================================
+    def open_document(self):
+        number, ok = QtWidgets.QInputDialog.getText(
+            self, f"Open {self.DOCUMENT_TITLE.title()}", "Number:")
+        number = number.strip()
+        if not ok or not number:
+            return
+        if not self.load_document(invoice_number=number):
+            QMessageBox.warning(self, "Open", f"No saved {self.DOCUMENT_TITLE.lower()} numbered {number}")
+
+    def load_document(self, invoice_number=None, invoice_id=None):
+        """Fill the form with a saved document (one joined query). Saving
+        it again updates that document. Returns False if there is none of
+        this form's type."""
+        doc = get_document(invoice_id, invoice_number, doc_type=self.DOCUMENT_TYPE)
+        if not doc or (doc[0].get("type") or self.DOCUMENT_TYPE) != self.DOCUMENT_TYPE:
+            return False
+        header, items = doc
+
+        self.autosave.enabled = False
+        try:
+            # A job closed since is still shown for its own document
+            if self.cbJob:
+                job_id = header.get("job_id")
+                idx = self.cbJob.findData(job_id) if job_id else 0
+                if idx < 0:
+                    self.cbJob.addItem(header.get("job_no") or str(job_id), job_id)
+                    idx = self.cbJob.count() - 1
+                self.cbJob.setCurrentIndex(idx)
+            if header.get("customer_id"):
+                idx = self.cbCustomer.findData(header["customer_id"])
+                if idx >= 0:
+                    self.cbCustomer.setCurrentIndex(idx)
+            # The address isn't stored; its label heads the bill-to text
+            label = (header.get("bill_to") or "").split("\n", 1)[0]
+            for i in range(1, self.cbAddress.count()):
+                if self.cbAddress.itemData(i)["label"] == label:
+                    self.cbAddress.setCurrentIndex(i)
+                    break
+
+            # Saved values win over what the job / address picks filled in
+            self.document_id = header["id"]
+            self.leInvoiceNo.setText(header["invoice_number"] or "")
+            self.leDate.setText(header.get("date") or "")
+            if self.teBillTo:
+                self.teBillTo.setPlainText(header.get("bill_to") or "")
+            if self.teConsignee:
+                self.teConsignee.setPlainText(header.get("consignee_preview") or "")
+            for k, w in [*self.ship_fields.items(), *self.cons_fields.items()]:
+                value = header.get(self.HEADER_COLUMNS.get(k, k))
+                if w is None:
+                    continue
+                if isinstance(w, QtWidgets.QDateEdit):
+                    d = QtCore.QDate.fromString(value or "", "yyyy-MM-dd")
+                    if d.isValid():
+                        w.setDate(d)
+                else:
+                    w.setText(value or "")
+            # As saved; older documents (no supply type) are inter-state if they carry IGST
+            self.set_supply(header.get("place_of_supply"), header.get("supply_type") or (
+                INTER if any(it["igst_rate"] for it in items) else INTRA))
+
+            # Saved rows as typed, each keeping its item id for the row diff
+            self.table.setUpdatesEnabled(False)
+            self.table.blockSignals(True)
+            try:
+                self.table.setRowCount(0)
+                self.add_rows(len(items))
+                for r, it in enumerate(items):
+                    self.table.item(r, 0).setData(self.ITEM_ID_ROLE, it["id"])
+                    self._paste_description(r, it["description"] or "", {})
+                    for c, f in zip(self.DRAFT_ROW_COLS, self.LOAD_ROW_FIELDS):
+                        v = it[f]
+                        self.table.item(r, c).setText(
+                            "" if v is None else v if isinstance(v, str) else f"{v:.15g}")
+                    if not is_foreign(it["cur"]):
+                        self.table.item(r, 15).setText("")
+                self.recalculate_rows(range(len(items)))
+            finally:
+                self.table.blockSignals(False)
+                self.table.setUpdatesEnabled(True)
+        finally:
+            self.autosave.enabled = True
+
+        self.autosave.set_baseline()
+        self.preview.schedule()
+        return True
+
+
+    # ==================================================
+    def pdf_header(self):
+        return {
+            "invoice_number": self.leInvoiceNo.text(),
+            "date": self.leDate.text(),
+            "bill_to": self.teBillTo.toPlainText(),
+            "consignee_preview": self.teConsignee.toPlainText(),
+            "supply_type": self.supply,
+            **{k: v.text() for k, v in self.cons_fields.items() if v is not None},
+        }
 
+    def preview_snapshot(self):
+        try:
+            items = self.collect_items()
+        except (ValueError, AttributeError):
+            return None     # half-typed number; keep the last preview
+        return self.pdf_header(), items, self.DOCUMENT_TITLE
+
+    # ==================================================
+    # DRAFTS
+    # ==================================================
+    DRAFT_ROW_COLS = (2, 3, 4, 5, 8, 10, 13, 15)    # typed cells; the rest are computed
+    LOAD_ROW_FIELDS = ("hsn_sac", "cur", "rate", "qty", "cgst_rate", "sgst_rate", "igst_rate", "fx_rate")
+
+    def draft_snapshot(self):
+        fields = {
+            "invoice_number": self.leInvoiceNo.text(),
+            "date": self.leDate.text(),
+            "customer_id": str(self.cbCustomer.currentData() or ""),
+            "address": self.cbAddress.currentText() if self.cbAddress.currentIndex() > 0 else "",
+            "job_id": str(self.cbJob.currentData() or "") if self.cbJob else "",
+            "bill_to": self.teBillTo.toPlainText() if self.teBillTo else "",
+            "consignee_preview": self.teConsignee.toPlainText() if self.teConsignee else "",
+        }
+        for k, w in [*self.ship_fields.items(), *self.cons_fields.items()]:
+            if isinstance(w, QtWidgets.QDateEdit):
+                fields[k] = w.date().toString("yyyy-MM-dd")
+            elif w is not None:
+                fields[k] = w.text()
+
+        rows = []
+        for r in range(self.table.rowCount()):
+            cells = [self.row_description(r)]
+            for c in self.DRAFT_ROW_COLS:
+                item = self.table.item(r, c)
+                cells.append(item.text() if item else "")
+            rows.append(row_cells(cells))
+
+        label = f'{fields["invoice_number"]} {self.cbCustomer.currentText() if fields["customer_id"] else ""}'
+        return {"fields": fields, "rows": rows, "label": label.strip()}
+
+    def offer_draft_recovery(self):
+        """Called once on launch: restore or drop an unsaved draft."""
+        draft = self.autosave.load()
+        if not draft:
+            return
+        answer = QMessageBox.question(
+            self,
+            "Recover draft",
+            f"An unsaved {self.DOCUMENT_TITLE.lower()} was found "
+            f"({draft['label'] or 'untitled'}, {len(draft['rows'])} rows, last edited {draft['updated_at']}).\n\n"
+            "Restore it?",
+        )
+        if answer == QMessageBox.StandardButton.Yes:
+            self.restore_draft(draft)
+        else:
+            self.autosave.mark_clean()
+
+    def restore_draft(self, draft):
+        f = draft["fields"]
+        self.autosave.enabled = False
+        try:
+            if self.cbJob and f.get("job_id"):
+                idx = self.cbJob.findData(int(f["job_id"]))
+                if idx >= 0:
+                    self.cbJob.setCurrentIndex(idx)
+            if f.get("customer_id"):
+                idx = self.cbCustomer.findData(int(f["customer_id"]))
+                if idx >= 0:
+                    self.cbCustomer.setCurrentIndex(idx)
+            if f.get("address"):
+                idx = self.cbAddress.findText(f["address"])
+                if idx >= 0:
+                    self.cbAddress.setCurrentIndex(idx)
+
+            if f.get("invoice_number"):
+                self.leInvoiceNo.setText(f["invoice_number"])
+            if f.get("date"):
+                self.leDate.setText(f["date"])
+            if self.teBillTo and "bill_to" in f:
+                self.teBillTo.setPlainText(f["bill_to"] or "")
+            if self.teConsignee and "consignee_preview" in f:
+                self.teConsignee.setPlainText(f["consignee_preview"] or "")
+            for k, w in [*self.ship_fields.items(), *self.cons_fields.items()]:
+                if w is None or k not in f:
+                    continue
+                if isinstance(w, QtWidgets.QDateEdit):
+                    d = QtCore.QDate.fromString(f[k] or "", "yyyy-MM-dd")
+                    if d.isValid():
+                        w.setDate(d)
+                else:
+                    w.setText(f[k] or "")
+
+            # Replace whatever the customer pick prefilled with the draft rows
+            self.table.setRowCount(0)
+            for cells in draft["rows"]:
+                description, *values = json.loads(cells)
+                self.add_row()
+                r = self.table.rowCount() - 1
+                if description:
+                    self.set_row_description(r, description)
+                for c, v in zip(self.DRAFT_ROW_COLS, values):
+                    self.table.item(r, c).setText(v)
+        finally:
+            self.autosave.enabled = True
+        self.autosave.restored(draft)
 
     # ==================================================
     def export_pdf(self):
-        path = generate_invoice_pdf(
-            header={
-                "invoice_number": self.leInvoiceNo.text(),
-                "date": self.leDate.text(),
-                "bill_to": self.teBillTo.toPlainText(),
-                "consignee_preview": self.teConsignee.toPlainText(),
-            },
+        path, cached = export_invoice_pdf(
+            header=self.pdf_header(),
             items=self.collect_items(),
             title=self.DOCUMENT_TITLE
         )
-        QMessageBox.information(self, "PDF", f"PDF generated:\n{path}")
+        if cached:
+            QMessageBox.information(self, "PDF", f"PDF unchanged, already exported:\n{path}")
+        else:
+            QMessageBox.information(self, "PDF", f"PDF generated:\n{path}")
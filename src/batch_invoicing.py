@@ -0,0 +1,350 @@
+# src/batch_invoicing.py
+# Month-end billing: one invoice per open job, without the form
+#
+#   python src/batch_invoicing.py --dry-run               -> what would be billed
+#   python src/batch_invoicing.py --date 2025-06-30 --pdf
+#   python src/batch_invoicing.py --jobs 12,15 --templates month_end.json
+#
+# Headers are filled from the job the way BaseInvoiceForm.apply_job does
+# (customer, shipment and consignment fields) and billed to the customer's
+# default address. Lines come from the customer's charge template: a
+# --templates JSON file ({"customer id or name": [lines]}, "*" for
+# everyone else), else their usual charges from charge_usage at the last
+# billed rate and qty, as "Prefill from History" would. Master charges take
+# the GST rates in force on the invoice date; gst_rules / fx_rates compute
+# the lines exactly as the form does, and validation checks them with the
+# form's rules: a job with errors is skipped, warnings are reported.
+#
+# Invoices are saved GROUP_SIZE to a transaction (run_write_group). Each
+# takes its number from get_next_invoice_number() inside its own savepoint,
+# under the group's write lock, so a failed invoice leaves no gap in the
+# series and no other desk can take the same number. With --pdf, a
+# background thread renders each committed group through
+# pdf_export.export_batch while the next one is saved.
+#
+# Jobs already invoiced are skipped unless --rebill. Works on the local
+# file (DB_PATH), not through a data service.
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+import database
+from database import (
+    address_text, insert_invoice, iter_jobs, list_charge_templates, list_charges,
+    list_customers, list_default_addresses, list_invoiced_job_ids, run_write_group,
+)
+from fx_rates import convert_items, rate_book
+from gst_rules import compute_invoice, home_state_code, place_of_supply, rate_table, supply_type
+from pdf_export import DOC_TITLES, export_batch
+from settings_manager import get_next_invoice_number, peek_invoice_numbers
+from validation import errors, validate_document, warnings
+
+DOCUMENT_TYPE = "INVOICE"
+GROUP_SIZE = 200
+
+# Same keys as BaseInvoiceForm.ship_fields / cons_fields
+SHIP_FIELDS = ("shipper", "consignee", "pol", "pod", "vessel_flight", "etd", "eta")
+CONS_FIELDS = ("job_no", "mbl_no", "gross_weight", "net_weight", "volume_cbm",
+               "packages", "exchange_rate", "ref_no")
+
+# Job field -> invoices column, where the names differ
+HEADER_COLUMNS = {"consignee": "ship_consigne"}
+
+RATE_FIELDS = ("cgst_rate", "sgst_rate", "igst_rate")
+
+
+# =====================================================
+# TEMPLATES
+# =====================================================
+def load_templates(path):
+    """{customer_id or "*": [line]} from a JSON file keyed by customer id or name.
+
+    A line is {"description", "rate", "qty"} plus, optionally, "hsn_sac",
+    "cur" and GST rates; master charges fill in what is left out.
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    by_name = {c["name"].strip().lower(): c["id"] for c in list_customers()}
+    templates = {}
+    for key, lines in raw.items():
+        key = str(key).strip()
+        if key == "*" or not key.isdigit():
+            cid = "*" if key == "*" else by_name.get(key.lower())
+            if cid is None:
+                raise ValueError(f"template for unknown customer {key!r}")
+        else:
+            cid = int(key)
+        templates[cid] = lines
+    return templates
+
+
+def _num(v, default=0.0):
+    try:
+        return float(v) if v not in (None, "") else default
+    except (TypeError, ValueError):
+        return default
+
+
+def template_items(lines, charges):
+    """Item dicts for one invoice from template / charge_usage lines.
+
+    Master charges get no typed GST rates, so compute_line takes the rates
+    in force on the invoice date; other lines keep the template's.
+    """
+    items = []
+    for ln in lines:
+        description = (ln.get("description") or "").strip()
+        if not description:
+            continue
+        master = charges.get(description.lower())
+        it = {
+            "sr_no": len(items) + 1,
+            "description": description,
+            "hsn_sac": ln.get("hsn_sac") or (master or {}).get("hsn_sac") or "",
+            "cur": ln.get("cur") or (master or {}).get("currency") or "INR",
+            "rate": _num(ln.get("rate", ln.get("last_rate"))),
+            "qty": _num(ln.get("qty", ln.get("last_qty")), 1.0),
+        }
+        if not master:
+            it.update({f: _num(ln.get(f)) for f in RATE_FIELDS})
+        items.append(it)
+    return items
+
+
+# =====================================================
+# BUILD
+# =====================================================
+def job_header(job, address, gstin, date, home=None):
+    """Invoice header for job (number left to the save)."""
+    bill_to = address_text(address) if address else ""
+    place = place_of_supply(address, gstin)
+    header = {
+        "invoice_number": None,
+        "date": date,
+        "type": DOCUMENT_TYPE,
+        "job_id": job["id"],
+        "customer_id": job["customer_id"],
+        "bill_to": bill_to,
+        "consignee_preview": job.get("consignee") or bill_to,
+        "place_of_supply": place,
+        "supply_type": supply_type(place, home),
+    }
+    for k in SHIP_FIELDS + CONS_FIELDS:
+        header[HEADER_COLUMNS.get(k, k)] = str(job.get(k) or "")
+    return header
+
+
+def build_invoices(date=None, templates=None, job_ids=None, rebill=False):
+    """([(header, items)], skipped, warnings) for the open jobs; skipped
+    and warnings are [(job_no, message)].
+
+    Every lookup is one read up front; no per-job queries.
+    """
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    templates = templates or {}
+    usage = list_charge_templates()
+    charges = {c["charge_name"].strip().lower(): c for c in list_charges()}
+    gstins = {c["id"]: c["gstin"] for c in list_customers()}
+    addresses = list_default_addresses()
+    billed = set() if rebill else list_invoiced_job_ids(DOCUMENT_TYPE)
+    wanted = set(job_ids) if job_ids else None
+    table, book, home = rate_table(), rate_book(), home_state_code()
+
+    docs, skipped, warned = [], [], []
+    for job in sorted(iter_jobs(status="OPEN", row="dict"), key=lambda j: j["id"]):
+        if wanted is not None and job["id"] not in wanted:
+            continue
+        cid = job["customer_id"]
+        if job["id"] in billed:
+            skipped.append((job["job_no"], "already invoiced"))
+            continue
+        if not cid or cid not in gstins:
+            skipped.append((job["job_no"], "no customer"))
+            continue
+        items = template_items(templates.get(cid) or templates.get("*") or usage.get(cid, []), charges)
+        if not items:
+            skipped.append((job["job_no"], "no charge template"))
+            continue
+
+        convert_items(items, date, book, job.get("exchange_rate"))
+        header = job_header(job, addresses.get(cid), gstins[cid], date, home)
+        header["total_amount"] = compute_invoice(items, header["supply_type"], date, table)["total"]
+
+        findings = validate_document(header, items, gstins[cid], addresses.get(cid), home)
+        if errors(findings):
+            skipped.append((job["job_no"], "; ".join(f.message for f in errors(findings))))
+            continue
+        warned += [(job["job_no"], f.message) for f in warnings(findings)]
+        docs.append((header, items))
+    return docs, skipped, warned
+
+
+# =====================================================
+# SAVE
+# =====================================================
+def _save(header, items):
+    # Runs inside the group's savepoint: the number and the invoice commit
+    # or roll back together
+    header["invoice_number"] = get_next_invoice_number()
+    insert_invoice(header, items)
+    return header["invoice_number"]
+
+
+class PdfQueue(threading.Thread):
+    """Renders committed groups in the background through export_batch."""
+
+    def __init__(self, compress=None):
+        super().__init__(name="batch-pdf", daemon=True)
+        self.queue = queue.SimpleQueue()
+        self.compress = compress
+        self.rendered = 0
+        self.cached = 0
+        self.seconds = 0.0
+        self.errors = []        # [(job numbers of the group, message)]
+
+    def put(self, docs):
+        self.queue.put(docs)
+
+    def close(self):
+        self.queue.put(None)
+        self.join()
+
+    def run(self):
+        while True:
+            docs = self.queue.get()
+            if docs is None:
+                return
+            try:
+                summary = export_batch(docs, compress=self.compress)
+            except Exception as e:
+                self.errors.append(([h.get("job_no") for h, _, _ in docs], str(e)))
+                continue
+            self.rendered += summary["rendered"]
+            self.cached += summary["cached"]
+            self.seconds += summary["seconds"]
+
+
+def run_batch(date=None, templates=None, job_ids=None, rebill=False, dry_run=False,
+              pdf=False, group_size=GROUP_SIZE, progress=None):
+    """Bill the open jobs; returns a report dict (see _format).
+
+    dry_run builds and computes every invoice and shows the numbers they
+    would get, but writes nothing.
+    """
+    t0 = time.perf_counter()
+    docs, skipped, warned = build_invoices(date, templates, job_ids, rebill)
+    build_s = time.perf_counter() - t0
+
+    report = {
+        "dry_run": dry_run,
+        "built": len(docs),
+        "lines": sum(len(items) for _, items in docs),
+        "total": sum(h["total_amount"] for h, _ in docs),
+        "skipped": skipped,
+        "warnings": warned,
+        "failed": [],
+        "saved": 0,
+        "numbers": [],
+        "build_s": build_s,
+        "save_s": 0.0,
+        "pdf": None,
+    }
+    if dry_run:
+        report["numbers"] = peek_invoice_numbers(len(docs))
+        report["seconds"] = time.perf_counter() - t0
+        return report
+
+    pdfs = PdfQueue() if pdf else None
+    if pdfs:
+        pdfs.start()
+    t1 = time.perf_counter()
+    for start in range(0, len(docs), group_size):
+        group = docs[start:start + group_size]
+        results = run_write_group([(_save, (h, items), {}) for h, items in group])
+        done = []
+        for (header, items), (ok, value) in zip(group, results):
+            if ok:
+                report["numbers"].append(value)
+                done.append((dict(header), items, DOC_TITLES[DOCUMENT_TYPE]))
+            else:
+                header["invoice_number"] = None
+                report["failed"].append((header["job_no"], str(value)))
+        report["saved"] += len(done)
+        if pdfs and done:
+            pdfs.put(done)
+        if progress:
+            progress(min(start + group_size, len(docs)), len(docs))
+    report["save_s"] = time.perf_counter() - t1
+
+    if pdfs:
+        pdfs.close()
+        report["pdf"] = {"rendered": pdfs.rendered, "cached": pdfs.cached,
+                         "seconds": pdfs.seconds, "errors": pdfs.errors}
+    report["seconds"] = time.perf_counter() - t0
+    return report
+
+
+# =====================================================
+# CLI
+# =====================================================
+def _format(report):
+    n = report["saved"] or report["built"]
+    secs = report["seconds"]
+    lines = [
+        f"{'dry run: ' if report['dry_run'] else ''}{report['built']} invoices, "
+        f"{report['lines']} lines, total {report['total']:,.2f}",
+        f"skipped:   {len(report['skipped'])}",
+    ]
+    for job_no, reason in report["skipped"][:20]:
+        lines.append(f"  {job_no}: {reason}")
+    lines.append(f"warnings:  {len(report['warnings'])}")
+    for job_no, message in report["warnings"][:20]:
+        lines.append(f"  {job_no}: {message}")
+    if report["numbers"]:
+        lines.append(f"numbers:   {report['numbers'][0]} .. {report['numbers'][-1]}")
+    if not report["dry_run"]:
+        lines.append(f"saved:     {report['saved']}, failed {len(report['failed'])}")
+        for job_no, err in report["failed"][:20]:
+            lines.append(f"  {job_no}: {err}")
+    lines.append(f"build:     {report['build_s']:.2f} s")
+    if not report["dry_run"]:
+        lines.append(f"save:      {report['save_s']:.2f} s")
+    lines.append(f"overall:   {secs:.2f} s ({n / secs if secs else 0:,.0f} docs/s)")
+    if report["pdf"]:
+        p = report["pdf"]
+        lines.append(f"pdf:       {p['rendered']} rendered, {p['cached']} cached, "
+                     f"{p['seconds']:.2f} s, {len(p['errors'])} errors")
+        for job_nos, err in p["errors"][:20]:
+            lines.append(f"  {', '.join(job_nos)}: {err}")
+    return "\n".join(lines)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Invoice every open job")
+    p.add_argument("--db", help="database file (default: data.db in the app folder)")
+    p.add_argument("--date", help="invoice date, YYYY-MM-DD (default: today)")
+    p.add_argument("--jobs", help="comma-separated job ids (default: all open jobs)")
+    p.add_argument("--templates", help="JSON charge templates per customer")
+    p.add_argument("--rebill", action="store_true", help="include jobs already invoiced")
+    p.add_argument("--pdf", action="store_true", help="export a PDF for each saved invoice")
+    p.add_argument("--dry-run", action="store_true", help="build and report, save nothing")
+    args = p.parse_args()
+
+    if args.db:
+        database.DB_PATH = args.db
+    database.init_db()
+
+    job_ids = [int(j) for j in args.jobs.split(",") if j.strip()] if args.jobs else None
+    templates = load_templates(args.templates) if args.templates else None
+    report = run_batch(args.date, templates, job_ids, args.rebill, args.dry_run, args.pdf)
+    print(_format(report))
+    return 1 if report["failed"] or (report["pdf"] and report["pdf"]["errors"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
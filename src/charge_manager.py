@@ -1,11 +1,12 @@
 import os
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets, QtCore, uic
 from database import (
     add_charge,
     list_charges,
     get_charge,
     update_charge,
-    delete_charge
+    delete_charge,
+    list_charge_rates
 )
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -48,7 +49,8 @@ class ChargeManager(QtWidgets.QWidget):
     def add_charge(self):
         dialog = ChargeDialog(self)
         if dialog.exec():
-            add_charge(dialog.get_data())
+            d = dialog.get_data()
+            add_charge(d["charge_name"], d["hsn_sac"], d["currency"], d["cgst_rate"], d["sgst_rate"])
             self.load_data()
 
     # --------------------------------------------
@@ -60,9 +62,13 @@ class ChargeManager(QtWidgets.QWidget):
         charge_id = self.table.item(row, 0).data(1000)
         charge = get_charge(charge_id)
 
-        dialog = ChargeDialog(self, charge)
+        dialog = ChargeDialog(self, charge, list_charge_rates(charge_id))
         if dialog.exec():
-            update_charge(charge_id, dialog.get_data())
+            d = dialog.get_data()
+            update_charge(
+                charge_id, d["charge_name"], d["hsn_sac"], d["currency"],
+                d["cgst_rate"], d["sgst_rate"], effective_from=d["effective_from"]
+            )
             self.load_data()
 
     # --------------------------------------------
@@ -80,7 +86,7 @@ class ChargeManager(QtWidgets.QWidget):
 # CHARGE DIALOG
 # =====================================================
 class ChargeDialog(QtWidgets.QDialog):
-    def __init__(self, parent=None, data=None):
+    def __init__(self, parent=None, data=None, history=()):
         super().__init__(parent)
         self.setWindowTitle("Charge / HSN")
 
@@ -95,11 +101,24 @@ class ChargeDialog(QtWidgets.QDialog):
         self.leCGST.setMaximum(100)
         self.leSGST.setMaximum(100)
 
+        # New rates apply to invoices dated from here; older ones keep theirs
+        self.deEffective = QtWidgets.QDateEdit(QtCore.QDate.currentDate())
+        self.deEffective.setCalendarPopup(True)
+        self.deEffective.setDisplayFormat("yyyy-MM-dd")
+
         layout.addRow("Charge Name", self.leName)
         layout.addRow("HSN / SAC", self.leHSN)
         layout.addRow("Currency", self.leCur)
         layout.addRow("CGST %", self.leCGST)
         layout.addRow("SGST %", self.leSGST)
+        if data:
+            layout.addRow("Rates effective from", self.deEffective)
+            if history:
+                lines = [
+                    f'{h["effective_from"] or "start"}: CGST {h["cgst_rate"]:g}% + SGST {h["sgst_rate"]:g}%'
+                    for h in history
+                ]
+                layout.addRow("Rate history", QtWidgets.QLabel("\n".join(lines)))
 
         btn = QtWidgets.QPushButton("Save")
         btn.clicked.connect(self.accept)
@@ -119,5 +138,6 @@ class ChargeDialog(QtWidgets.QDialog):
             "currency": self.leCur.text(),
             "cgst_rate": self.leCGST.value(),
             "sgst_rate": self.leSGST.value(),
+            "effective_from": self.deEffective.date().toString("yyyy-MM-dd"),
             "is_active": 1
         }
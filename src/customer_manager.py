@@ -1,17 +1,47 @@
 # src/consignee_manager.py
 import os
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets, QtCore, uic
 from PyQt6.QtWidgets import QMessageBox, QTableWidgetItem
 
 from database import (
     add_consignee, update_consignee, delete_consignee,
-    list_consignees, get_consignee,
+    list_consignees_with_address_labels, get_consignee,
     add_consignee_address, get_addresses_for_consignee,
     update_address, delete_address
 )
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 
+SEARCH_DEBOUNCE_MS = 250
+
+
+# =====================================================
+# BACKGROUND SEARCH
+# =====================================================
+class _SearchSignals(QtCore.QObject):
+    done = QtCore.pyqtSignal(int, object)
+    failed = QtCore.pyqtSignal(int, str)
+
+
+class _SearchJob(QtCore.QRunnable):
+    def __init__(self, generation, search, latest):
+        super().__init__()
+        self.generation = generation
+        self.search = search
+        self.latest = latest
+        self.signals = _SearchSignals()
+
+    def run(self):
+        # Superseded by a newer keystroke before it started
+        if self.generation != self.latest():
+            return
+        try:
+            rows = list_consignees_with_address_labels(self.search or None)
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.done.emit(self.generation, rows)
+
 
 class ConsigneeManager(QtWidgets.QWidget):
     def __init__(self):
@@ -30,45 +60,125 @@ class ConsigneeManager(QtWidgets.QWidget):
         self.btnAdd.setText("Add Consignee")
 
         self.btnAdd.clicked.connect(self.open_add_dialog)
-        self.leSearch.textChanged.connect(self.refresh_table)
+
+        # -------------------------
+        # Search pipeline: debounce -> worker query -> diff apply
+        # -------------------------
+        self.search_generation = 0
+        self.row_keys = []      # displayed (id, name, gstin, pan, labels) per row
+        self.row_actions = {}   # row -> consignee id its action buttons are bound to
+
+        self.search_pool = QtCore.QThreadPool(self)
+        self.search_pool.setMaxThreadCount(1)
+
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.refresh_table)
+
+        self.leSearch.textChanged.connect(self.search_timer.start)
+
+        # Action buttons are only built for rows scrolled into view
+        self.table.verticalScrollBar().valueChanged.connect(self.ensure_visible_actions)
 
         self.refresh_table()
 
     # --------------------------------------------------
     def refresh_table(self):
-        search = self.leSearch.text().strip()
-        consignees = list_consignees(search if search else None)
-
-        self.table.setRowCount(0)
-        for r, c in enumerate(consignees):
-            self.table.insertRow(r)
-            self.table.setItem(r, 0, QTableWidgetItem(str(c["id"])))
-            self.table.setItem(r, 1, QTableWidgetItem(c.get("name", "")))
-            self.table.setItem(r, 2, QTableWidgetItem(c.get("gstin", "")))
-            self.table.setItem(r, 3, QTableWidgetItem(c.get("pan", "")))
-
-            addrs = get_addresses_for_consignee(c["id"])
-            summary = ", ".join(a["label"] for a in addrs) if addrs else ""
-            self.table.setItem(r, 4, QTableWidgetItem(summary))
-
-            btnAddr = QtWidgets.QPushButton("Addresses")
-            btnEdit = QtWidgets.QPushButton("Edit")
-            btnDel = QtWidgets.QPushButton("Delete")
-
-            btnAddr.clicked.connect(lambda _, cid=c["id"]: self.open_address_manager(cid))
-            btnEdit.clicked.connect(lambda _, cid=c["id"]: self.open_edit_dialog(cid))
-            btnDel.clicked.connect(lambda _, cid=c["id"]: self.delete(cid))
-
-            w = QtWidgets.QWidget()
-            hl = QtWidgets.QHBoxLayout(w)
-            hl.setContentsMargins(0, 0, 0, 0)
-            hl.addWidget(btnAddr)
-            hl.addWidget(btnEdit)
-            hl.addWidget(btnDel)
-
-            self.table.setCellWidget(r, 5, w)
-
-        self.table.resizeColumnsToContents()
+        self.search_timer.stop()
+        self.search_generation += 1
+
+        job = _SearchJob(
+            self.search_generation,
+            self.leSearch.text().strip(),
+            lambda: self.search_generation
+        )
+        job.signals.done.connect(self.apply_results)
+        job.signals.failed.connect(self.search_failed)
+        self.search_pool.start(job)
+
+    def search_failed(self, generation, msg):
+        if generation == self.search_generation:
+            QMessageBox.warning(self, "Search", f"Search failed:\n{msg}")
+
+    # --------------------------------------------------
+    def apply_results(self, generation, consignees):
+        # Drop results that a newer keystroke has made stale
+        if generation != self.search_generation:
+            return
+
+        keys = [
+            (c["id"], c.get("name") or "", c.get("gstin") or "",
+             c.get("pan") or "", c.get("address_labels") or "")
+            for c in consignees
+        ]
+        if keys == self.row_keys:
+            return
+
+        first_fill = not self.row_keys
+
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(keys))
+        for r in [r for r in self.row_actions if r >= len(keys)]:
+            del self.row_actions[r]
+
+        # Only rows whose content changed are touched
+        for r, key in enumerate(keys):
+            if r < len(self.row_keys) and self.row_keys[r] == key:
+                continue
+            for col, text in enumerate(key):
+                self._set_text(r, col, str(text))
+
+        self.row_keys = keys
+        self.table.setUpdatesEnabled(True)
+        if first_fill:
+            self.table.resizeColumnsToContents()
+        self.ensure_visible_actions()
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        self.ensure_visible_actions()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.ensure_visible_actions()
+
+    def ensure_visible_actions(self, *_):
+        if not self.row_keys:
+            return
+        first = max(self.table.rowAt(0), 0)
+        last = self.table.rowAt(self.table.viewport().height() - 1)
+        if last < 0:
+            last = len(self.row_keys) - 1
+        for r in range(first, min(last + 1, len(self.row_keys))):
+            cid = self.row_keys[r][0]
+            if self.row_actions.get(r) != cid:
+                self.table.setCellWidget(r, 5, self._row_actions(cid))
+                self.row_actions[r] = cid
+
+    def _set_text(self, r, c, text):
+        item = self.table.item(r, c)
+        if item is None:
+            self.table.setItem(r, c, QTableWidgetItem(text))
+        elif item.text() != text:
+            item.setText(text)
+
+    def _row_actions(self, cid):
+        btnAddr = QtWidgets.QPushButton("Addresses")
+        btnEdit = QtWidgets.QPushButton("Edit")
+        btnDel = QtWidgets.QPushButton("Delete")
+
+        btnAddr.clicked.connect(lambda _, cid=cid: self.open_address_manager(cid))
+        btnEdit.clicked.connect(lambda _, cid=cid: self.open_edit_dialog(cid))
+        btnDel.clicked.connect(lambda _, cid=cid: self.delete(cid))
+
+        w = QtWidgets.QWidget()
+        hl = QtWidgets.QHBoxLayout(w)
+        hl.setContentsMargins(0, 0, 0, 0)
+        hl.addWidget(btnAddr)
+        hl.addWidget(btnEdit)
+        hl.addWidget(btnDel)
+        return w
 
     # --------------------------------------------------
     def open_add_dialog(self):
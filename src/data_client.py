@@ -0,0 +1,189 @@
+# src/data_client.py
+# Thin client for data_service.py
+#
+# In client mode (SANSHIP_DATA_SERVICE=http://host:8765) database.py calls
+# install_client_mode(), which replaces its CRUD functions with RemoteCall
+# stubs. Forms keep calling list_jobs(), insert_invoice() etc. as before;
+# only the desk running the service opens data.db.
+
+import http.client
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+TIMEOUT = 30
+VERSIONS_TTL = 5.0      # seconds another desk's rate change may take to show
+
+# Operations the service exposes. Writes go through the group-commit queue.
+READ_OPS = (
+    "get_setting",
+    "list_jobs", "get_job", "list_jobs_for_dropdown", "list_open_jobs_for_dropdown",
+    "list_consignees", "list_consignees_with_address_labels", "get_consignee",
+    "get_addresses_for_consignee",
+    "get_invoice", "get_invoice_items", "get_document",
+    "get_export_cache",
+    "list_charges", "get_charge", "get_charge_suggestions",
+    "get_charge_rate", "list_charge_rates",
+    "get_currency_rate", "list_currency_rates",
+    "query_lanes", "list_lane_values",
+    "get_draft",
+    "table_versions",
+)
+WRITE_OPS = (
+    "set_setting", "take_counter",
+    "insert_job", "close_job",
+    "add_consignee", "update_consignee", "delete_consignee",
+    "add_consignee_address", "update_address", "delete_address",
+    "insert_invoice", "save_invoice",
+    "put_export_cache", "delete_export_cache",
+    "add_charge", "update_charge", "delete_charge",
+    "set_currency_rate", "delete_currency_rate",
+    "save_draft_changes", "discard_draft",
+)
+
+
+class DataServiceError(Exception):
+    pass
+
+
+def _remote_exception(kind, message):
+    """Re-raise sqlite3 errors as their own type so callers' handlers still match."""
+    cls = getattr(sqlite3, kind, None)
+    if isinstance(cls, type) and issubclass(cls, sqlite3.Error):
+        return cls(message)
+    return DataServiceError(f"{kind}: {message}")
+
+
+# =====================================================
+# CLIENT
+# =====================================================
+class DataClient:
+    def __init__(self, url, token=None, timeout=TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 8765
+        self.token = token
+        self.timeout = timeout
+        self._local = threading.local()     # one keep-alive connection per thread
+        self._versions = None
+        self._versions_at = 0.0
+        self._versions_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _drop_conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def _request(self, method, path, payload=None, retry=True):
+        body = None
+        headers = {}
+        if payload is not None:
+            body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        if self.token:
+            headers["X-Sanship-Token"] = self.token
+
+        # A keep-alive connection goes stale when the service restarts; reads
+        # are retried once on a fresh one. Writes are not: the service may
+        # have applied one whose reply was lost.
+        for attempt in (1, 2):
+            conn = self._conn()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+            except (ConnectionError, http.client.BadStatusLine, OSError) as e:
+                self._drop_conn()
+                if attempt == 2 or not retry or isinstance(e, TimeoutError):
+                    raise DataServiceError(
+                        f"data service unreachable at {self.host}:{self.port}: {e}"
+                    ) from e
+                continue
+            data = resp.read()
+            break
+
+        try:
+            reply = json.loads(data)
+        except ValueError:
+            raise DataServiceError(f"bad reply from data service (HTTP {resp.status})")
+        if not reply.get("ok"):
+            raise _remote_exception(reply.get("type", "Error"), reply.get("error", ""))
+        return reply
+
+    def call(self, op, *args, **kwargs):
+        try:
+            reply = self._request(
+                "POST", "/call", {"op": op, "args": args, "kwargs": kwargs},
+                retry=op not in WRITE_OPS,
+            )
+        finally:
+            if op in WRITE_OPS:
+                self._versions = None       # our own change shows at once
+        return reply.get("result")
+
+    def table_version(self, table):
+        """The service's version of table, refetched at most every
+        VERSIONS_TTL seconds (compiled rate tables stay warm between
+        grid edits instead of reloading on each one)."""
+        with self._versions_lock:
+            if self._versions is None or time.monotonic() - self._versions_at >= VERSIONS_TTL:
+                self._versions = self.call("table_versions")
+                self._versions_at = time.monotonic()
+            return self._versions.get(table)
+
+    def health(self):
+        return self._request("GET", "/health")["stats"]
+
+    def close(self):
+        self._drop_conn()
+
+
+class RemoteCall:
+    """Stand-in for a database.py function in client mode."""
+
+    def __init__(self, client, op):
+        self.client = client
+        self.op = op
+        self.__name__ = op
+
+    def __call__(self, *args, **kwargs):
+        return self.client.call(self.op, *args, **kwargs)
+
+    def __repr__(self):
+        return f"<remote {self.op} @ {self.client.host}:{self.client.port}>"
+
+
+# =====================================================
+# CLIENT MODE
+# =====================================================
+@contextmanager
+def _no_snapshot():
+    # Each remote read is its own snapshot on the service side
+    yield None
+
+
+def install_client_mode(namespace, url, token=None):
+    """Point a database module's public functions at the data service."""
+    client = DataClient(url, token)
+
+    for op in READ_OPS + WRITE_OPS:
+        namespace[op] = RemoteCall(client, op)
+
+    def init_db():
+        # The service owns the schema; fail fast here if it is not reachable
+        client.health()
+
+    namespace["init_db"] = init_db
+    namespace["read_snapshot"] = _no_snapshot
+    namespace["data_client"] = client
+    return client
@@ -0,0 +1,281 @@
+# src/data_service.py
+# Local data service: one process owns data.db, the desks talk to it over HTTP
+#
+#   python src/data_service.py --host 0.0.0.0 --port 8765 [--db PATH] [--token SECRET]
+#
+# Desks then run the app with SANSHIP_DATA_SERVICE=http://<host>:8765 (and
+# SANSHIP_DATA_TOKEN if --token is set) instead of opening data.db on a share.
+#
+#   POST /call   {"op": "insert_invoice", "args": [...], "kwargs": {...}}
+#             -> {"ok": true, "result": ...}
+#             |  {"ok": false, "type": "IntegrityError", "error": "..."}
+#   GET  /health -> {"ok": true, "stats": {...}}
+#
+# Reads run on a small thread pool, each on its own connection (WAL).
+# Writes go to a single writer: whatever has queued up while the previous
+# group was committing is run in one transaction (a savepoint per call, so
+# one bad save does not fail the others) and committed once, via
+# database.run_write_group.
+
+import argparse
+import asyncio
+import functools
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from backup import start_backup_scheduler
+from maintenance import start_maintenance_scheduler, run_optimize
+from data_client import READ_OPS, WRITE_OPS
+
+DEFAULT_PORT = 8765
+READ_THREADS = 4
+MAX_GROUP = 256
+MAX_BODY = 16 * 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found"}
+
+
+def _error(e):
+    return {"ok": False, "type": type(e).__name__, "error": str(e)}
+
+
+# =====================================================
+# SERVICE
+# =====================================================
+class DataService:
+    def __init__(self, token=None, read_threads=READ_THREADS, max_group=MAX_GROUP):
+        self.token = token
+        self.max_group = max_group
+        self.readers = ThreadPoolExecutor(read_threads, thread_name_prefix="svc-read")
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="svc-write")
+        self.server = None
+        self.clients = set()
+        self.started = time.time()
+        self.stats = {
+            "reads": 0, "writes": 0, "errors": 0,
+            "groups": 0, "max_group": 0, "commit_ms": 0.0,
+        }
+
+    # --------------------------------------------------
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        database.init_db()
+        self.queue = asyncio.Queue()
+        self.writer_task = asyncio.create_task(self._write_loop())
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        # Idle keep-alive connections: closing them ends their handlers
+        for w in list(self.clients):
+            w.close()
+        await asyncio.sleep(0.05)
+        await self.server.wait_closed()
+        self.writer_task.cancel()
+        self.readers.shutdown(wait=False)
+        self.writer.shutdown(wait=True)
+
+    def snapshot_stats(self):
+        st = dict(self.stats)
+        st["avg_group"] = st["writes"] / st["groups"] if st["groups"] else 0.0
+        st["uptime_s"] = round(time.time() - self.started, 1)
+        st["db"] = os.path.abspath(database.DB_PATH)
+        return st
+
+    # --------------------------------------------------
+    # GROUP COMMIT
+    # --------------------------------------------------
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_group and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            calls = [(fn, args, kwargs) for fn, args, kwargs, _ in batch]
+            t0 = time.perf_counter()
+            results = await loop.run_in_executor(self.writer, database.run_write_group, calls)
+
+            self.stats["groups"] += 1
+            self.stats["max_group"] = max(self.stats["max_group"], len(batch))
+            self.stats["commit_ms"] += (time.perf_counter() - t0) * 1000
+
+            for (_, _, _, fut), (ok, value) in zip(batch, results):
+                if fut.cancelled():
+                    continue
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(value)
+
+    async def _call(self, op, args, kwargs):
+        fn = getattr(database, op)
+        if op in WRITE_OPS:
+            self.stats["writes"] += 1
+            fut = asyncio.get_running_loop().create_future()
+            await self.queue.put((fn, args, kwargs, fut))
+            return await fut
+
+        self.stats["reads"] += 1
+        return await asyncio.get_running_loop().run_in_executor(
+            self.readers, functools.partial(fn, *args, **kwargs)
+        )
+
+    # --------------------------------------------------
+    # HTTP
+    # --------------------------------------------------
+    async def _dispatch(self, method, path, headers, body):
+        if self.token and not hmac.compare_digest(
+            headers.get("x-sanship-token", ""), self.token
+        ):
+            return 401, {"ok": False, "type": "PermissionError", "error": "bad token"}
+
+        if method == "GET" and path == "/health":
+            return 200, {"ok": True, "stats": self.snapshot_stats()}
+
+        if method != "POST" or path != "/call":
+            return 404, {"ok": False, "type": "NotFound", "error": f"{method} {path}"}
+
+        try:
+            req = json.loads(body)
+            op = req["op"]
+            args = list(req.get("args") or [])
+            kwargs = dict(req.get("kwargs") or {})
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"ok": False, "type": "BadRequest", "error": str(e)}
+
+        if op not in READ_OPS and op not in WRITE_OPS:
+            return 400, {"ok": False, "type": "BadRequest", "error": f"unknown op {op!r}"}
+
+        try:
+            result = await self._call(op, args, kwargs)
+        except Exception as e:
+            self.stats["errors"] += 1
+            return 200, _error(e)
+        return 200, {"ok": True, "result": result}
+
+    async def _handle(self, reader, writer):
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._dispatch(method, path, headers, body)
+                data = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+
+# =====================================================
+# RUNNERS
+# =====================================================
+def start_in_thread(host="127.0.0.1", port=0, token=None):
+    """Run a service on a background thread (localhost checks, benchmarks).
+
+    Returns (service, port, stop) where stop() shuts it down.
+    """
+    loop = asyncio.new_event_loop()
+    service = DataService(token=token)
+    ready = threading.Event()
+    box = {}
+
+    def run():
+        asyncio.set_event_loop(loop)
+        try:
+            box["port"] = loop.run_until_complete(service.start(host, port))
+        except Exception as e:
+            box["error"] = e
+            ready.set()
+            return
+        ready.set()
+        loop.run_forever()
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+
+    t = threading.Thread(target=run, name="data-service", daemon=True)
+    t.start()
+    ready.wait()
+    if "error" in box:
+        raise box["error"]
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(service.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        t.join()
+
+    return service, box["port"], stop
+
+
+async def _serve(args):
+    service = DataService(token=args.token)
+    port = await service.start(args.host, args.port)
+    if not args.no_backup:
+        start_backup_scheduler()
+    start_maintenance_scheduler()
+    print(f"SANSHIP data service on {args.host}:{port} -> {os.path.abspath(database.DB_PATH)}")
+    try:
+        async with service.server:
+            await service.server.serve_forever()
+    finally:
+        run_optimize()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Serve data.db to SANSHIP desks over HTTP")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--db", help="database file (default: data.db in the app folder)")
+    p.add_argument("--token", default=os.environ.get("SANSHIP_DATA_TOKEN"))
+    p.add_argument("--no-backup", action="store_true", help="do not run scheduled snapshots")
+    args = p.parse_args()
+
+    if database.DATA_SERVICE_URL:
+        sys.exit("SANSHIP_DATA_SERVICE is set: the service must open the database itself")
+    if args.db:
+        database.DB_PATH = args.db
+
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,683 @@
 # src/database.py
 import sqlite3
+import functools
+import logging
 import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import make_dataclass
 from datetime import datetime
+from urllib.request import pathname2url
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 DB_PATH = os.path.join(BASE_DIR, "data.db")
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, "logs", "slow_queries.log")
+
+# WAL lets report/export readers and clerks' saves run side by side.
+# Set SANSHIP_JOURNAL_MODE=DELETE where WAL is unsupported (network shares).
+JOURNAL_MODE = os.environ.get("SANSHIP_JOURNAL_MODE", "WAL").upper()
+
+# How long a connection waits on another process's lock before SQLITE_BUSY
+BUSY_TIMEOUT_MS = int(os.environ.get("SANSHIP_BUSY_TIMEOUT_MS") or 5000)
+
+# Route CRUD writes through the per-process writer thread (see WRITE QUEUE)
+WRITE_QUEUE = os.environ.get("SANSHIP_WRITE_QUEUE", "1") != "0"
+
+# Serve repeat get_job / dropdown / charge reads from memory (see READ CACHE)
+READ_CACHE = os.environ.get("SANSHIP_READ_CACHE", "1") != "0"
+
+log = logging.getLogger("sanship")
+
+
+# =====================================================
+# QUERY TRACING (OPTIONAL)
+# =====================================================
+# Off by default. When enabled, every statement run through get_conn()
+# is timed and aggregated per normalised SQL text; statements slower
+# than slow_ms are appended to SLOW_QUERY_LOG.
+_trace = {
+    "enabled": os.environ.get("SANSHIP_SQL_TRACE") == "1",
+    "slow_ms": float(os.environ.get("SANSHIP_SLOW_QUERY_MS") or 50),
+    "log_path": SLOW_QUERY_LOG,
+}
+_trace_lock = threading.Lock()
+_query_stats = {}
+
+PROGRESS_STEP = 1000   # VM instructions per progress callback
+
+
+def _normalize_sql(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+_TRACE_FRAMES = {
+    "_caller", "_begin", "_timed", "execute", "executemany", "commit",
+}
+
+
+def _caller():
+    f = sys._getframe(1)
+    while f and f.f_code.co_filename == __file__ and f.f_code.co_name in _TRACE_FRAMES:
+        f = f.f_back
+    if not f:
+        return "?"
+    mod = os.path.splitext(os.path.basename(f.f_code.co_filename))[0]
+    return f"{mod}.{f.f_code.co_name}"
+
+
+def _record_query(sql, caller, elapsed_ms, rows, vm_steps, expanded=None):
+    key = _normalize_sql(sql)
+    with _trace_lock:
+        st = _query_stats.get(key)
+        if st is None:
+            st = _query_stats[key] = {
+                "sql": key, "calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "rows": 0, "vm_steps": 0, "callers": set(),
+            }
+        st["calls"] += 1
+        st["total_ms"] += elapsed_ms
+        st["max_ms"] = max(st["max_ms"], elapsed_ms)
+        st["rows"] += rows
+        st["vm_steps"] += vm_steps
+        st["callers"].add(caller)
+
+    if elapsed_ms >= _trace["slow_ms"]:
+        _write_slow_query(expanded or key, caller, elapsed_ms, rows)
+
+
+def _write_slow_query(sql, caller, elapsed_ms, rows):
+    path = _trace["log_path"]
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(
+                f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\t"
+                f"{elapsed_ms:.1f} ms\trows={rows}\t{caller}\t{_normalize_sql(sql)}\n"
+            )
+    except OSError:
+        pass
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that times execute + fetch and reports on completion."""
+
+    def _begin(self, sql):
+        self._flush()
+        self._pending = {
+            "sql": sql, "caller": _caller(), "elapsed": 0.0,
+            "rows": 0, "expanded": None,
+        }
+        self.connection._active = self._pending
+        self.connection._steps = 0
+
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            p = getattr(self, "_pending", None)
+            if p is not None:
+                p["elapsed"] += time.perf_counter() - t0
+
+    def _flush(self):
+        p = getattr(self, "_pending", None)
+        if p is None:
+            return
+        self._pending = None
+        conn = self.connection
+        steps = conn._steps * PROGRESS_STEP if conn._active is p else 0
+        _record_query(p["sql"], p["caller"], p["elapsed"] * 1000, p["rows"], steps, p["expanded"])
+
+    def execute(self, sql, params=()):
+        self._begin(sql)
+        self._timed(super().execute, sql, params)
+        if self.description is None:
+            self._pending["rows"] = max(self.rowcount, 0)
+            self._flush()
+        return self
+
+    def executemany(self, sql, seq):
+        self._begin(sql)
+        self._timed(super().executemany, sql, seq)
+        self._pending["rows"] = max(self.rowcount, 0)
+        self._flush()
+        return self
+
+    def fetchone(self):
+        r = self._timed(super().fetchone)
+        if getattr(self, "_pending", None) is not None:
+            if r is None:
+                self._flush()
+            else:
+                self._pending["rows"] += 1
+        return r
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, size or self.arraysize)
+        if getattr(self, "_pending", None) is not None:
+            self._pending["rows"] += len(rows)
+            if not rows:
+                self._flush()
+        return rows
+
+    def __next__(self):
+        try:
+            r = self._timed(super().__next__)
+        except StopIteration:
+            self._flush()
+            raise
+        if getattr(self, "_pending", None) is not None:
+            self._pending["rows"] += 1
+        return r
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if getattr(self, "_pending", None) is not None:
+            self._pending["rows"] += len(rows)
+            self._flush()
+        return rows
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        # Dropped before its rows ran out (fetchone on a multi-row query)
+        try:
+            self._flush()
+        except Exception:
+            pass
+
+
+class TracedConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = weakref.WeakSet()     # open cursors, flushed on close
+        self._active = None
+        self._steps = 0
+        self.set_trace_callback(self._on_trace)
+        self.set_progress_handler(self._on_progress, PROGRESS_STEP)
+
+    def _on_trace(self, stmt):
+        # Expanded text (with bound values) for the slow-query log
+        if self._active is not None and self._active["expanded"] is None:
+            if not stmt.startswith(("BEGIN", "COMMIT", "ROLLBACK")):
+                self._active["expanded"] = stmt
+
+    def _on_progress(self):
+        self._steps += 1
+        return 0
+
+    def cursor(self, factory=TracedCursor):
+        cur = super().cursor(factory)
+        self._cursors.add(cur)
+        return cur
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def commit(self):
+        t0 = time.perf_counter()
+        super().commit()
+        _record_query("COMMIT", _caller(), (time.perf_counter() - t0) * 1000, 0, 0)
+
+    def close(self):
+        for cur in list(self._cursors):
+            cur._flush()
+        self._cursors.clear()
+        super().close()
+
+
+def enable_query_trace(slow_ms=None, log_path=None):
+    if slow_ms is not None:
+        _trace["slow_ms"] = float(slow_ms)
+    if log_path:
+        _trace["log_path"] = log_path
+    _trace["enabled"] = True
+
+
+def disable_query_trace():
+    _trace["enabled"] = False
+
+
+def is_query_trace_enabled():
+    return _trace["enabled"]
+
+
+def query_stats(top=None, order_by="total_ms"):
+    with _trace_lock:
+        rows = [
+            {**st, "callers": sorted(st["callers"]),
+             "avg_ms": st["total_ms"] / st["calls"]}
+            for st in _query_stats.values()
+        ]
+    rows.sort(key=lambda r: r[order_by], reverse=True)
+    return rows[:top] if top else rows
+
+
+def reset_query_stats():
+    with _trace_lock:
+        _query_stats.clear()
 
 
 # =====================================================
 # CONNECTION
 # =====================================================
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+    group = getattr(_group, "conn", None)
+    if group is not None:
+        return group
+    timeout = BUSY_TIMEOUT_MS / 1000
+    if _trace["enabled"]:
+        conn = sqlite3.connect(DB_PATH, timeout=timeout, factory=TracedConnection)
+    else:
+        conn = sqlite3.connect(DB_PATH, timeout=timeout)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def get_read_conn():
+    """Read-only connection in autocommit mode (no implicit transactions)."""
+    uri = f"file:{pathname2url(os.path.abspath(DB_PATH))}?mode=ro"
+    kwargs = {"uri": True, "isolation_level": None, "check_same_thread": False}
+    if _trace["enabled"]:
+        kwargs["factory"] = TracedConnection
+    conn = sqlite3.connect(uri, **kwargs)
     conn.row_factory = sqlite3.Row
     return conn
 
 
+@contextmanager
+def read_snapshot():
+    """Consistent read-only view of the database for reports and exports.
+
+    Opens a deferred read transaction and pins its snapshot with a first
+    read. Under WAL, writers keep committing while this is open and the
+    reader never sees their changes or blocks them.
+    """
+    conn = get_read_conn()
+    try:
+        conn.execute("BEGIN DEFERRED")
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        yield conn
+    finally:
+        try:
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            pass
+        conn.close()
+
+
+# =====================================================
+# GROUPED WRITES
+# =====================================================
+# While a write group is open on a thread, get_conn() hands every CRUD
+# function the group's connection; their commit()/close() are deferred,
+# so N saves cost one transaction and one fsync instead of N.
+_group = threading.local()
+
+
+class _GroupConn:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def write_group():
+    """Yields step(fn, *args, **kwargs) that runs one write in the group.
+
+    Each step is wrapped in a savepoint: a step that raises is rolled back
+    on its own and its exception re-raised to the caller, the others are
+    kept. Everything is committed together when the block exits.
+    """
+    if getattr(_group, "conn", None) is not None:
+        raise RuntimeError("write_group() is already open on this thread")
+
+    kwargs = {"isolation_level": None, "timeout": BUSY_TIMEOUT_MS / 1000}
+    if _trace["enabled"]:
+        kwargs["factory"] = TracedConnection
+    conn = sqlite3.connect(DB_PATH, **kwargs)
+    conn.row_factory = sqlite3.Row
+
+    def step(fn, *args, **kw):
+        conn.execute("SAVEPOINT step")
+        try:
+            result = fn(*args, **kw)
+        except Exception:
+            conn.execute("ROLLBACK TO step")
+            conn.execute("RELEASE step")
+            raise
+        conn.execute("RELEASE step")
+        return result
+
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _group.conn = _GroupConn(conn)
+        try:
+            yield step
+        finally:
+            _group.conn = None
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+# =====================================================
+# WRITE QUEUE
+# =====================================================
+# One writer thread per process drains queued writes into grouped
+# transactions (BEGIN IMMEDIATE, so the write lock is taken up front and
+# waits under the busy timeout instead of failing on a read->write
+# upgrade). If another process still holds the lock past the timeout, the
+# whole group is rolled back and retried with jittered exponential backoff.
+WRITE_RETRIES = 8
+BACKOFF_BASE_MS = 25
+BACKOFF_CAP_MS = 1000
+MAX_WRITE_GROUP = 128
+
+_write_stats = {
+    "writes": 0, "groups": 0, "max_group": 0, "retries": 0, "busy_failures": 0,
+    "last_write": 0.0,
+}
+
+
+def _is_busy(e):
+    msg = str(e).lower()
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in msg or "busy" in msg)
+
+
+def _backoff(attempt):
+    ms = min(BACKOFF_CAP_MS, BACKOFF_BASE_MS * 2 ** attempt)
+    time.sleep(random.uniform(ms / 2, ms) / 1000)
+
+
+def run_write_group(calls):
+    """calls: [(fn, args, kwargs)] -> [(ok, result_or_exception)].
+
+    All calls share one transaction; a call that raises is rolled back on
+    its own. Lock contention retries the whole group.
+    """
+    for attempt in range(WRITE_RETRIES + 1):
+        out = []
+        try:
+            with write_group() as step:
+                for fn, args, kwargs in calls:
+                    try:
+                        out.append((True, step(fn, *args, **kwargs)))
+                    except Exception as e:
+                        if _is_busy(e):
+                            raise
+                        out.append((False, e))
+        except Exception as e:
+            if _is_busy(e) and attempt < WRITE_RETRIES:
+                _write_stats["retries"] += 1
+                _backoff(attempt)
+                continue
+            if _is_busy(e):
+                _write_stats["busy_failures"] += 1
+            return [(False, e)] * len(calls)
+
+        _write_stats["writes"] += len(calls)
+        _write_stats["groups"] += 1
+        _write_stats["max_group"] = max(_write_stats["max_group"], len(calls))
+        _write_stats["last_write"] = time.time()
+        return out
+
+
+class _Writer:
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, fn, args, kwargs):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                    self.thread.start()
+        fut = Future()
+        self.queue.put((fn, args, kwargs, fut))
+        return fut
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < MAX_WRITE_GROUP:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            results = run_write_group([(fn, args, kwargs) for fn, args, kwargs, _ in batch])
+            for (_, _, _, fut), (ok, value) in zip(batch, results):
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(value)
+
+
+_writer = _Writer()
+
+
+def _queued_write(fn):
+    """Run a CRUD write on the writer thread and wait for its result."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not WRITE_QUEUE or getattr(_group, "conn", None) is not None:
+            return fn(*args, **kwargs)
+        return _writer.submit(fn, args, kwargs).result()
+    return wrapper
+
+
+def write_queue_stats():
+    st = dict(_write_stats)
+    st["avg_group"] = st["writes"] / st["groups"] if st["groups"] else 0.0
+    return st
+
+
+# =====================================================
+# READ CACHE
+# =====================================================
+# Read-through LRU for the small, hot lookups (jobs, consignees,
+# addresses, charges), keyed by function and arguments. Callers get
+# copies, so a form editing a returned dict can't change the cache.
+#
+# Invalidation:
+#   - local writes drop their tables' entries as they run (_invalidates)
+#   - every lookup first reads PRAGMA data_version on a watcher connection;
+#     it changes whenever any other connection (another desk, the data
+#     service, or this process's writer) commits. Only then is the tiny
+#     table_versions table read, whose rows the triggers created in
+#     init_db bump, and only the tables that really changed are dropped.
+#     Draft autosaves, invoice saves etc. leave the cache alone.
+CACHE_ENTRIES = 512
+CACHED_TABLES = ("jobs", "consignees", "consignee_addresses", "charges_master", "charge_rates",
+                 "currency_rates")
+
+
+def _copy(value):
+    if isinstance(value, list):
+        return [dict(v) for v in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class _ReadCache:
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()        # key -> (tables, value)
+        self.generation = {t: 0 for t in CACHED_TABLES}
+        self.stats = {t: {"hits": 0, "misses": 0, "local_invalidations": 0,
+                          "external_invalidations": 0} for t in CACHED_TABLES}
+        self.watch = None
+        self.watch_path = None
+        self.data_version = None
+        self.versions = {}
+
+    def _drop(self, tables, counter):
+        for key in [k for k, (tabs, _) in self.entries.items() if set(tabs) & set(tables)]:
+            del self.entries[key]
+        for t in tables:
+            self.generation[t] += 1
+            self.stats[t][counter] += 1
+
+    def _check_external(self):
+        if self.watch_path != DB_PATH:
+            if self.watch is not None:
+                self.watch.close()
+            self.watch = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000,
+                                         check_same_thread=False)
+            self.watch_path = DB_PATH
+            self.data_version = None
+            self.versions = {}
+            self.entries.clear()
+            for t in self.generation:       # another file: nothing compiled from the old one holds
+                self.generation[t] += 1
+
+        version = self.watch.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return
+        self.data_version = version
+        try:
+            versions = dict(self.watch.execute("SELECT name, version FROM table_versions"))
+        except sqlite3.OperationalError:
+            versions = {}       # file from before init_db: trust nothing
+        changed = [t for t in CACHED_TABLES
+                   if t not in versions or versions[t] != self.versions.get(t)]
+        if changed:
+            self._drop(changed, "external_invalidations")
+        self.versions = versions
+
+    def get(self, tables, key, loader):
+        with self.lock:
+            self._check_external()
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats[tables[0]]["hits"] += 1
+                return _copy(entry[1])
+            self.stats[tables[0]]["misses"] += 1
+            generations = [self.generation[t] for t in tables]
+
+        value = loader()
+
+        with self.lock:
+            # Skip the store if a write invalidated these tables meanwhile
+            if [self.generation[t] for t in tables] == generations:
+                self.entries[key] = (tables, value)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return _copy(value)
+
+    def invalidate(self, *tables):
+        with self.lock:
+            self._drop(tables or CACHED_TABLES, "local_invalidations")
+
+
+_read_cache = _ReadCache()
+
+
+def _cached(*tables, with_args=True):
+    """Serve a read through _read_cache; tables it depends on.
+
+    with_args=False caches only the call without (truthy) arguments:
+    searches are one-off and would crowd out the hot entries. Reads inside a write
+    group see its uncommitted rows and always go to the database.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not READ_CACHE or getattr(_group, "conn", None) is not None:
+                return fn(*args, **kwargs)
+            if not with_args and (any(args) or any(kwargs.values())):
+                return fn(*args, **kwargs)
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            return _read_cache.get(tables, key, lambda: fn(*args, **kwargs))
+        return wrapper
+    return deco
+
+
+def _invalidates(*tables):
+    """Drop cached reads of tables once this write has run."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _read_cache.invalidate(*tables)
+        return wrapper
+    return deco
+
+
+def cache_stats():
+    """Per table: hits, misses, invalidations; plus entries held."""
+    with _read_cache.lock:
+        out = {t: dict(st) for t, st in _read_cache.stats.items()}
+        out["entries"] = len(_read_cache.entries)
+    return out
+
+
+def reset_cache_stats():
+    with _read_cache.lock:
+        for st in _read_cache.stats.values():
+            for k in st:
+                st[k] = 0
+
+
+def clear_cache():
+    _read_cache.invalidate()
+
+
+def table_generation(table):
+    """Counter that moves whenever table changes, here or on another
+    connection; for callers keeping their own compiled copy (rate
+    tables). In client mode it is the service's table_versions row,
+    fetched at most every data_client.VERSIONS_TTL seconds and again
+    after this desk's own writes."""
+    if DATA_SERVICE_URL:
+        return data_client.table_version(table)
+    with _read_cache.lock:
+        _read_cache._check_external()
+        return _read_cache.generation[table]
+
+
+def table_versions():
+    """{table: version} as the init_db triggers keep them (the service's
+    answer to client-mode table_generation)."""
+    conn = get_conn()
+    rows = conn.execute("SELECT name, version FROM table_versions").fetchall()
+    conn.close()
+    return {r["name"]: r["version"] for r in rows}
+
+
 # =====================================================
 # INIT DATABASE (CANONICAL)
 # =====================================================
@@ -23,6 +685,13 @@ def init_db():
     conn = get_conn()
     cur = conn.cursor()
 
+    # Only takes effect on a new file; existing files are converted once
+    # with `python src/maintenance.py convert` (a full VACUUM)
+    cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
+
+    # Persistent on the file; readers and the writer stop blocking each other
+    cur.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+
     # ---------------- SETTINGS ----------------
     cur.execute("""
         CREATE TABLE IF NOT EXISTS settings (
@@ -57,6 +726,11 @@ def init_db():
         )
     """)
 
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_addresses_consignee
+        ON consignee_addresses(consignee_id)
+    """)
+
     # ---------------- JOBS (SINGLE SOURCE OF TRUTH) ----------------
     cur.execute("""
         CREATE TABLE IF NOT EXISTS jobs (
@@ -121,6 +795,8 @@ def init_db():
             item_no TEXT,
             exchange_rate TEXT,
             ref_no TEXT,
+            place_of_supply TEXT,
+            supply_type TEXT,
             total_amount REAL,
             FOREIGN KEY (job_id) REFERENCES jobs(id)
         )
@@ -143,11 +819,19 @@ def init_db():
             cgst_amt REAL,
             sgst_rate REAL,
             sgst_amt REAL,
+            igst_rate REAL DEFAULT 0,
+            igst_amt REAL DEFAULT 0,
+            fx_rate REAL DEFAULT 1,
             total_amt REAL,
             FOREIGN KEY (invoice_id) REFERENCES invoices(id)
         )
     """)
 
+    # Loading / re-saving one document: its items, and it by number
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice ON invoice_items(invoice_id, sr_no)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_invoices_number ON invoices(invoice_number)")
+    ensure_invoice_number_unique(cur)
+
 
     # ---------------- CHARGE / HSN MASTER ----------------
     cur.execute("""
@@ -163,9 +847,230 @@ def init_db():
         )
     """)
 
+    # ---------------- CHARGE RATE HISTORY ----------------
+    # GST rates per charge from an effective date ('' = since the start);
+    # charges_master keeps the rates in force today
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS charge_rates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            charge_id INTEGER NOT NULL,
+            effective_from TEXT NOT NULL DEFAULT '',
+            cgst_rate REAL DEFAULT 0,
+            sgst_rate REAL DEFAULT 0,
+            igst_rate REAL DEFAULT 0,
+            created_at TEXT,
+            UNIQUE (charge_id, effective_from),
+            FOREIGN KEY (charge_id) REFERENCES charges_master(id)
+        )
+    """)
+
+    # ---------------- CURRENCY RATES ----------------
+    # INR per unit of currency from rate_date until the next row
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS currency_rates (
+            currency TEXT NOT NULL,
+            rate_date TEXT NOT NULL,
+            rate REAL NOT NULL,
+            created_at TEXT,
+            PRIMARY KEY (currency, rate_date)
+        ) WITHOUT ROWID
+    """)
+
+    # ---------------- EXPORT CACHE ----------------
+    # content hash of a document's render inputs -> exported PDF
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS export_cache (
+            content_hash TEXT PRIMARY KEY,
+            invoice_number TEXT,
+            path TEXT,
+            size INTEGER,
+            created_at TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_export_cache_path ON export_cache(path)")
+
+    # ---------------- CHARGE USAGE ----------------
+    # (customer, charge) -> last rate / frequency, kept by insert_invoice
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS charge_usage (
+            customer_id INTEGER NOT NULL,
+            charge_key TEXT NOT NULL,
+            description TEXT,
+            hsn_sac TEXT,
+            cur TEXT,
+            last_rate REAL,
+            last_qty REAL,
+            cgst_rate REAL,
+            sgst_rate REAL,
+            uses INTEGER NOT NULL DEFAULT 0,
+            last_used TEXT,
+            last_sr_no INTEGER,
+            PRIMARY KEY (customer_id, charge_key)
+        ) WITHOUT ROWID
+    """)
+
+    # ---------------- LANE CUBE ----------------
+    # month x POL x POD x customer totals, kept by insert_job / insert_invoice
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS lane_cube (
+            month TEXT NOT NULL,
+            pol TEXT NOT NULL,
+            pod TEXT NOT NULL,
+            customer_id INTEGER NOT NULL,
+            shipments INTEGER NOT NULL DEFAULT 0,
+            gross_kg REAL NOT NULL DEFAULT 0,
+            volume_m3 REAL NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, pol, pod, customer_id)
+        ) WITHOUT ROWID
+    """)
+    # Covering: lane slices aggregate from the index without touching the table
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_lane_cube_lane
+        ON lane_cube(pol, pod, month, shipments, gross_kg, volume_m3, revenue)
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_lane_cube_customer ON lane_cube(customer_id, month)")
+
+    # ---------------- DRAFTS ----------------
+    # Autosaved, not-yet-saved documents; one per desk (owner) and form type
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS drafts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            owner TEXT NOT NULL,
+            doc_type TEXT NOT NULL,
+            label TEXT,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT,
+            updated_at TEXT,
+            UNIQUE (owner, doc_type)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS draft_fields (
+            draft_id INTEGER NOT NULL,
+            field TEXT NOT NULL,
+            value TEXT,
+            PRIMARY KEY (draft_id, field)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS draft_rows (
+            draft_id INTEGER NOT NULL,
+            row_no INTEGER NOT NULL,
+            cells TEXT,
+            PRIMARY KEY (draft_id, row_no)
+        ) WITHOUT ROWID
+    """)
+
+    # ---------------- TABLE VERSIONS ----------------
+    # Bumped by triggers on every change; lets READ CACHE tell which
+    # tables another connection touched
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for t in CACHED_TABLES:
+        cur.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 0)", (t,))
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{t}_{op.lower()}_version
+                AFTER {op} ON {t}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = '{t}';
+                END
+            """)
+    conn.commit()       # the ensure_* helpers below use their own connections
+
+    ensure_invoice_schema()
+    ensure_job_metrics_schema()
     ensure_charges_schema()
     ensure_charges_schema()
     seed_default_charges_if_empty()
+    ensure_charge_rates()
+
+    conn.commit()
+    conn.close()
+
+    # Files from before charge_usage / lane_cube existed: build them once
+    if get_setting("charge_usage_built") is None:
+        rebuild_charge_usage()
+    if get_setting("lane_cube_built") is None:
+        rebuild_lane_cube()
+
+
+def ensure_invoice_number_unique(cur):
+    """One saved document per (type, invoice_number); save_invoice relies
+    on the conflict. Copies a file already holds twice are left as they
+    are: the index skips all but the latest of each, which is the one
+    get_document opens."""
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_invoices_type_number'")
+    if cur.fetchone():
+        return
+    cur.execute("""
+        SELECT i.id, i.type, i.invoice_number
+        FROM invoices i
+        JOIN (
+            SELECT type, invoice_number, MAX(id) AS last_id
+            FROM invoices
+            WHERE type IS NOT NULL AND invoice_number IS NOT NULL
+            GROUP BY type, invoice_number
+            HAVING COUNT(*) > 1
+        ) d ON d.type = i.type AND d.invoice_number = i.invoice_number AND i.id < d.last_id
+        ORDER BY i.id
+    """)
+    older = cur.fetchall()
+    where = ""
+    if older:
+        where = f" WHERE id NOT IN ({', '.join(str(r['id']) for r in older)})"
+        log.warning("%d older copies of saved document numbers left out of the unique index: %s",
+                    len(older), ", ".join(sorted({f"{r['type']} {r['invoice_number']}" for r in older})))
+    cur.execute(f"CREATE UNIQUE INDEX idx_invoices_type_number ON invoices(type, invoice_number){where}")
+
+
+def ensure_job_metrics_schema():
+    """Numeric copies of the free-text job measures (see SHIPMENT METRICS)."""
+    conn = get_conn()
+    cur = conn.cursor()
+
+    cur.execute("PRAGMA table_info(jobs)")
+    cols = [r["name"] for r in cur.fetchall()]
+
+    added = [c for c in JOB_METRIC_COLUMNS if c not in cols]
+    for c in added:
+        cur.execute(f"ALTER TABLE jobs ADD COLUMN {c} {JOB_METRIC_COLUMNS[c]}")
+
+    conn.commit()
+    conn.close()
+
+    if added:
+        normalize_job_metrics()
+
+
+def ensure_invoice_schema():
+    conn = get_conn()
+    cur = conn.cursor()
+
+    cur.execute("PRAGMA table_info(invoices)")
+    cols = [r["name"] for r in cur.fetchall()]
+
+    if "customer_id" not in cols:
+        cur.execute("ALTER TABLE invoices ADD COLUMN customer_id INTEGER")
+    for c in ("place_of_supply", "supply_type"):
+        if c not in cols:
+            cur.execute(f"ALTER TABLE invoices ADD COLUMN {c} TEXT")
+
+    # IGST (inter-state supply, see gst_rules)
+    cur.execute("PRAGMA table_info(invoice_items)")
+    cols = [r["name"] for r in cur.fetchall()]
+    for c in ("igst_rate", "igst_amt"):
+        if c not in cols:
+            cur.execute(f"ALTER TABLE invoice_items ADD COLUMN {c} REAL DEFAULT 0")
+
+    # INR per unit of the line's currency (see fx_rates)
+    if "fx_rate" not in cols:
+        cur.execute("ALTER TABLE invoice_items ADD COLUMN fx_rate REAL DEFAULT 1")
 
     conn.commit()
     conn.close()
@@ -226,6 +1131,7 @@ def get_setting(key):
     return r["value"] if r else None
 
 
+@_queued_write
 def set_setting(key, value):
     conn = get_conn()
     cur = conn.cursor()
@@ -238,15 +1144,42 @@ def set_setting(key, value):
     conn.close()
 
 
+@_queued_write
+def take_counter(name, year):
+    """Next number of the yearly series kept in settings <name>_year /
+    <name>_counter, starting again at 1 in a new year. The counter is
+    bumped by one UPDATE under the write lock, so two desks (or a desk and
+    a batch run) never draw the same number."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.executemany("INSERT OR IGNORE INTO settings(key, value) VALUES (?, ?)",
+                    [(f"{name}_year", ""), (f"{name}_counter", "0")])
+    cur.execute("""
+        UPDATE settings
+        SET value = CASE WHEN (SELECT value FROM settings WHERE key = ?) = ?
+                         THEN CAST(value AS INTEGER) + 1 ELSE 1 END
+        WHERE key = ?
+        RETURNING value
+    """, (f"{name}_year", year, f"{name}_counter"))
+    counter = int(cur.fetchone()[0])
+    cur.execute("UPDATE settings SET value=? WHERE key=?", (year, f"{name}_year"))
+    conn.commit()
+    conn.close()
+    return counter
+
+
 # =====================================================
 # JOB CRUD
 # =====================================================
+@_queued_write
+@_invalidates("jobs")
 def insert_job(data):
     conn = get_conn()
     cur = conn.cursor()
 
     data = data.copy()
     data["created_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    data.update(job_metrics(data))
 
     cols = ",".join(data.keys())
     placeholders = ",".join(["?"] * len(data))
@@ -257,6 +1190,7 @@ def insert_job(data):
     )
 
     jid = cur.lastrowid
+    _cube_add_job(cur, jid)
     conn.commit()
     conn.close()
     return jid
@@ -271,6 +1205,7 @@ def list_jobs():
     return rows
 
 
+@_cached("jobs")
 def get_job(job_id):
     conn = get_conn()
     cur = conn.cursor()
@@ -280,6 +1215,8 @@ def get_job(job_id):
     return dict(r) if r else None
 
 
+@_queued_write
+@_invalidates("jobs")
 def close_job(job_id):
     conn = get_conn()
     cur = conn.cursor()
@@ -288,6 +1225,7 @@ def close_job(job_id):
     conn.close()
 
 
+@_cached("jobs")
 def list_jobs_for_dropdown():
     conn = get_conn()
     cur = conn.cursor()
@@ -301,6 +1239,7 @@ def list_jobs_for_dropdown():
     return rows
 
 
+@_cached("jobs")
 def list_open_jobs_for_dropdown():
     conn = get_conn()
     cur = conn.cursor()
@@ -318,6 +1257,8 @@ def list_open_jobs_for_dropdown():
 # =====================================================
 # CONSIGNEE CRUD
 # =====================================================
+@_queued_write
+@_invalidates("consignees")
 def add_consignee(name, gstin=None, pan=None):
     conn = get_conn()
     cur = conn.cursor()
@@ -331,6 +1272,7 @@ def add_consignee(name, gstin=None, pan=None):
     return cid
 
 
+@_cached("consignees", with_args=False)
 def list_consignees(search=None):
     conn = get_conn()
     cur = conn.cursor()
@@ -350,6 +1292,37 @@ def list_consignees(search=None):
     return rows
 
 
+@_cached("consignees", "consignee_addresses", with_args=False)
+def list_consignees_with_address_labels(search=None):
+    """list_consignees plus an 'address_labels' summary, in one query."""
+    conn = get_conn()
+    cur = conn.cursor()
+
+    sql = """
+        SELECT c.*, (
+            SELECT GROUP_CONCAT(label, ', ') FROM (
+                SELECT label FROM consignee_addresses
+                WHERE consignee_id = c.id
+                ORDER BY is_default DESC
+            )
+        ) AS address_labels
+        FROM consignees c
+    """
+    if search:
+        q = f"%{search}%"
+        cur.execute(sql + """
+            WHERE c.name LIKE ? OR c.gstin LIKE ? OR c.pan LIKE ?
+            ORDER BY c.name
+        """, (q, q, q))
+    else:
+        cur.execute(sql + " ORDER BY c.name")
+
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+@_cached("consignees")
 def get_consignee(consignee_id):
     conn = get_conn()
     cur = conn.cursor()
@@ -359,6 +1332,8 @@ def get_consignee(consignee_id):
     return dict(r) if r else None
 
 
+@_queued_write
+@_invalidates("consignees")
 def update_consignee(consignee_id, name, gstin=None, pan=None):
     conn = get_conn()
     cur = conn.cursor()
@@ -371,6 +1346,8 @@ def update_consignee(consignee_id, name, gstin=None, pan=None):
     conn.close()
 
 
+@_queued_write
+@_invalidates("consignees", "consignee_addresses")
 def delete_consignee(consignee_id):
     conn = get_conn()
     cur = conn.cursor()
@@ -383,6 +1360,8 @@ def delete_consignee(consignee_id):
 # =====================================================
 # ADDRESS CRUD
 # =====================================================
+@_queued_write
+@_invalidates("consignee_addresses")
 def add_consignee_address(consignee_id, label, address, state, state_code, pincode, country, is_default):
     conn = get_conn()
     cur = conn.cursor()
@@ -403,6 +1382,7 @@ def add_consignee_address(consignee_id, label, address, state, state_code, pinco
     conn.close()
 
 
+@_cached("consignee_addresses")
 def get_addresses_for_consignee(consignee_id):
     conn = get_conn()
     cur = conn.cursor()
@@ -416,6 +1396,34 @@ def get_addresses_for_consignee(consignee_id):
     return rows
 
 
+def list_default_addresses():
+    """{consignee_id: address} with each consignee's default (else first) address."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT * FROM consignee_addresses
+        ORDER BY consignee_id, is_default DESC, id
+    """)
+    rows = {}
+    for r in cur.fetchall():
+        rows.setdefault(r["consignee_id"], dict(r))
+    conn.close()
+    return rows
+
+
+def address_text(addr):
+    """Bill-to block for an address row, label first (the invoice form and
+    batch invoicing both write it; load_document finds the address by it)."""
+    return (
+        f"{addr['label']}\n"
+        f"{addr['address']}\n"
+        f"{addr['state']} - {addr['pincode']}\n"
+        f"{addr['country']}"
+    )
+
+
+@_queued_write
+@_invalidates("consignee_addresses")
 def update_address(address_id, label, address, state, state_code, pincode, country, is_default):
     conn = get_conn()
     cur = conn.cursor()
@@ -439,6 +1447,8 @@ def update_address(address_id, label, address, state, state_code, pincode, count
     conn.close()
 
 
+@_queued_write
+@_invalidates("consignee_addresses")
 def delete_address(address_id):
     conn = get_conn()
     cur = conn.cursor()
@@ -450,10 +1460,33 @@ def delete_address(address_id):
 # =====================================================
 # INVOICE SAVE
 # =====================================================
-def insert_invoice(header, items):
-    conn = get_conn()
-    cur = conn.cursor()
+# Item columns a save writes (id / invoice_id belong to the row)
+ITEM_COLUMNS = (
+    "sr_no", "description", "hsn_sac", "cur", "rate", "qty", "amount",
+    "taxable_amount", "cgst_rate", "cgst_amt", "sgst_rate", "sgst_amt",
+    "igst_rate", "igst_amt", "fx_rate", "total_amt",
+)
+ITEM_DEFAULTS = {"igst_rate": 0, "igst_amt": 0, "fx_rate": 1}
+
 
+def _item_values(it):
+    return [it.get(c, ITEM_DEFAULTS[c]) if c in ITEM_DEFAULTS else it[c] for c in ITEM_COLUMNS]
+
+
+def _insert_items(cur, invoice_id, items):
+    cur.executemany(
+        f"INSERT INTO invoice_items (invoice_id, {', '.join(ITEM_COLUMNS)}) "
+        f"VALUES (?{', ?' * len(ITEM_COLUMNS)})",
+        [(invoice_id, *_item_values(it)) for it in items]
+    )
+
+
+def _revenue(items):
+    return sum(it["taxable_amount"] or 0 for it in items)
+
+
+def _insert_document(cur, header, items):
+    header = {k: v for k, v in header.items() if k != "id"}
     cols = ",".join(header.keys())
     placeholders = ",".join(["?"] * len(header))
 
@@ -463,58 +1496,268 @@ def insert_invoice(header, items):
     )
 
     invoice_id = cur.lastrowid
+    _insert_items(cur, invoice_id, items)
+    _record_charge_usage(cur, header, items)
+    _cube_add_invoice(cur, invoice_id, _revenue(items))
+    return invoice_id
 
-    for it in items:
-        cur.execute("""
-            INSERT INTO invoice_items
-            (invoice_id, sr_no, description, hsn_sac, cur, rate, qty, amount,
-             taxable_amount, cgst_rate, cgst_amt, sgst_rate, sgst_amt, total_amt)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            invoice_id,
-            it["sr_no"],
-            it["description"],
-            it["hsn_sac"],
-            it["cur"],
-            it["rate"],
-            it["qty"],
-            it["amount"],
-            it["taxable_amount"],
-            it["cgst_rate"],
-            it["cgst_amt"],
-            it["sgst_rate"],
-            it["sgst_amt"],
-            it["total_amt"]
-        ))
 
+@_queued_write
+def insert_invoice(header, items):
+    conn = get_conn()
+    cur = conn.cursor()
+    invoice_id = _insert_document(cur, header, items)
     conn.commit()
     conn.close()
     return invoice_id
 
+
+def diff_items(old, new):
+    """Row-level diff of saved invoice_items rows (old) against items (new).
+
+    A new item matches the saved row with its "id" (rows loaded through
+    get_document keep theirs), else the saved row with its sr_no if no
+    earlier item took it.
+    Returns (updates [(id, item)], inserts [item], deletes [id], unchanged).
+    """
+    by_id = {o["id"]: o for o in old}
+    by_sr = {o["sr_no"]: o for o in old}
+    matched = set()
+    updates, inserts = [], []
+    for it in new:
+        o = by_id.get(it.get("id")) if it.get("id") is not None else by_sr.get(it.get("sr_no"))
+        if o is None or o["id"] in matched:
+            inserts.append(it)
+            continue
+        matched.add(o["id"])
+        if _item_values(it) != [o[c] for c in ITEM_COLUMNS]:
+            updates.append((o["id"], it))
+    deletes = [o["id"] for o in old if o["id"] not in matched]
+    return updates, inserts, deletes, len(matched) - len(updates)
+
+
+@_queued_write
+def save_invoice(header, items):
+    """Insert a new document, or update in place the saved one whose "id"
+    the header carries (as get_document returns it). Saving the same
+    document twice writes nothing the second time; an edit UPDATEs /
+    INSERTs / DELETEs only the invoice_items rows that changed, all in one
+    transaction.
+
+    Only that document is ever updated: a new one whose (type,
+    invoice_number) is already saved raises sqlite3.IntegrityError from the
+    unique index rather than overwriting it.
+
+    Returns (invoice_id, {"inserted", "updated", "deleted", "unchanged"}).
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    if header.get("id") is None:
+        invoice_id = _insert_document(cur, header, items)
+        stats = {"inserted": len(items), "updated": 0, "deleted": 0, "unchanged": 0}
+    else:
+        cur.execute("SELECT * FROM invoices WHERE id=?", (header["id"],))
+        saved = cur.fetchone()
+        if saved is None:
+            raise ValueError(f"no saved document with id {header['id']}")
+        invoice_id = saved["id"]
+        cur.execute("SELECT * FROM invoice_items WHERE invoice_id=? ORDER BY sr_no", (invoice_id,))
+        old = [dict(r) for r in cur.fetchall()]
+        updates, inserts, deletes, unchanged = diff_items(old, items)
+        cols = saved.keys()
+        changed = {k: v for k, v in header.items() if k != "id" and (k not in cols or saved[k] != v)}
+        stats = {"inserted": len(inserts), "updated": len(updates),
+                 "deleted": len(deletes), "unchanged": unchanged}
+
+        if changed or updates or inserts or deletes:
+            # Revenue leaves the old lane cell and lands in the (maybe new) one
+            if changed:
+                _cube_add_invoice(cur, invoice_id, -_revenue(old))
+                cur.execute(
+                    f"UPDATE invoices SET {', '.join(f'{k}=?' for k in changed)} WHERE id=?",
+                    [*changed.values(), invoice_id]
+                )
+            if deletes:
+                cur.executemany("DELETE FROM invoice_items WHERE id=?", [(i,) for i in deletes])
+            if updates:
+                cur.executemany(
+                    f"UPDATE invoice_items SET {', '.join(f'{c}=?' for c in ITEM_COLUMNS)} WHERE id=?",
+                    [(*_item_values(it), item_id) for item_id, it in updates]
+                )
+            if inserts:
+                _insert_items(cur, invoice_id, inserts)
+                # Lines already on the document were counted when first saved
+                _record_charge_usage(cur, {**dict(saved), **header}, inserts)
+            delta = _revenue(items) - (0 if changed else _revenue(old))
+            if delta:
+                _cube_add_invoice(cur, invoice_id, delta)
+
+    conn.commit()
+    conn.close()
+    return invoice_id, stats
+
+
+# Report / export readers pass snapshot=conn from read_snapshot()
+def get_invoice(invoice_id, snapshot=None):
+    conn = snapshot or get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM invoices WHERE id=?", (invoice_id,))
+    r = cur.fetchone()
+    if not snapshot:
+        conn.close()
+    return dict(r) if r else None
+
+
+def get_invoice_items(invoice_id, snapshot=None):
+    conn = snapshot or get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT * FROM invoice_items
+        WHERE invoice_id=?
+        ORDER BY sr_no
+    """, (invoice_id,))
+    rows = [dict(r) for r in cur.fetchall()]
+    if not snapshot:
+        conn.close()
+    return rows
+
+
+_ITEM_SELECT = ", ".join(f"it.{c}" for c in ("id", "invoice_id") + ITEM_COLUMNS)
+
+
+def get_document(invoice_id=None, invoice_number=None, snapshot=None, doc_type=None):
+    """(header, items) of a saved invoice / debit note, by id or by number
+    (the latest if a number was saved twice), in one joined query; None if
+    there is no such document. An invoice and a debit note may share a
+    number: pass doc_type to say which (documents saved without a type
+    match any)."""
+    if invoice_id is not None:
+        where, args = "i.id = ?", (invoice_id,)
+    elif doc_type is not None:
+        where = ("i.id = (SELECT MAX(id) FROM invoices WHERE invoice_number = ?"
+                 " AND (type = ? OR type IS NULL))")
+        args = (invoice_number, doc_type)
+    else:
+        where, args = "i.id = (SELECT MAX(id) FROM invoices WHERE invoice_number = ?)", (invoice_number,)
+    conn = snapshot or get_conn()
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT i.*, {_ITEM_SELECT}
+        FROM invoices i
+        LEFT JOIN invoice_items it ON it.invoice_id = i.id
+        WHERE {where}
+        ORDER BY it.sr_no, it.id
+    """, args)
+    rows = cur.fetchall()
+    if not snapshot:
+        conn.close()
+    if not rows:
+        return None
+
+    # invoices columns first, then the item's; one header, one item per row
+    n = len(rows[0]) - len(ITEM_COLUMNS) - 2
+    keys = rows[0].keys()[:n]
+    header = dict(zip(keys, rows[0][:n]))
+    item_keys = ("id", "invoice_id") + ITEM_COLUMNS
+    items = [dict(zip(item_keys, r[n:])) for r in rows if r[n] is not None]
+    return header, items
+
+
+def list_invoiced_job_ids(doc_type="INVOICE"):
+    """Ids of jobs that already have a saved document of doc_type."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT DISTINCT job_id FROM invoices
+        WHERE type=? AND job_id IS NOT NULL
+    """, (doc_type,))
+    ids = {r["job_id"] for r in cur.fetchall()}
+    conn.close()
+    return ids
+
+
+# =====================================================
+# EXPORT CACHE
+# =====================================================
+def get_export_cache(content_hashes):
+    """{content_hash: row} for the hashes that are indexed."""
+    hashes = list(content_hashes)
+    if not hashes:
+        return {}
+
+    conn = get_conn()
+    cur = conn.cursor()
+    found = {}
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        cur.execute(
+            f"SELECT * FROM export_cache WHERE content_hash IN ({','.join('?' * len(chunk))})",
+            chunk
+        )
+        for r in cur.fetchall():
+            found[r["content_hash"]] = dict(r)
+    conn.close()
+    return found
+
+
+@_queued_write
+def put_export_cache(content_hash, invoice_number, path, size):
+    conn = get_conn()
+    cur = conn.cursor()
+    # The file at this path was overwritten; older hashes no longer match it
+    cur.execute("DELETE FROM export_cache WHERE path=? AND content_hash<>?", (path, content_hash))
+    cur.execute("""
+        INSERT INTO export_cache(content_hash, invoice_number, path, size, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(content_hash) DO UPDATE SET
+            invoice_number=excluded.invoice_number,
+            path=excluded.path,
+            size=excluded.size,
+            created_at=excluded.created_at
+    """, (content_hash, invoice_number, path, size, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    conn.commit()
+    conn.close()
+
+
+@_queued_write
+def delete_export_cache(content_hash):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM export_cache WHERE content_hash=?", (content_hash,))
+    conn.commit()
+    conn.close()
+
+
 # =====================================================
 # CHARGE / HSN MASTER
 # =====================================================
 
-def add_charge(charge_name, hsn_sac, currency, cgst_rate, sgst_rate):
+@_queued_write
+@_invalidates("charges_master", "charge_rates")
+def add_charge(charge_name, hsn_sac, currency, cgst_rate, sgst_rate, igst_rate=None):
     conn = get_conn()
     cur = conn.cursor()
+    igst_rate = igst_rate or (cgst_rate or 0) + (sgst_rate or 0)
     cur.execute("""
         INSERT INTO charges_master
-        (charge_name, hsn_sac, currency, cgst_rate, sgst_rate, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
+        (charge_name, hsn_sac, currency, cgst_rate, sgst_rate, igst_rate, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
     """, (
         charge_name,
         hsn_sac,
         currency,
         cgst_rate,
         sgst_rate,
+        igst_rate,
         datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     ))
+    _put_charge_rate(cur, cur.lastrowid, "", cgst_rate, sgst_rate, igst_rate)
     conn.commit()
     conn.close()
 
 
 
+@_cached("charges_master")
 def list_charges():
     conn = get_conn()
     cur = conn.cursor()
@@ -530,6 +1773,7 @@ def list_charges():
 
 
 
+@_cached("charges_master")
 def get_charge(charge_id):
     conn = get_conn()
     cur = conn.cursor()
@@ -539,19 +1783,34 @@ def get_charge(charge_id):
     return dict(r) if r else None
 
 
-def update_charge(charge_id, charge_name, hsn_sac, currency, cgst_rate, sgst_rate):
+@_queued_write
+@_invalidates("charges_master", "charge_rates")
+def update_charge(charge_id, charge_name, hsn_sac, currency, cgst_rate, sgst_rate,
+                  effective_from=None, igst_rate=None):
+    """New rates apply from effective_from (default today); invoices dated
+    earlier keep the rates that were in force then."""
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("""
         UPDATE charges_master
-        SET charge_name=?, hsn_sac=?, currency=?, cgst_rate=?, sgst_rate=?
+        SET charge_name=?, hsn_sac=?, currency=?
         WHERE id=?
-    """, (charge_name, hsn_sac, currency, cgst_rate, sgst_rate, charge_id))
+    """, (charge_name, hsn_sac, currency, charge_id))
+
+    effective_from = effective_from or datetime.now().strftime("%Y-%m-%d")
+    igst_rate = igst_rate or (cgst_rate or 0) + (sgst_rate or 0)
+    in_force = _charge_rate_at(cur, charge_id, effective_from)
+    if in_force is None or (in_force["cgst_rate"], in_force["sgst_rate"], in_force["igst_rate"]) != \
+            (cgst_rate, sgst_rate, igst_rate):
+        _put_charge_rate(cur, charge_id, effective_from, cgst_rate, sgst_rate, igst_rate)
+    _sync_current_rates(cur, charge_id)
     conn.commit()
     conn.close()
 
 
 
+@_queued_write
+@_invalidates("charges_master")
 def delete_charge(charge_id):
     conn = get_conn()
     cur = conn.cursor()
@@ -598,6 +1857,728 @@ def seed_default_charges():
     conn.close()
 
 
+# =====================================================
+# CHARGE RATE HISTORY
+# =====================================================
+# charge_rates holds every rate a charge has had, from its effective date.
+# Point lookups (get_charge_rate) use the (charge_id, effective_from)
+# unique index; batch work loads list_charge_rates() once into
+# gst_rules.RateTable and bisects per line.
+def _put_charge_rate(cur, charge_id, effective_from, cgst_rate, sgst_rate, igst_rate):
+    cur.execute("""
+        INSERT INTO charge_rates
+        (charge_id, effective_from, cgst_rate, sgst_rate, igst_rate, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (charge_id, effective_from) DO UPDATE SET
+            cgst_rate = excluded.cgst_rate,
+            sgst_rate = excluded.sgst_rate,
+            igst_rate = excluded.igst_rate,
+            created_at = excluded.created_at
+    """, (charge_id, effective_from or "", cgst_rate, sgst_rate, igst_rate,
+          datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def _charge_rate_at(cur, charge_id, date):
+    cur.execute("""
+        SELECT * FROM charge_rates
+        WHERE charge_id = ? AND effective_from <= ?
+        ORDER BY effective_from DESC
+        LIMIT 1
+    """, (charge_id, date))
+    r = cur.fetchone()
+    return dict(r) if r else None
+
+
+def _sync_current_rates(cur, charge_id=None):
+    """charges_master rates := the history row in force today."""
+    cur.execute(f"""
+        UPDATE charges_master AS c
+        SET cgst_rate = r.cgst_rate, sgst_rate = r.sgst_rate, igst_rate = r.igst_rate
+        FROM (
+            SELECT charge_id, cgst_rate, sgst_rate, igst_rate,
+                   ROW_NUMBER() OVER (PARTITION BY charge_id ORDER BY effective_from DESC) AS rn
+            FROM charge_rates
+            WHERE effective_from <= ? {"AND charge_id = ?" if charge_id else ""}
+        ) AS r
+        WHERE r.charge_id = c.id AND r.rn = 1
+          AND (c.cgst_rate IS NOT r.cgst_rate OR c.sgst_rate IS NOT r.sgst_rate
+               OR c.igst_rate IS NOT r.igst_rate)
+    """, (datetime.now().strftime("%Y-%m-%d"), *([charge_id] if charge_id else [])))
+
+
+def ensure_charge_rates():
+    """Start a history for charges that have none (existing files, bulk
+    loads) and bring current rates up to date with changes now in force."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO charge_rates
+        (charge_id, effective_from, cgst_rate, sgst_rate, igst_rate, created_at)
+        SELECT c.id, '', COALESCE(c.cgst_rate, 0), COALESCE(c.sgst_rate, 0),
+               COALESCE(NULLIF(c.igst_rate, 0), COALESCE(c.cgst_rate, 0) + COALESCE(c.sgst_rate, 0)), ?
+        FROM charges_master c
+        WHERE NOT EXISTS (SELECT 1 FROM charge_rates r WHERE r.charge_id = c.id)
+    """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+    _sync_current_rates(cur)
+    conn.commit()
+    conn.close()
+
+
+def get_charge_rate(charge_id, date):
+    """Rates in force for a charge on date (YYYY-MM-DD), or None."""
+    conn = get_conn()
+    r = _charge_rate_at(conn.cursor(), charge_id, date)
+    conn.close()
+    return r
+
+
+@_cached("charge_rates", "charges_master")
+def list_charge_rates(charge_id=None):
+    """History rows with the charge's name and HSN/SAC, oldest first."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT r.*, c.charge_name, c.hsn_sac
+        FROM charge_rates r
+        JOIN charges_master c ON c.id = r.charge_id
+        {"WHERE r.charge_id = ?" if charge_id else ""}
+        ORDER BY r.charge_id, r.effective_from
+    """, (charge_id,) if charge_id else ())
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+# =====================================================
+# CURRENCY RATES
+# =====================================================
+# One row per (currency, date): INR per unit, in force until the next
+# row. Forms and batches read list_currency_rates() once into an
+# fx_rates.RateBook; get_currency_rate is the single-lookup path.
+@_queued_write
+@_invalidates("currency_rates")
+def set_currency_rate(currency, rate_date, rate):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO currency_rates (currency, rate_date, rate, created_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (currency, rate_date) DO UPDATE SET
+            rate = excluded.rate,
+            created_at = excluded.created_at
+    """, (currency.strip().upper(), rate_date, rate, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    conn.commit()
+    conn.close()
+
+
+@_queued_write
+@_invalidates("currency_rates")
+def delete_currency_rate(currency, rate_date):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "DELETE FROM currency_rates WHERE currency=? AND rate_date=?",
+        (currency.strip().upper(), rate_date)
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_currency_rate(currency, date):
+    """INR per unit of currency in force on date, or None."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT rate FROM currency_rates
+        WHERE currency = ? AND rate_date <= ?
+        ORDER BY rate_date DESC
+        LIMIT 1
+    """, ((currency or "").strip().upper(), date))
+    r = cur.fetchone()
+    conn.close()
+    return r["rate"] if r else None
+
+
+@_cached("currency_rates")
+def list_currency_rates(currency=None):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT currency, rate_date, rate FROM currency_rates
+        {"WHERE currency = ?" if currency else ""}
+        ORDER BY currency, rate_date
+    """, ((currency.strip().upper(),) if currency else ()))
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+# =====================================================
+# CHARGE USAGE
+# =====================================================
+# One row per (customer, charge) with the rate, qty and GST last billed
+# and how many lines used it. insert_invoice upserts it in the same
+# transaction, so get_charge_suggestions() is a single primary-key range
+# read instead of a scan over the customer's invoice_items.
+PREFILL_LIMIT = 15
+
+
+def _charge_key(description):
+    # Same as lower(trim(description)) in rebuild_charge_usage()
+    return (description or "").strip().lower()
+
+
+def _invoice_customer(cur, header):
+    if header.get("customer_id"):
+        return header["customer_id"]
+    if header.get("job_id"):
+        cur.execute("SELECT customer_id FROM jobs WHERE id=?", (header["job_id"],))
+        r = cur.fetchone()
+        return r["customer_id"] if r else None
+    return None
+
+
+def _intra_rates(it):
+    """CGST / SGST to suggest; an inter-state line's IGST splits in half."""
+    if it["cgst_rate"] or it["sgst_rate"]:
+        return it["cgst_rate"], it["sgst_rate"]
+    igst = it.get("igst_rate") or 0
+    return igst / 2, igst / 2
+
+
+def _record_charge_usage(cur, header, items):
+    customer_id = _invoice_customer(cur, header)
+    if not customer_id:
+        return
+    date = header.get("date") or datetime.now().strftime("%Y-%m-%d")
+    rows = [
+        (customer_id, _charge_key(it["description"]), it["description"].strip(),
+         it["hsn_sac"], it["cur"], it["rate"], it["qty"], *_intra_rates(it),
+         date, it["sr_no"])
+        for it in items if _charge_key(it.get("description"))
+    ]
+    # An older invoice entered late still counts, but doesn't replace the rate
+    cur.executemany("""
+        INSERT INTO charge_usage
+        (customer_id, charge_key, description, hsn_sac, cur, last_rate, last_qty,
+         cgst_rate, sgst_rate, uses, last_used, last_sr_no)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
+        ON CONFLICT (customer_id, charge_key) DO UPDATE SET
+            uses = uses + 1,
+            description = CASE WHEN excluded.last_used >= last_used THEN excluded.description ELSE description END,
+            hsn_sac     = CASE WHEN excluded.last_used >= last_used THEN excluded.hsn_sac ELSE hsn_sac END,
+            cur         = CASE WHEN excluded.last_used >= last_used THEN excluded.cur ELSE cur END,
+            last_rate   = CASE WHEN excluded.last_used >= last_used THEN excluded.last_rate ELSE last_rate END,
+            last_qty    = CASE WHEN excluded.last_used >= last_used THEN excluded.last_qty ELSE last_qty END,
+            cgst_rate   = CASE WHEN excluded.last_used >= last_used THEN excluded.cgst_rate ELSE cgst_rate END,
+            sgst_rate   = CASE WHEN excluded.last_used >= last_used THEN excluded.sgst_rate ELSE sgst_rate END,
+            last_sr_no  = CASE WHEN excluded.last_used >= last_used THEN excluded.last_sr_no ELSE last_sr_no END,
+            last_used   = MAX(last_used, excluded.last_used)
+    """, rows)
+
+
+def get_charge_suggestions(customer_id, limit=PREFILL_LIMIT):
+    """The customer's most used charges with last-billed rates, in the
+    order they usually appear on the invoice. charge_id is the active
+    charges_master row with the same name, if any."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT u.*, c.id AS charge_id FROM (
+            SELECT * FROM charge_usage WHERE customer_id = ?
+            ORDER BY uses DESC, last_used DESC LIMIT ?
+        ) u
+        LEFT JOIN charges_master c
+            ON lower(c.charge_name) = u.charge_key AND c.is_active = 1
+        GROUP BY u.charge_key
+        ORDER BY u.last_sr_no, u.uses DESC
+    """, (customer_id, limit))
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+def list_charge_templates(limit=PREFILL_LIMIT):
+    """{customer_id: get_charge_suggestions() rows} for every customer in
+    one read (batch invoicing)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT u.*, c.id AS charge_id FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY customer_id ORDER BY uses DESC, last_used DESC
+            ) AS rn
+            FROM charge_usage
+        ) u
+        LEFT JOIN charges_master c
+            ON lower(c.charge_name) = u.charge_key AND c.is_active = 1
+        WHERE u.rn <= ?
+        GROUP BY u.customer_id, u.charge_key
+        ORDER BY u.customer_id, u.last_sr_no, u.uses DESC
+    """, (limit,))
+    templates = {}
+    for r in cur.fetchall():
+        row = dict(r)
+        del row["rn"]
+        templates.setdefault(row["customer_id"], []).append(row)
+    conn.close()
+    return templates
+
+
+def rebuild_charge_usage():
+    """Recompute charge_usage from all saved invoices. Returns rows indexed."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM charge_usage")
+    cur.execute("""
+        INSERT INTO charge_usage
+        (customer_id, charge_key, description, hsn_sac, cur, last_rate, last_qty,
+         cgst_rate, sgst_rate, uses, last_used, last_sr_no)
+        SELECT customer_id, charge_key, description, hsn_sac, cur, rate, qty,
+               cgst_rate, sgst_rate, uses, date, sr_no
+        FROM (
+            SELECT COALESCE(i.customer_id, j.customer_id) AS customer_id,
+                   lower(trim(it.description)) AS charge_key,
+                   trim(it.description) AS description,
+                   it.hsn_sac, it.cur, it.rate, it.qty,
+                   CASE WHEN it.cgst_rate OR it.sgst_rate THEN it.cgst_rate
+                        ELSE COALESCE(it.igst_rate, 0) / 2.0 END AS cgst_rate,
+                   CASE WHEN it.cgst_rate OR it.sgst_rate THEN it.sgst_rate
+                        ELSE COALESCE(it.igst_rate, 0) / 2.0 END AS sgst_rate,
+                   i.date, it.sr_no,
+                   COUNT(*) OVER w AS uses,
+                   ROW_NUMBER() OVER (w ORDER BY i.date DESC, i.id DESC, it.sr_no DESC) AS rn
+            FROM invoice_items it
+            JOIN invoices i ON i.id = it.invoice_id
+            LEFT JOIN jobs j ON j.id = i.job_id
+            WHERE COALESCE(i.customer_id, j.customer_id) IS NOT NULL
+              AND trim(COALESCE(it.description, '')) <> ''
+            WINDOW w AS (PARTITION BY COALESCE(i.customer_id, j.customer_id),
+                                      lower(trim(it.description)))
+        )
+        WHERE rn = 1
+    """)
+    count = cur.rowcount
+    cur.execute(
+        "INSERT OR REPLACE INTO settings (key, value) VALUES ('charge_usage_built', ?)",
+        (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),)
+    )
+    conn.commit()
+    conn.close()
+    return count
+
+
+# =====================================================
+# DRAFTS (AUTOSAVE)
+# =====================================================
+# draft_autosave.DraftAutosave sends only what changed since its last
+# write: a {field: value} dict, {row_no: cells_json} for changed rows and
+# the current row count (rows past it are dropped).
+@_queued_write
+def save_draft_changes(owner, doc_type, fields, rows, row_count, label=None):
+    conn = get_conn()
+    cur = conn.cursor()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    cur.execute("""
+        INSERT INTO drafts (owner, doc_type, label, row_count, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (owner, doc_type) DO UPDATE SET
+            label = COALESCE(excluded.label, label),
+            row_count = excluded.row_count,
+            updated_at = excluded.updated_at
+        RETURNING id
+    """, (owner, doc_type, label, row_count, now, now))
+    draft_id = cur.fetchone()["id"]
+
+    if fields:
+        cur.executemany("""
+            INSERT INTO draft_fields (draft_id, field, value) VALUES (?, ?, ?)
+            ON CONFLICT (draft_id, field) DO UPDATE SET value = excluded.value
+        """, [(draft_id, k, v) for k, v in fields.items()])
+    if rows:
+        cur.executemany("""
+            INSERT INTO draft_rows (draft_id, row_no, cells) VALUES (?, ?, ?)
+            ON CONFLICT (draft_id, row_no) DO UPDATE SET cells = excluded.cells
+        """, [(draft_id, int(r), cells) for r, cells in rows.items()])
+    cur.execute("DELETE FROM draft_rows WHERE draft_id=? AND row_no>=?", (draft_id, row_count))
+
+    conn.commit()
+    conn.close()
+    return draft_id
+
+
+def get_draft(owner, doc_type):
+    """{"id", "label", "updated_at", "fields": {..}, "rows": [cells_json, ..]} or None."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM drafts WHERE owner=? AND doc_type=?", (owner, doc_type))
+    r = cur.fetchone()
+    if not r:
+        conn.close()
+        return None
+    draft = dict(r)
+    cur.execute("SELECT field, value FROM draft_fields WHERE draft_id=?", (draft["id"],))
+    draft["fields"] = {f["field"]: f["value"] for f in cur.fetchall()}
+    cur.execute(
+        "SELECT cells FROM draft_rows WHERE draft_id=? AND row_no<? ORDER BY row_no",
+        (draft["id"], draft["row_count"])
+    )
+    draft["rows"] = [x["cells"] for x in cur.fetchall()]
+    conn.close()
+    return draft
+
+
+@_queued_write
+def discard_draft(owner, doc_type):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM drafts WHERE owner=? AND doc_type=?", (owner, doc_type))
+    r = cur.fetchone()
+    if r:
+        cur.execute("DELETE FROM draft_rows WHERE draft_id=?", (r["id"],))
+        cur.execute("DELETE FROM draft_fields WHERE draft_id=?", (r["id"],))
+        cur.execute("DELETE FROM drafts WHERE id=?", (r["id"],))
+    conn.commit()
+    conn.close()
+
+
+# =====================================================
+# SHIPMENT METRICS
+# =====================================================
+# jobs keeps what the clerk typed ("12,500 KGS", "2.5 MT", "40 CBM") in
+# the TEXT columns; insert_job also stores the value in a fixed unit so
+# it can be summed. Unknown units give NULL rather than a guess.
+JOB_METRIC_COLUMNS = {
+    "gross_weight_kg": "REAL",
+    "net_weight_kg": "REAL",
+    "volume_m3": "REAL",
+    "package_count": "INTEGER",
+    "exchange_rate_num": "REAL",
+}
+
+WEIGHT_UNITS_KG = {
+    "kg": 1.0, "kgs": 1.0, "kilo": 1.0, "kilos": 1.0, "kilogram": 1.0, "kilograms": 1.0,
+    "mt": 1000.0, "t": 1000.0, "ton": 1000.0, "tons": 1000.0, "tonne": 1000.0, "tonnes": 1000.0,
+    "lb": 0.45359237, "lbs": 0.45359237,
+    "g": 0.001, "gm": 0.001, "gms": 0.001, "gram": 0.001, "grams": 0.001,
+}
+VOLUME_UNITS_M3 = {
+    "cbm": 1.0, "m3": 1.0, "cum": 1.0, "cu.m": 1.0,
+    "cft": 0.028316846592, "cuft": 0.028316846592, "cu.ft": 0.028316846592,
+    "l": 0.001, "ltr": 0.001, "ltrs": 0.001, "litre": 0.001, "litres": 0.001,
+}
+
+_QTY = re.compile(r"\s*([-+]?(?:\d[\d,]*(?:\.\d*)?|\.\d+))\s*([a-z][a-z.]*\d?)?")
+
+
+def _parse_measure(text, units):
+    """'1,250.5 KGS' -> 1250.5 in the base unit of `units`; no unit = base."""
+    if text is None or text == "":
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    m = _QTY.match(str(text).lower())
+    if not m:
+        return None
+    value = float(m.group(1).replace(",", ""))
+    unit = (m.group(2) or "").rstrip(".")
+    if not unit:
+        return value
+    factor = units.get(unit)
+    return value * factor if factor is not None else None
+
+
+def job_metrics(data):
+    """Numeric columns for a job dict with the usual TEXT measures."""
+    packages = _parse_measure(data.get("packages"), {})
+    if packages is None and data.get("packages"):
+        # "25 PKGS", "3 PALLETS": the unit is the package type
+        m = _QTY.match(str(data["packages"]).lower())
+        packages = float(m.group(1).replace(",", "")) if m else None
+    return {
+        "gross_weight_kg": _parse_measure(data.get("gross_weight"), WEIGHT_UNITS_KG),
+        "net_weight_kg": _parse_measure(data.get("net_weight"), WEIGHT_UNITS_KG),
+        "volume_m3": _parse_measure(data.get("volume_cbm"), VOLUME_UNITS_M3),
+        "package_count": int(packages) if packages is not None else None,
+        "exchange_rate_num": _parse_measure(data.get("exchange_rate"), {}),
+    }
+
+
+def normalize_job_metrics(batch=5000):
+    """Fill the numeric columns of every job from its TEXT measures."""
+    conn = get_conn()
+    cur = conn.cursor()
+    rows = cur.execute(
+        "SELECT id, gross_weight, net_weight, volume_cbm, packages, exchange_rate FROM jobs"
+    ).fetchall()
+    updates = []
+    for r in rows:
+        m = job_metrics(dict(r))
+        updates.append((*(m[c] for c in JOB_METRIC_COLUMNS), r["id"]))
+    sets = ", ".join(f"{c}=?" for c in JOB_METRIC_COLUMNS)
+    for i in range(0, len(updates), batch):
+        cur.executemany(f"UPDATE jobs SET {sets} WHERE id=?", updates[i:i + batch])
+    conn.commit()
+    conn.close()
+    return len(updates)
+
+
+# =====================================================
+# LANE CUBE
+# =====================================================
+# lane_cube holds running totals per month x POL x POD x customer:
+# shipments and gross kg / m3 from jobs (month of ETD), revenue as the
+# taxable value of invoice lines (credited to the job's cell, or to the
+# invoice's own date / ports / customer when it has no job). Saves add to
+# one cell; query_lanes() only ever reads the cube.
+LANE_DIMS = ("month", "pol", "pod", "customer_id")
+
+_JOB_CELL = """
+    substr(COALESCE(NULLIF(j.etd, ''), j.created_at, ''), 1, 7),
+    upper(trim(COALESCE(j.pol, ''))),
+    upper(trim(COALESCE(j.pod, ''))),
+    COALESCE(j.customer_id, 0)
+"""
+_INVOICE_CELL = """
+    CASE WHEN j.id IS NULL THEN substr(COALESCE(i.date, ''), 1, 7)
+         ELSE substr(COALESCE(NULLIF(j.etd, ''), j.created_at, ''), 1, 7) END,
+    upper(trim(COALESCE(CASE WHEN j.id IS NULL THEN i.pol ELSE j.pol END, ''))),
+    upper(trim(COALESCE(CASE WHEN j.id IS NULL THEN i.pod ELSE j.pod END, ''))),
+    COALESCE(CASE WHEN j.id IS NULL THEN i.customer_id ELSE j.customer_id END, 0)
+"""
+_CUBE_UPSERT = """
+    ON CONFLICT (month, pol, pod, customer_id) DO UPDATE SET
+        shipments = shipments + excluded.shipments,
+        gross_kg = gross_kg + excluded.gross_kg,
+        volume_m3 = volume_m3 + excluded.volume_m3,
+        revenue = revenue + excluded.revenue
+"""
+
+
+def _cube_add_job(cur, job_id):
+    cur.execute(f"""
+        INSERT INTO lane_cube (month, pol, pod, customer_id, shipments, gross_kg, volume_m3, revenue)
+        SELECT {_JOB_CELL}, 1, COALESCE(j.gross_weight_kg, 0), COALESCE(j.volume_m3, 0), 0
+        FROM jobs j WHERE j.id = ?
+        {_CUBE_UPSERT}
+    """, (job_id,))
+
+
+def _cube_add_invoice(cur, invoice_id, revenue):
+    cur.execute(f"""
+        INSERT INTO lane_cube (month, pol, pod, customer_id, shipments, gross_kg, volume_m3, revenue)
+        SELECT {_INVOICE_CELL}, 0, 0, 0, ?
+        FROM invoices i LEFT JOIN jobs j ON j.id = i.job_id WHERE i.id = ?
+        {_CUBE_UPSERT}
+    """, (revenue, invoice_id))
+
+
+def rebuild_lane_cube():
+    """Recompute lane_cube from jobs and invoices. Returns cells written."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM lane_cube")
+    cur.execute(f"""
+        WITH cells (month, pol, pod, customer_id, shipments, gross_kg, volume_m3, revenue) AS (
+            SELECT {_JOB_CELL}, 1, COALESCE(j.gross_weight_kg, 0), COALESCE(j.volume_m3, 0), 0
+            FROM jobs j
+            UNION ALL
+            SELECT {_INVOICE_CELL}, 0, 0, 0, COALESCE(t.taxable, 0)
+            FROM invoices i
+            LEFT JOIN jobs j ON j.id = i.job_id
+            LEFT JOIN (
+                SELECT invoice_id, SUM(taxable_amount) AS taxable
+                FROM invoice_items GROUP BY invoice_id
+            ) t ON t.invoice_id = i.id
+        )
+        INSERT INTO lane_cube (month, pol, pod, customer_id, shipments, gross_kg, volume_m3, revenue)
+        SELECT month, pol, pod, customer_id,
+               SUM(shipments), SUM(gross_kg), SUM(volume_m3), SUM(revenue)
+        FROM cells
+        GROUP BY month, pol, pod, customer_id
+    """)
+    count = cur.execute("SELECT COUNT(*) FROM lane_cube").fetchone()[0]
+    cur.execute(
+        "INSERT OR REPLACE INTO settings (key, value) VALUES ('lane_cube_built', ?)",
+        (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),)
+    )
+    conn.commit()
+    conn.close()
+    return count
+
+
+def query_lanes(group_by=("pol", "pod"), month_from=None, month_to=None,
+                pol=None, pod=None, customer_id=None, limit=500):
+    """Totals for one slice of the cube, grouped by any of LANE_DIMS.
+
+    Months are 'YYYY-MM' (inclusive). Rows come highest revenue first;
+    grouping by customer_id also returns the customer name.
+    """
+    dims = [d for d in LANE_DIMS if d in group_by]
+    unknown = set(group_by) - set(LANE_DIMS)
+    if unknown:
+        raise ValueError(f"unknown lane dimension(s): {', '.join(sorted(unknown))}")
+
+    where, params = [], []
+    if month_from:
+        where.append("l.month >= ?")
+        params.append(month_from)
+    if month_to:
+        where.append("l.month <= ?")
+        params.append(month_to)
+    if pol:
+        where.append("l.pol = ?")
+        params.append(pol.strip().upper())
+    if pod:
+        where.append("l.pod = ?")
+        params.append(pod.strip().upper())
+    if customer_id:
+        where.append("l.customer_id = ?")
+        params.append(customer_id)
+
+    select = [f"l.{d}" for d in dims]
+    join = ""
+    if "customer_id" in dims:
+        select.append("c.name AS customer")
+        join = "LEFT JOIN consignees c ON c.id = l.customer_id"
+
+    sql = f"""
+        SELECT {", ".join(select + [""])}
+               SUM(l.shipments) AS shipments,
+               SUM(l.gross_kg) / 1000.0 AS tonnes,
+               SUM(l.volume_m3) AS volume_m3,
+               SUM(l.revenue) AS revenue
+        FROM lane_cube l {join}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        {"GROUP BY " + ", ".join(f"l.{d}" for d in dims) if dims else ""}
+        ORDER BY revenue DESC
+        LIMIT ?
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(sql, (*params, limit))
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+def list_lane_values():
+    """Distinct months / POLs / PODs present in the cube (for filters)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    out = {}
+    for dim in ("month", "pol", "pod"):
+        cur.execute(f"SELECT DISTINCT {dim} FROM lane_cube WHERE {dim} <> '' ORDER BY {dim}")
+        out[dim] = [r[0] for r in cur.fetchall()]
+    conn.close()
+    return out
+
+
+# =====================================================
+# STREAMING READS
+# =====================================================
+# iter_* variants of the list_* readers for exports, reports and batch
+# jobs. Rows are fetched FETCH_SIZE at a time and yielded one by one,
+# optionally projected to a few columns:
+#   row="slots"  compact __slots__ objects (r.job_no, r["job_no"], r.get())
+#   row="tuple"  plain tuples in column order
+#   row="dict"   the same dicts list_* returns
+# The connection stays open until the iterator is exhausted or closed.
+# These read the local file only; they are not served in client mode.
+FETCH_SIZE = 500
+
+
+class _SlotsRow:
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+@functools.lru_cache(maxsize=256)
+def _row_class(table, columns):
+    name = "".join(p.capitalize() for p in table.split("_")) + "Row"
+    return make_dataclass(name, columns, bases=(_SlotsRow,), slots=True)
+
+
+def _iter_rows(table, sql, params=(), columns=None, row="slots", fetch_size=FETCH_SIZE):
+    """sql selects '{cols}' from table; columns are checked against its schema."""
+    conn = get_conn()
+    try:
+        valid = [r["name"] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+        cols = tuple(columns) if columns else tuple(valid)
+        unknown = [c for c in cols if c not in valid]
+        if unknown:
+            raise ValueError(f"unknown {table} column(s): {', '.join(unknown)}")
+
+        cur = conn.cursor()
+        if row == "slots":
+            cls = _row_class(table, cols)
+            cur.row_factory = lambda _, r: cls(*r)
+        elif row == "tuple":
+            cur.row_factory = None
+        elif row == "dict":
+            cur.row_factory = lambda _, r: dict(zip(cols, r))
+        else:
+            raise ValueError(f"row must be 'slots', 'tuple' or 'dict', not {row!r}")
+
+        cur.execute(sql.format(cols=", ".join(cols)), params)
+        while True:
+            chunk = cur.fetchmany(fetch_size)
+            if not chunk:
+                break
+            yield from chunk
+    finally:
+        conn.close()
+
+
+def iter_jobs(status=None, columns=None, row="slots", fetch_size=FETCH_SIZE):
+    sql, params = "SELECT {cols} FROM jobs", ()
+    if status:
+        sql, params = sql + " WHERE status=?", (status,)
+    return _iter_rows("jobs", sql + " ORDER BY id DESC", params, columns, row, fetch_size)
+
+
+def iter_consignees(search=None, columns=None, row="slots", fetch_size=FETCH_SIZE):
+    sql, params = "SELECT {cols} FROM consignees", ()
+    if search:
+        q = f"%{search}%"
+        sql, params = sql + " WHERE name LIKE ? OR gstin LIKE ? OR pan LIKE ?", (q, q, q)
+    return _iter_rows("consignees", sql + " ORDER BY name", params, columns, row, fetch_size)
+
+
+def iter_charges(columns=None, row="slots", fetch_size=FETCH_SIZE):
+    sql = "SELECT {cols} FROM charges_master WHERE is_active = 1 ORDER BY charge_name"
+    return _iter_rows("charges_master", sql, (), columns, row, fetch_size)
+
+
+def iter_invoices(date_from=None, date_to=None, columns=None, row="slots", fetch_size=FETCH_SIZE):
+    sql, where, params = "SELECT {cols} FROM invoices", [], []
+    if date_from:
+        where.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("date <= ?")
+        params.append(date_to)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return _iter_rows("invoices", sql + " ORDER BY id", params, columns, row, fetch_size)
+
+
+def iter_invoice_items(invoice_id=None, columns=None, row="slots", fetch_size=FETCH_SIZE):
+    sql, params = "SELECT {cols} FROM invoice_items", ()
+    if invoice_id is not None:
+        sql, params = sql + " WHERE invoice_id=?", (invoice_id,)
+    return _iter_rows("invoice_items", sql + " ORDER BY invoice_id, sr_no", params, columns, row, fetch_size)
+
+
 # =====================================================
 # CUSTOMER ALIAS
 # =====================================================
@@ -611,3 +2592,16 @@ def get_customer(customer_id):
 
 def get_addresses_for_customer(customer_id):
     return get_addresses_for_consignee(customer_id)
+
+
+# =====================================================
+# CLIENT MODE (data_service)
+# =====================================================
+# With SANSHIP_DATA_SERVICE=http://host:8765 this desk never opens the
+# database file: the CRUD functions above are swapped for calls to the
+# data service, so forms keep importing them from here unchanged.
+DATA_SERVICE_URL = os.environ.get("SANSHIP_DATA_SERVICE") or None
+
+if DATA_SERVICE_URL:
+    from data_client import install_client_mode
+    install_client_mode(globals(), DATA_SERVICE_URL, os.environ.get("SANSHIP_DATA_TOKEN"))
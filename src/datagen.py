@@ -0,0 +1,270 @@
+# src/datagen.py
+# Seeded synthetic data generator (benchmarks / load testing)
+#
+#   python src/datagen.py bench.db                 -> full volume
+#   python src/datagen.py bench.db --scale 0.01    -> 1% of full volume
+
+import argparse
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import database
+from gst_rules import gstin_check_char
+
+# ===== FULL VOLUME =====
+VOLUMES = {
+    "consignees": 20_000,
+    "jobs": 100_000,
+    "invoices": 500_000,
+    "items": 3_000_000,
+}
+
+BATCH = 10_000
+
+STATES = [
+    ("Maharashtra", "27"), ("Gujarat", "24"), ("Tamil Nadu", "33"),
+    ("Karnataka", "29"), ("Delhi", "07"), ("West Bengal", "19"),
+    ("Telangana", "36"), ("Kerala", "32"), ("Haryana", "06"),
+    ("Uttar Pradesh", "09"),
+]
+
+PORTS = [
+    "INNSA", "INMUN", "INMAA", "INCCU", "INCOK", "INVTZ", "INDEL",
+    "AEJEA", "SGSIN", "CNSHA", "NLRTM", "DEHAM", "USNYC", "GBFXT",
+]
+
+NAME_A = ["Apex", "Bharat", "Coastal", "Delta", "Everest", "Global",
+          "Horizon", "Indus", "Jupiter", "Kaveri", "Lotus", "Metro"]
+NAME_B = ["Exports", "Traders", "Industries", "Logistics", "Impex",
+          "Enterprises", "Textiles", "Chemicals", "Agro", "Pharma"]
+
+CHARGES = [
+    ("Ocean Freight", "996521", "USD"), ("Air Freight", "996531", "USD"),
+    ("THC", "996719", "INR"), ("Documentation", "998599", "INR"),
+    ("Customs Clearance", "996713", "INR"), ("Transportation", "996511", "INR"),
+    ("CFS Charges", "996719", "INR"), ("BL Fee", "998599", "INR"),
+    ("Seal Charges", "996719", "INR"), ("DO Charges", "998599", "INR"),
+]
+
+START_DATE = datetime(2023, 4, 1)
+
+
+def _chunks(rows, size=BATCH):
+    buf = []
+    for r in rows:
+        buf.append(r)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def _gstin(rnd, state_code):
+    pan = "".join(rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(5))
+    pan += f"{rnd.randint(0, 9999):04d}" + rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+    gstin = f"{state_code}{pan}1Z"
+    return gstin + gstin_check_char(gstin), pan
+
+
+def _day(rnd, span=900):
+    return (START_DATE + timedelta(days=rnd.randint(0, span))).strftime("%Y-%m-%d")
+
+
+# =====================================================
+# GENERATORS
+# =====================================================
+def _consignee_rows(rnd, n):
+    for i in range(1, n + 1):
+        state, code = rnd.choice(STATES)
+        gstin, pan = _gstin(rnd, code)
+        name = f"{rnd.choice(NAME_A)} {rnd.choice(NAME_B)} {i}"
+        yield (i, name, gstin, pan), (state, code)
+
+
+def _address_rows(rnd, consignee_states):
+    for cid, (state, code) in consignee_states:
+        for k in range(rnd.randint(1, 3)):
+            yield (
+                cid,
+                "Head Office" if k == 0 else f"Branch {k}",
+                f"{rnd.randint(1, 999)}, Industrial Estate, Phase {rnd.randint(1, 4)}",
+                state,
+                code,
+                f"{rnd.randint(110000, 799999)}",
+                "India",
+                1 if k == 0 else 0,
+            )
+
+
+def _job_rows(rnd, n, n_consignees):
+    for i in range(1, n + 1):
+        etd = _day(rnd)
+        yield (
+            i,
+            f"SAN/JOB/SYN/{i:06d}",
+            rnd.randint(1, n_consignees),
+            f"{rnd.choice(NAME_A)} {rnd.choice(NAME_B)}",
+            f"{rnd.choice(NAME_A)} {rnd.choice(NAME_B)}",
+            rnd.choice(PORTS),
+            rnd.choice(PORTS),
+            f"MV {rnd.choice(NAME_A)} {rnd.randint(100, 999)}",
+            etd,
+            etd,
+            f"MBL{rnd.randint(10**8, 10**9 - 1)}",
+            f"HBL{rnd.randint(10**8, 10**9 - 1)}",
+            f"{rnd.uniform(100, 25000):.2f}",
+            f"{rnd.uniform(90, 24000):.2f}",
+            f"{rnd.uniform(1, 68):.3f}",
+            str(rnd.randint(1, 900)),
+            f"{rnd.uniform(75, 90):.2f}",
+            "OPEN" if rnd.random() < 0.2 else "CLOSED",
+            etd + " 10:00:00",
+        )
+
+
+def _invoice_rows(rnd, n, n_jobs):
+    for i in range(1, n + 1):
+        job_id = rnd.randint(1, n_jobs)
+        is_inv = rnd.random() < 0.8
+        prefix = "SAN/INV" if is_inv else "SAN/DN"
+        yield (
+            i,
+            f"{prefix}/SYN/{i:07d}",
+            _day(rnd),
+            "INVOICE" if is_inv else "DEBIT_NOTE",
+            job_id,
+            f"SAN/JOB/SYN/{job_id:06d}",
+            f"Synthetic Bill To {job_id}",
+            rnd.choice(PORTS),
+            rnd.choice(PORTS),
+            0.0,
+        )
+
+
+def _item_rows(rnd, n_items, n_invoices):
+    """Spread n_items across invoices (1..2x average lines each)."""
+    avg = max(1, n_items // max(1, n_invoices))
+    left = n_items
+    for inv in range(1, n_invoices + 1):
+        if left <= 0:
+            break
+        remaining_invoices = n_invoices - inv + 1
+        k = left if remaining_invoices == 1 else min(left, rnd.randint(1, 2 * avg - 1 or 1))
+        left -= k
+        for sr in range(1, k + 1):
+            name, hsn, cur = rnd.choice(CHARGES)
+            rate = round(rnd.uniform(500, 50000), 2)
+            qty = float(rnd.randint(1, 4))
+            taxable = rate * qty
+            cgst = taxable * 9 / 100
+            yield (
+                inv, sr, name, hsn, cur, rate, qty, taxable, taxable,
+                9.0, cgst, 9.0, cgst, taxable + 2 * cgst,
+            )
+
+
+# =====================================================
+# ENTRY POINT
+# =====================================================
+def generate(db_path, seed=42, scale=1.0, log=print, volumes=None):
+    """volumes: optional {table: rows} overriding the scaled VOLUMES."""
+    rnd = random.Random(seed)
+    n = {k: max(1, int(v * scale)) for k, v in VOLUMES.items()}
+    n.update(volumes or {})
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    database.DB_PATH = db_path
+    database.init_db()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    cur = conn.cursor()
+
+    # ---------------- CONSIGNEES + ADDRESSES ----------------
+    cons = list(_consignee_rows(rnd, n["consignees"]))
+    cur.executemany(
+        "INSERT INTO consignees (id, name, gstin, pan) VALUES (?, ?, ?, ?)",
+        [c for c, _ in cons]
+    )
+    for chunk in _chunks(_address_rows(rnd, ((c[0], s) for c, s in cons))):
+        cur.executemany("""
+            INSERT INTO consignee_addresses
+            (consignee_id, label, address, state, state_code, pincode, country, is_default)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, chunk)
+    log(f"consignees: {n['consignees']}")
+
+    # ---------------- CHARGES ----------------
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur.executemany("""
+        INSERT INTO charges_master
+        (charge_name, hsn_sac, currency, cgst_rate, sgst_rate, igst_rate, is_active, created_at)
+        VALUES (?, ?, ?, 9, 9, 18, 1, ?)
+    """, [(name, hsn, c, now) for name, hsn, c in CHARGES])
+
+    # ---------------- JOBS ----------------
+    for chunk in _chunks(_job_rows(rnd, n["jobs"], n["consignees"])):
+        cur.executemany("""
+            INSERT INTO jobs
+            (id, job_no, customer_id, shipper, consignee, pol, pod, vessel_flight,
+             etd, eta, mbl_no, hbl_no, gross_weight, net_weight, volume_cbm,
+             packages, exchange_rate, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, chunk)
+    log(f"jobs: {n['jobs']}")
+
+    # ---------------- INVOICES ----------------
+    for chunk in _chunks(_invoice_rows(rnd, n["invoices"], n["jobs"])):
+        cur.executemany("""
+            INSERT INTO invoices
+            (id, invoice_number, date, type, job_id, job_no, bill_to, pol, pod, total_amount)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, chunk)
+    log(f"invoices: {n['invoices']}")
+
+    # ---------------- ITEMS ----------------
+    totals = {}
+    for chunk in _chunks(_item_rows(rnd, n["items"], n["invoices"])):
+        cur.executemany("""
+            INSERT INTO invoice_items
+            (invoice_id, sr_no, description, hsn_sac, cur, rate, qty, amount,
+             taxable_amount, cgst_rate, cgst_amt, sgst_rate, sgst_amt, total_amt)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, chunk)
+        for row in chunk:
+            totals[row[0]] = totals.get(row[0], 0.0) + row[-1]
+
+    cur.executemany(
+        "UPDATE invoices SET total_amount=? WHERE id=?",
+        [(round(t, 2), inv) for inv, t in totals.items()]
+    )
+    log(f"items: {n['items']}")
+
+    conn.commit()
+    conn.close()
+
+    database.rebuild_charge_usage()
+    log("charge usage indexed")
+    database.normalize_job_metrics()
+    database.rebuild_lane_cube()
+    log("lane cube built")
+    return n
+
+
+def main():
+    p = argparse.ArgumentParser(description="Fill a database with synthetic data")
+    p.add_argument("db_path")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--scale", type=float, default=1.0)
+    args = p.parse_args()
+    generate(args.db_path, seed=args.seed, scale=args.scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# src/diagnostics_panel.py
+# Hidden diagnostics panel (Ctrl+Shift+D in MainWindow)
+
+from PyQt6 import QtWidgets, QtCore
+from PyQt6.QtWidgets import QTableWidgetItem
+
+from database import (
+    enable_query_trace,
+    disable_query_trace,
+    is_query_trace_enabled,
+    query_stats,
+    reset_query_stats,
+    cache_stats,
+    reset_cache_stats,
+    set_setting,
+    SLOW_QUERY_LOG,
+)
+
+TOP_N = 50
+
+
+class DiagnosticsPanel(QtWidgets.QDialog):
+    COLUMNS = ["Total ms", "Calls", "Avg ms", "Max ms", "Rows", "VM steps", "Caller", "SQL"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics — SQL Queries")
+        self.resize(1100, 560)
+
+        layout = QtWidgets.QVBoxLayout(self)
+
+        # -------------------------
+        # Controls
+        # -------------------------
+        bar = QtWidgets.QHBoxLayout()
+
+        self.chkTrace = QtWidgets.QCheckBox("Trace queries")
+        self.chkTrace.setChecked(is_query_trace_enabled())
+
+        self.lblLog = QtWidgets.QLabel(f"Slow log: {SLOW_QUERY_LOG}")
+        self.lblLog.setTextInteractionFlags(
+            QtCore.Qt.TextInteractionFlag.TextSelectableByMouse
+        )
+
+        self.btnRefresh = QtWidgets.QPushButton("Refresh")
+        self.btnReset = QtWidgets.QPushButton("Reset")
+
+        bar.addWidget(self.chkTrace)
+        bar.addWidget(self.lblLog, stretch=1)
+        bar.addWidget(self.btnRefresh)
+        bar.addWidget(self.btnReset)
+        layout.addLayout(bar)
+
+        self.lblCache = QtWidgets.QLabel("")
+        layout.addWidget(self.lblCache)
+
+        # -------------------------
+        # Table
+        # -------------------------
+        self.table = QtWidgets.QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+        self.chkTrace.toggled.connect(self.toggle_trace)
+        self.btnRefresh.clicked.connect(self.refresh)
+        self.btnReset.clicked.connect(self.reset)
+
+        # Live refresh while open
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(2000)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+        self.refresh()
+
+    # --------------------------------------------------
+    def toggle_trace(self, on):
+        if on:
+            enable_query_trace()
+        else:
+            disable_query_trace()
+        set_setting("sql_trace", 1 if on else 0)
+
+    def reset(self):
+        reset_query_stats()
+        reset_cache_stats()
+        self.refresh()
+
+    # --------------------------------------------------
+    def refresh(self):
+        stats = cache_stats()
+        entries = stats.pop("entries")
+        self.lblCache.setText(
+            f"Read cache ({entries} entries): " + "   ".join(
+                f"{t} {st['hits']}/{st['hits'] + st['misses']} hits, "
+                f"{st['local_invalidations'] + st['external_invalidations']} inval."
+                for t, st in stats.items()
+            )
+        )
+
+        rows = query_stats(top=TOP_N)
+
+        self.table.setRowCount(len(rows))
+        for r, q in enumerate(rows):
+            vals = [
+                f"{q['total_ms']:.1f}",
+                str(q["calls"]),
+                f"{q['avg_ms']:.2f}",
+                f"{q['max_ms']:.1f}",
+                str(q["rows"]),
+                str(q["vm_steps"]),
+                ", ".join(q["callers"]),
+                q["sql"],
+            ]
+            for c, v in enumerate(vals):
+                self.table.setItem(r, c, QTableWidgetItem(v))
+
+        self.table.resizeColumnsToContents()
@@ -0,0 +1,167 @@
+# src/draft_autosave.py
+# Crash-safe draft autosave for BaseInvoiceForm
+#
+# Edits call schedule(); after DEBOUNCE_MS of quiet the form state is read
+# on the GUI thread (a few dozen widget reads) and compared with what was
+# last written. Only the changed fields and rows go to a single background
+# worker, which writes them with database.save_draft_changes, so typing
+# never waits on the database. If a write fails the next tick sends the
+# full state again.
+#
+# The draft belongs to this desk (DRAFT_OWNER) and form type. It survives
+# crashes and window closes; MainWindow offers it for recovery on launch,
+# and saving the document discards it.
+
+import getpass
+import json
+import socket
+import time
+
+from PyQt6 import QtCore
+
+import database
+
+DEBOUNCE_MS = 1000
+
+DRAFT_OWNER = f"{getpass.getuser()}@{socket.gethostname()}"
+
+
+def row_cells(values):
+    """One item row as stored in draft_rows.cells."""
+    return json.dumps(values, separators=(",", ":"))
+
+
+def snapshot_diff(written, state):
+    """(fields, rows) that differ between two states; written may be None."""
+    old_fields = written["fields"] if written else {}
+    old_rows = written["rows"] if written else []
+    fields = {k: v for k, v in state["fields"].items() if old_fields.get(k) != v}
+    rows = {
+        i: cells for i, cells in enumerate(state["rows"])
+        if i >= len(old_rows) or old_rows[i] != cells
+    }
+    return fields, rows
+
+
+# =====================================================
+# BACKGROUND WRITE
+# =====================================================
+class _DraftSignals(QtCore.QObject):
+    done = QtCore.pyqtSignal(int, float)
+    failed = QtCore.pyqtSignal(int, str)
+
+
+class _DraftWrite(QtCore.QRunnable):
+    def __init__(self, generation, doc_type, fields, rows, row_count, label):
+        super().__init__()
+        self.generation = generation
+        self.args = (DRAFT_OWNER, doc_type, fields, rows, row_count, label)
+        self.signals = _DraftSignals()
+
+    def run(self):
+        t0 = time.perf_counter()
+        try:
+            database.save_draft_changes(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.done.emit(self.generation, (time.perf_counter() - t0) * 1000)
+
+
+# =====================================================
+# AUTOSAVE
+# =====================================================
+class DraftAutosave(QtCore.QObject):
+    def __init__(self, doc_type, snapshot, parent=None):
+        """snapshot() -> {"fields": {name: str}, "rows": [cells_json, ...], "label": str}."""
+        super().__init__(parent)
+        self.doc_type = doc_type
+        self.snapshot = snapshot
+        self.enabled = True
+        self.written = None         # state last handed to the worker
+        self.clean = None           # state with nothing worth a draft
+        self.generation = 0
+        self.stats = {"ticks": 0, "writes": 0, "fields": 0, "rows": 0,
+                      "failures": 0, "tick_ms": 0.0, "write_ms": 0.0}
+        self.last_error = None
+
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(1)      # keeps diffs in order
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_MS)
+        self.timer.timeout.connect(self.save)
+
+    # --------------------------------------------------
+    def schedule(self, *_):
+        if self.enabled:
+            self.timer.start()
+
+    def save(self):
+        """Diff against the last write and queue the changes."""
+        t0 = time.perf_counter()
+        state = self.snapshot()
+        if state == self.clean:
+            return
+        fields, rows = snapshot_diff(self.written, state)
+        row_count = len(state["rows"])
+        if not fields and not rows and self.written and row_count == len(self.written["rows"]):
+            return
+        self.written = state
+        self.generation += 1
+
+        job = _DraftWrite(self.generation, self.doc_type, fields, rows, row_count, state.get("label"))
+        job.signals.done.connect(self._on_done)
+        job.signals.failed.connect(self._on_failed)
+        self.pool.start(job)
+
+        self.stats["ticks"] += 1
+        self.stats["fields"] += len(fields)
+        self.stats["rows"] += len(rows)
+        self.stats["tick_ms"] = max(self.stats["tick_ms"], (time.perf_counter() - t0) * 1000)
+
+    def flush(self, timeout_ms=3000):
+        """Write any pending edit now and wait for the worker (window close)."""
+        if self.timer.isActive():
+            self.timer.stop()
+            self.save()
+        self.pool.waitForDone(timeout_ms)
+
+    def _on_done(self, generation, ms):
+        self.stats["writes"] += 1
+        self.stats["write_ms"] = max(self.stats["write_ms"], ms)
+
+    def _on_failed(self, generation, msg):
+        self.stats["failures"] += 1
+        self.last_error = msg
+        self.written = None         # unknown on disk: send everything next time
+        self.schedule()
+
+    # --------------------------------------------------
+    def load(self):
+        return database.get_draft(DRAFT_OWNER, self.doc_type)
+
+    def set_baseline(self):
+        """The form as it is now (blank, or just saved) needs no draft."""
+        self.clean = self.snapshot()
+
+    def is_dirty(self):
+        """Edited since the form was blank, opened or saved."""
+        return self.snapshot() != self.clean
+
+    def mark_clean(self):
+        """Document saved: drop the draft; later edits start a fresh one."""
+        self.timer.stop()
+        self.pool.waitForDone()
+        self.set_baseline()
+        self.written = None
+        database.discard_draft(DRAFT_OWNER, self.doc_type)
+
+    def restored(self, draft):
+        """Form was just filled from draft: that is what's on disk."""
+        self.timer.stop()
+        self.written = {
+            "fields": dict(draft["fields"]),
+            "rows": list(draft["rows"]),
+        }
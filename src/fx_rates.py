@@ -0,0 +1,105 @@
+# src/fx_rates.py
+# Foreign-currency lines: INR conversion at the rate on the invoice date
+#
+# Item rows carry their own currency (cur). A USD line's Amount stays in
+# USD; its taxable value, GST and total are INR at fx_rate (INR per USD).
+# fx_rate comes from the currency_rates table in force on the invoice
+# date, else the job's exchange rate, and a typed rate always wins.
+#
+# The rates are compiled once into a RateBook (per currency: sorted dates
+# + rates, bisect per lookup) and convert_items() sets fx_rate on every
+# foreign line of a document in one pass, before gst_rules computes it.
+#
+#   book = rate_book()
+#   convert_items(items, "2025-06-30", book, job_rate=header.get("exchange_rate"))
+#   gst_rules.compute_invoice(items, supply, date)
+
+import bisect
+
+from database import list_currency_rates, table_generation
+
+BASE_CURRENCY = "INR"
+
+
+def currency_code(cur):
+    return (cur or "").strip().upper() or BASE_CURRENCY
+
+
+def is_foreign(cur):
+    return currency_code(cur) != BASE_CURRENCY
+
+
+def parse_rate(text):
+    """Job exchange_rate is free text ('83.25', 'USD 83.25', '1 USD = 83.25')."""
+    for part in reversed(str(text or "").replace("=", " ").replace(",", "").split()):
+        try:
+            value = float(part)
+        except ValueError:
+            continue
+        if value > 0:
+            return value
+    return None
+
+
+class RateBook:
+    """currency -> INR rates by date; built once, read many times."""
+
+    def __init__(self, rows=()):
+        self.dates = {}     # currency -> sorted rate dates
+        self.rates = {}     # currency -> rates parallel to dates
+        for r in rows:      # list_currency_rates() is already in order
+            self.dates.setdefault(r["currency"], []).append(r["rate_date"])
+            self.rates.setdefault(r["currency"], []).append(r["rate"])
+
+    def rate(self, currency, date=None):
+        """INR per unit in force on date (latest if None); 1 for INR; None if unknown."""
+        code = currency_code(currency)
+        if code == BASE_CURRENCY:
+            return 1.0
+        dates = self.dates.get(code)
+        if not dates:
+            return None
+        i = bisect.bisect_right(dates, date or "9999-12-31") - 1
+        return self.rates[code][i] if i >= 0 else None
+
+
+_compiled = {"generation": None, "book": None}
+
+
+def rate_book():
+    """RateBook for the current currency_rates, recompiled only on change."""
+    generation = table_generation("currency_rates")
+    if generation is None or generation != _compiled["generation"] or _compiled["book"] is None:
+        _compiled.update(generation=generation, book=RateBook(list_currency_rates()))
+    return _compiled["book"]
+
+
+def convert_items(items, date, book=None, job_rate=None):
+    """Set fx_rate on every line (in place): 1 for INR, a typed rate is
+    kept, else the book's rate on date, else job_rate. Returns the
+    currencies left without a rate."""
+    book = book if book is not None else rate_book()
+    fallback = parse_rate(job_rate)
+    missing = set()
+    for it in items:
+        if not is_foreign(it.get("cur")):
+            it["fx_rate"] = 1.0
+            continue
+        if (it.get("fx_rate") or 1) != 1:
+            continue
+        fx = book.rate(it.get("cur"), date) or fallback
+        if fx is None:
+            missing.add(currency_code(it.get("cur")))
+            fx = 1.0
+        it["fx_rate"] = fx
+    return missing
+
+
+def foreign_totals(items):
+    """{currency: amount in that currency} for converted foreign lines."""
+    totals = {}
+    for it in items:
+        if is_foreign(it.get("cur")) and (it.get("fx_rate") or 1) != 1:
+            code = currency_code(it.get("cur"))
+            totals[code] = totals.get(code, 0.0) + float(it.get("amount") or 0)
+    return totals
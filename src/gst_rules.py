@@ -0,0 +1,268 @@
+# src/gst_rules.py
+# GST rules: intra-state (CGST + SGST) vs inter-state (IGST) supply
+#
+# Place of supply is the bill-to address state code (or the first two
+# digits of the customer's GSTIN). Same state as ours -> CGST + SGST;
+# any other state, or abroad (code 96) -> IGST at the combined rate.
+#
+# Rates come from the line itself when typed, else from a RateTable
+# compiled once from the charge rate history: (charge or HSN/SAC, supply
+# type) -> rates by effective date, looked up with bisect, so an old
+# invoice date gets the rate in force then. compute_invoice() recomputes
+# a whole document in one pass; the invoice form, batch paths and the PDF
+# totals all go through here.
+#
+#   table = rate_table()
+#   totals = compute_invoice(items, supply_type("29"), date="2025-06-30", table=table)
+
+import bisect
+import functools
+import re
+
+from database import get_setting, list_charge_rates, list_charges, table_generation
+from fx_rates import convert_items
+
+INTRA = "INTRA"
+INTER = "INTER"
+
+# Maharashtra; override with the company_state_code setting
+HOME_STATE_CODE = "27"
+FOREIGN_STATE_CODE = "96"
+
+RATE_FIELDS = ("cgst_rate", "sgst_rate", "igst_rate")
+
+
+# =====================================================
+# PLACE OF SUPPLY
+# =====================================================
+def home_state_code():
+    return state_code(get_setting("company_state_code")) or HOME_STATE_CODE
+
+
+def state_code(value):
+    """'27', '27-Maharashtra', or a GSTIN -> '27'; None if not a code."""
+    text = str(value or "").strip()
+    if len(text) >= 2 and text[:2].isdigit():
+        return text[:2]
+    if len(text) == 1 and text.isdigit():
+        return "0" + text
+    return None
+
+
+def place_of_supply(address=None, gstin=None):
+    """State code from an address dict (consignee_addresses row), else GSTIN."""
+    code = state_code((address or {}).get("state_code"))
+    if code:
+        return code
+    if address and (address.get("country") or "India").strip().lower() != "india":
+        return FOREIGN_STATE_CODE
+    return state_code(gstin)
+
+
+def supply_type(place, home=None):
+    """INTER if place is another state (or abroad); INTRA if ours or unknown."""
+    place = state_code(place)
+    if not place:
+        return INTRA
+    return INTRA if place == (home or home_state_code()) else INTER
+
+
+# =====================================================
+# GSTIN
+# =====================================================
+# State code, PAN, entity number, 'Z', then a mod-36 check character
+GSTIN_RE = re.compile(r"^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][1-9A-Z]Z[0-9A-Z]$")
+GSTIN_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# 01-38 states / UTs, 97 other territory, 99 centre jurisdiction;
+# a place of supply may also be 96 (abroad)
+GSTIN_STATE_CODES = frozenset([f"{i:02d}" for i in range(1, 39)] + ["97", "99"])
+STATE_CODES = GSTIN_STATE_CODES | {FOREIGN_STATE_CODE}
+
+
+def gstin_check_char(first14):
+    """Check character for the first 14 characters of a GSTIN."""
+    total = 0
+    for i, ch in enumerate(first14):
+        product = GSTIN_CHARS.index(ch) * (2 if i % 2 else 1)
+        total += product // 36 + product % 36
+    return GSTIN_CHARS[-total % 36]
+
+
+@functools.lru_cache(maxsize=4096)      # the same customers recur across a batch
+def gstin_error(gstin):
+    """None for a well-formed GSTIN, else 'format', 'state' or 'checksum'."""
+    g = (gstin or "").strip().upper()
+    if not GSTIN_RE.match(g):
+        return "format"
+    if g[:2] not in GSTIN_STATE_CODES:
+        return "state"
+    if gstin_check_char(g[:14]) != g[14]:
+        return "checksum"
+    return None
+
+
+# =====================================================
+# RATE TABLE
+# =====================================================
+def _charge_key(name):
+    return ("charge", (name or "").strip().lower())
+
+
+class RateTable:
+    """(charge or HSN/SAC, supply) -> rates in force by date; built once,
+    read many times."""
+
+    def __init__(self):
+        self.dates = {}     # (key, supply) -> sorted effective-from dates
+        self.rates = {}     # (key, supply) -> [(cgst, sgst, igst)] parallel to dates
+
+    def _insert(self, key, effective_from, cgst, sgst, igst):
+        for supply, rates in ((INTRA, (cgst, sgst, 0.0)), (INTER, (0.0, 0.0, igst))):
+            dates = self.dates.setdefault((key, supply), [])
+            values = self.rates.setdefault((key, supply), [])
+            i = bisect.bisect_right(dates, effective_from)
+            if i and dates[i - 1] == effective_from:
+                values[i - 1] = rates       # same date again: the later row wins
+            else:
+                dates.insert(i, effective_from)
+                values.insert(i, rates)
+
+    def add(self, hsn, effective_from, cgst, sgst, igst=None, charge_name=None):
+        cgst, sgst = float(cgst or 0), float(sgst or 0)
+        igst = float(igst or 0) or cgst + sgst
+        effective_from = effective_from or ""
+        hsn = (hsn or "").strip()
+        if hsn:
+            self._insert(hsn, effective_from, cgst, sgst, igst)
+        if charge_name and charge_name.strip():
+            self._insert(_charge_key(charge_name), effective_from, cgst, sgst, igst)
+
+    def _lookup(self, key, supply, date):
+        dates = self.dates.get((key, supply))
+        if not dates:
+            return None
+        i = bisect.bisect_right(dates, date or "9999-12-31") - 1
+        return self.rates[(key, supply)][i] if i >= 0 else None
+
+    def lookup(self, hsn, supply, date=None):
+        """(cgst, sgst, igst) for an HSN/SAC in force on date (latest if None), or None."""
+        return self._lookup((hsn or "").strip(), supply, date)
+
+    def lookup_charge(self, charge_name, supply, date=None):
+        """Same, for a charges-master charge by name."""
+        return self._lookup(_charge_key(charge_name), supply, date)
+
+    @classmethod
+    def from_charges(cls, charges, history=()):
+        """charges: list_charges(); history: list_charge_rates() rows.
+        Charges without history rows count with their current rates."""
+        table = cls()
+        dated = {h["charge_id"] for h in history}
+        rows = [
+            (c.get("id") or 0, "", c.get("hsn_sac"), c.get("charge_name"),
+             c.get("cgst_rate"), c.get("sgst_rate"), c.get("igst_rate"))
+            for c in charges if c.get("id") not in dated
+        ]
+        rows += [
+            (h["charge_id"], h["effective_from"], h["hsn_sac"], h["charge_name"],
+             h["cgst_rate"], h["sgst_rate"], h["igst_rate"])
+            for h in history
+        ]
+        # Later charges win where two share an HSN/SAC and date
+        for _, eff, hsn, name, cgst, sgst, igst in sorted(rows, key=lambda r: r[0]):
+            table.add(hsn, eff, cgst, sgst, igst, charge_name=name)
+        return table
+
+
+_compiled = {"generation": None, "table": None}
+
+
+def rate_table():
+    """RateTable for the current charges and rate history, recompiled only on change."""
+    generation = (table_generation("charges_master"), table_generation("charge_rates"))
+    if None in generation or generation != _compiled["generation"] or _compiled["table"] is None:
+        _compiled.update(generation=generation,
+                         table=RateTable.from_charges(list_charges(), list_charge_rates()))
+    return _compiled["table"]
+
+
+# =====================================================
+# LINE / INVOICE COMPUTATION
+# =====================================================
+def _num(v):
+    try:
+        return float(v or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def line_rates(item, supply, table=None, date=None):
+    """(cgst, sgst, igst) % for one line under the given supply type.
+
+    Typed rates win; a line with none takes the rates in force on date for
+    its charge (by description), else its HSN/SAC, from table. A combined
+    rate moves between CGST + SGST and IGST as supply requires.
+    """
+    cgst, sgst, igst = (_num(item.get(f)) for f in RATE_FIELDS)
+    if not (cgst or sgst or igst) and table is not None:
+        found = (table.lookup_charge(item.get("description"), supply, date)
+                 or table.lookup(item.get("hsn_sac"), supply, date))
+        if found:
+            return found
+    if supply == INTER:
+        return 0.0, 0.0, igst or cgst + sgst
+    if cgst or sgst:
+        return cgst, sgst, 0.0
+    return igst / 2, igst / 2, 0.0
+
+
+def compute_line(item, supply, table=None, date=None):
+    """Fill amount, taxable, GST rates / amounts and total on item (in place).
+
+    amount is in the line's currency; taxable and tax are INR at fx_rate
+    (set by fx_rates.convert_items; 1 when absent).
+    """
+    amount = _num(item.get("rate")) * _num(item.get("qty"))
+    taxable = amount * (_num(item.get("fx_rate")) or 1.0)
+    cgst, sgst, igst = line_rates(item, supply, table, date)
+    item["amount"] = amount
+    item["taxable_amount"] = taxable
+    item["cgst_rate"], item["cgst_amt"] = cgst, taxable * cgst / 100
+    item["sgst_rate"], item["sgst_amt"] = sgst, taxable * sgst / 100
+    item["igst_rate"], item["igst_amt"] = igst, taxable * igst / 100
+    item["total_amt"] = taxable + item["cgst_amt"] + item["sgst_amt"] + item["igst_amt"]
+    return item
+
+
+def reprice_line(item, supply, date, table):
+    """Replace the line's GST rates with those in force on date (its charge
+    by description, else its HSN/SAC), then compute_line. Lines matching
+    neither keep their rates."""
+    found = (table.lookup_charge(item.get("description"), supply, date)
+             or table.lookup(item.get("hsn_sac"), supply, date))
+    if found:
+        item["cgst_rate"], item["sgst_rate"], item["igst_rate"] = found
+    return compute_line(item, supply)
+
+
+def compute_invoice(items, supply, date=None, table=None, fx=None, job_rate=None):
+    """Recompute every line of one document; returns invoice_totals(items).
+    With fx (an fx_rates.RateBook) foreign lines are converted first."""
+    if fx is not None:
+        convert_items(items, date, fx, job_rate)
+    for it in items:
+        compute_line(it, supply, table, date)
+    return invoice_totals(items)
+
+
+def invoice_totals(items):
+    """Taxable / CGST / SGST / IGST / total sums in one pass."""
+    taxable = cgst = sgst = igst = total = 0.0
+    for it in items:
+        taxable += _num(it.get("taxable_amount"))
+        cgst += _num(it.get("cgst_amt"))
+        sgst += _num(it.get("sgst_amt"))
+        igst += _num(it.get("igst_amt"))
+        total += _num(it.get("total_amt"))
+    return {"taxable": taxable, "cgst": cgst, "sgst": sgst, "igst": igst, "total": total}
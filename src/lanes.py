@@ -0,0 +1,179 @@
+# src/lanes.py
+# Lane analytics page: any slice of the month x POL x POD x customer cube
+#
+# Reads only lane_cube (see LANE CUBE in database.py), so every filter /
+# grouping change is one small aggregate query; the time it took is shown
+# next to the row count.
+
+import time
+
+from PyQt6 import QtWidgets, QtCore
+from PyQt6.QtWidgets import QTableWidgetItem
+
+from database import query_lanes, list_lane_values, list_customers
+
+DIMENSIONS = [
+    ("month", "Month"),
+    ("pol", "POL"),
+    ("pod", "POD"),
+    ("customer_id", "Customer"),
+]
+MEASURES = [
+    ("shipments", "Shipments", "{:,.0f}"),
+    ("tonnes", "Tonnes", "{:,.2f}"),
+    ("volume_m3", "CBM", "{:,.2f}"),
+    ("revenue", "Revenue", "{:,.2f}"),
+]
+
+
+class _NumberItem(QTableWidgetItem):
+    """Formatted text, sorted by value."""
+
+    def __init__(self, value, fmt):
+        super().__init__(fmt.format(value))
+        self.value = value
+        self.setTextAlignment(QtCore.Qt.AlignmentFlag.AlignRight | QtCore.Qt.AlignmentFlag.AlignVCenter)
+
+    def __lt__(self, other):
+        if isinstance(other, _NumberItem):
+            return self.value < other.value
+        return super().__lt__(other)
+
+
+class LanesPage(QtWidgets.QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        layout = QtWidgets.QVBoxLayout(self)
+
+        # -------------------------
+        # Filters
+        # -------------------------
+        filters = QtWidgets.QHBoxLayout()
+
+        self.cbFrom = QtWidgets.QComboBox()
+        self.cbTo = QtWidgets.QComboBox()
+        self.cbPOL = QtWidgets.QComboBox()
+        self.cbPOD = QtWidgets.QComboBox()
+        self.cbCustomer = QtWidgets.QComboBox()
+        self.cbCustomer.setEditable(True)
+        self.cbCustomer.setInsertPolicy(QtWidgets.QComboBox.InsertPolicy.NoInsert)
+        self.cbCustomer.setMinimumWidth(220)
+
+        for label, w in (("From", self.cbFrom), ("To", self.cbTo), ("POL", self.cbPOL),
+                         ("POD", self.cbPOD), ("Customer", self.cbCustomer)):
+            filters.addWidget(QtWidgets.QLabel(label))
+            filters.addWidget(w)
+        filters.addStretch()
+
+        self.btnReload = QtWidgets.QPushButton("Reload Filters")
+        filters.addWidget(self.btnReload)
+        layout.addLayout(filters)
+
+        # -------------------------
+        # Group by
+        # -------------------------
+        group = QtWidgets.QHBoxLayout()
+        group.addWidget(QtWidgets.QLabel("Group by:"))
+        self.dimChecks = {}
+        for key, label in DIMENSIONS:
+            chk = QtWidgets.QCheckBox(label)
+            chk.setChecked(key in ("pol", "pod"))
+            chk.toggled.connect(self.refresh)
+            self.dimChecks[key] = chk
+            group.addWidget(chk)
+        group.addStretch()
+        self.lblInfo = QtWidgets.QLabel("")
+        group.addWidget(self.lblInfo)
+        layout.addLayout(group)
+
+        # -------------------------
+        # Table
+        # -------------------------
+        self.table = QtWidgets.QTableWidget(0, 0)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+        self.btnReload.clicked.connect(self.load_filters)
+        for cb in (self.cbFrom, self.cbTo, self.cbPOL, self.cbPOD, self.cbCustomer):
+            cb.currentIndexChanged.connect(self.refresh)
+
+        self.load_filters()
+
+    # --------------------------------------------------
+    def load_filters(self):
+        values = list_lane_values()
+        combos = (
+            (self.cbFrom, values["month"]),
+            (self.cbTo, values["month"]),
+            (self.cbPOL, values["pol"]),
+            (self.cbPOD, values["pod"]),
+        )
+        for cb, items in combos:
+            cb.blockSignals(True)
+            current = cb.currentData()
+            cb.clear()
+            cb.addItem("All", None)
+            for v in items:
+                cb.addItem(v, v)
+            idx = cb.findData(current)
+            cb.setCurrentIndex(idx if idx >= 0 else 0)
+            cb.blockSignals(False)
+
+        self.cbCustomer.blockSignals(True)
+        current = self.cbCustomer.currentData()
+        self.cbCustomer.clear()
+        self.cbCustomer.addItem("All", None)
+        for c in list_customers():
+            self.cbCustomer.addItem(c["name"], c["id"])
+        idx = self.cbCustomer.findData(current)
+        self.cbCustomer.setCurrentIndex(idx if idx >= 0 else 0)
+        self.cbCustomer.blockSignals(False)
+
+        self.refresh()
+
+    def showEvent(self, event):
+        # Saves since the page was last shown are already in the cube
+        super().showEvent(event)
+        self.refresh()
+
+    def group_by(self):
+        return [key for key, _ in DIMENSIONS if self.dimChecks[key].isChecked()]
+
+    # --------------------------------------------------
+    def refresh(self):
+        dims = self.group_by()
+        t0 = time.perf_counter()
+        rows = query_lanes(
+            group_by=dims,
+            month_from=self.cbFrom.currentData(),
+            month_to=self.cbTo.currentData(),
+            pol=self.cbPOL.currentData(),
+            pod=self.cbPOD.currentData(),
+            customer_id=self.cbCustomer.currentData(),
+        )
+        ms = (time.perf_counter() - t0) * 1000
+
+        columns = [(("customer" if k == "customer_id" else k), label) for k, label in DIMENSIONS if k in dims]
+        columns += [(k, label) for k, label, _ in MEASURES]
+        formats = {k: fmt for k, _, fmt in MEASURES}
+
+        self.table.setSortingEnabled(False)
+        self.table.clear()
+        self.table.setColumnCount(len(columns))
+        self.table.setHorizontalHeaderLabels([label for _, label in columns])
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, (key, _) in enumerate(columns):
+                value = row.get(key)
+                if key in formats:
+                    item = _NumberItem(value or 0, formats[key])
+                else:
+                    item = QTableWidgetItem("" if value is None else str(value))
+                self.table.setItem(r, c, item)
+        self.table.setSortingEnabled(True)
+        self.table.resizeColumnsToContents()
+
+        self.lblInfo.setText(f"{len(rows)} rows · {ms:.1f} ms")
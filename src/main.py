@@ -1,4 +1,6 @@
 # src/main.py
+import logging
+import os
 import sys
 from PyQt6 import QtWidgets, QtGui, QtCore
 
@@ -7,8 +9,14 @@ from invoice_form import InvoiceForm
 from debitnote_form import DebitNoteForm
 from customer_manager import ConsigneeManager
 from job_form import JobForm
+from lanes import LanesPage
 
-from database import init_db
+from database import init_db, get_setting, enable_query_trace, DATA_SERVICE_URL, BASE_DIR
+from backup import start_backup_scheduler
+from maintenance import start_maintenance_scheduler, run_optimize
+
+LOG_PATH = os.path.join(BASE_DIR, "logs", "app.log")
+log = logging.getLogger("sanship")
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -18,6 +26,13 @@ class MainWindow(QtWidgets.QMainWindow):
         # Init DB
         init_db()
 
+        if get_setting("sql_trace") == "1":
+            enable_query_trace(get_setting("slow_query_ms"))
+
+        # Scheduled snapshots and upkeep; in client mode the data service host runs them
+        self.backup_scheduler = None if DATA_SERVICE_URL else start_backup_scheduler()
+        self.maintenance_scheduler = None if DATA_SERVICE_URL else start_maintenance_scheduler()
+
         self.setWindowTitle("SANSHIP — Invoice & Debit Note Generator")
         self.setMinimumSize(1360, 820)
 
@@ -85,6 +100,9 @@ class MainWindow(QtWidgets.QMainWindow):
         btn_customers = QtWidgets.QPushButton("👥  Customer / Consignee Manager")
         btn_customers.setProperty("class", "menuButton")
 
+        btn_lanes = QtWidgets.QPushButton("📊  Lane Analytics")
+        btn_lanes.setProperty("class", "menuButton")
+
         btn_exit = QtWidgets.QPushButton("❌  Exit")
         btn_exit.setProperty("class", "menuButton")
 
@@ -92,6 +110,7 @@ class MainWindow(QtWidgets.QMainWindow):
         menu_layout.addWidget(btn_debit)
         menu_layout.addWidget(btn_job)
         menu_layout.addWidget(btn_customers)
+        menu_layout.addWidget(btn_lanes)
         menu_layout.addStretch()
         menu_layout.addWidget(btn_exit)
 
@@ -103,10 +122,12 @@ class MainWindow(QtWidgets.QMainWindow):
         self.page_invoice = InvoiceForm()
         self.page_debit = DebitNoteForm()
         self.page_customers = ConsigneeManager()
+        self.page_lanes = LanesPage()
 
         self.stack.addWidget(self.page_invoice)    # index 0
         self.stack.addWidget(self.page_debit)      # index 1
         self.stack.addWidget(self.page_customers)  # index 2
+        self.stack.addWidget(self.page_lanes)      # index 3
 
         main_layout.addWidget(sidebar)
         main_layout.addWidget(self.stack, stretch=1)
@@ -117,6 +138,7 @@ class MainWindow(QtWidgets.QMainWindow):
         btn_invoice.clicked.connect(lambda: self.stack.setCurrentIndex(0))
         btn_debit.clicked.connect(lambda: self.stack.setCurrentIndex(1))
         btn_customers.clicked.connect(lambda: self.stack.setCurrentIndex(2))
+        btn_lanes.clicked.connect(lambda: self.stack.setCurrentIndex(3))
         btn_exit.clicked.connect(self.close)
 
         btn_job.clicked.connect(self.open_job_form)
@@ -136,6 +158,60 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.stack.setCurrentIndex(0)
 
+        # -------------------------
+        # HIDDEN DIAGNOSTICS (Ctrl+Shift+D)
+        # -------------------------
+        self.diag_shortcut = QtGui.QShortcut(QtGui.QKeySequence("Ctrl+Shift+D"), self)
+        self.diag_shortcut.activated.connect(self.open_diagnostics)
+
+        # Unsaved drafts from a crash / closed window: offer once the window is up
+        QtCore.QTimer.singleShot(0, self.offer_draft_recovery)
+
+    # -------------------------
+    # DRAFT RECOVERY
+    # -------------------------
+    def offer_draft_recovery(self):
+        for index, page in ((0, self.page_invoice), (1, self.page_debit)):
+            try:
+                if page.autosave.load():
+                    self.stack.setCurrentIndex(index)
+                    page.offer_draft_recovery()
+            except Exception as e:
+                log.exception("draft recovery failed (%s)", page.DOCUMENT_TITLE)
+                # Edits on this form would overwrite the stored draft: leave
+                # it on disk for the next launch instead
+                page.autosave.enabled = False
+                page.autosave.timer.stop()
+                QtWidgets.QMessageBox.warning(
+                    self,
+                    "Recover draft",
+                    f"The unsaved {page.DOCUMENT_TITLE.lower()} could not be restored:\n{e}\n\n"
+                    "The draft has been kept and will be offered again next time. "
+                    "Autosave is paused for this form until then.",
+                )
+
+    # -------------------------
+    # SHUTDOWN
+    # -------------------------
+    def closeEvent(self, event):
+        for page in (self.page_invoice, self.page_debit):
+            page.autosave.flush()
+        if not DATA_SERVICE_URL:
+            try:
+                run_optimize()
+            except Exception:
+                log.exception("PRAGMA optimize on shutdown failed")
+        super().closeEvent(event)
+
+    # -------------------------
+    # DIAGNOSTICS PANEL
+    # -------------------------
+    def open_diagnostics(self):
+        from diagnostics_panel import DiagnosticsPanel
+
+        self.diag_window = DiagnosticsPanel(self)
+        self.diag_window.show()
+
     # -------------------------
     # OPEN JOB FORM (FIXED)
     # -------------------------
@@ -172,6 +248,9 @@ class MainWindow(QtWidgets.QMainWindow):
 
 
 def main():
+    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+    logging.basicConfig(filename=LOG_PATH, level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     app = QtWidgets.QApplication(sys.argv)
     win = MainWindow()
     win.show()
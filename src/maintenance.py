@@ -0,0 +1,352 @@
+# src/maintenance.py
+# Database upkeep: statistics, free-page reclaim, PRAGMA optimize
+#
+#   python src/maintenance.py run         -> idle maintenance now
+#   python src/maintenance.py optimize    -> what the app runs on shutdown
+#   python src/maintenance.py status
+#   python src/maintenance.py convert     -> one-time auto_vacuum=INCREMENTAL
+#                                            (app closed on every desk)
+#
+# Idle maintenance (at most once per INTERVAL_HOURS, only after the file
+# has gone IDLE_SECONDS without a commit from any desk):
+#   - returns free pages with incremental_vacuum, a batch at a time
+#     (files created before auto_vacuum=INCREMENTAL need `convert` first;
+#     the scheduler never runs a full VACUUM)
+#   - ANALYZE so the planner has statistics
+#   - checkpoints the WAL so the file actually shrinks
+# Each run appends a JSON line to logs/maintenance.log with file size,
+# free pages and probe-query times before and after.
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+
+import database
+
+LOG_PATH = os.path.join(database.BASE_DIR, "logs", "maintenance.log")
+
+INTERVAL_HOURS = 24
+IDLE_SECONDS = 300
+CHECK_SECONDS = 60
+VACUUM_PAGES = 2000         # pages per incremental_vacuum step
+STEP_SLEEP = 0.02
+ANALYSIS_LIMIT = 1000       # rows sampled per index by ANALYZE
+
+# Representative reads timed before and after maintenance
+PROBES = {
+    "open_job_invoices": """
+        SELECT COUNT(*) FROM invoices i JOIN jobs j ON j.id = i.job_id
+        WHERE j.status = 'OPEN' AND i.date >= '2024-01-01'
+    """,
+    "consignee_address_counts": """
+        SELECT c.name, COUNT(a.id) FROM consignees c
+        LEFT JOIN consignee_addresses a ON a.consignee_id = c.id
+        GROUP BY c.id ORDER BY c.name LIMIT 50
+    """,
+    "active_charges": "SELECT * FROM charges_master WHERE is_active = 1 ORDER BY charge_name",
+    "recent_items": """
+        SELECT * FROM invoice_items WHERE invoice_id IN
+        (SELECT id FROM invoices ORDER BY id DESC LIMIT 200)
+    """,
+}
+
+
+def _connect():
+    conn = sqlite3.connect(database.DB_PATH, timeout=database.BUSY_TIMEOUT_MS / 1000,
+                           isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _file_bytes():
+    total = 0
+    for suffix in ("", "-wal"):
+        try:
+            total += os.path.getsize(database.DB_PATH + suffix)
+        except OSError:
+            pass
+    return total
+
+
+def _probe(conn, runs=3):
+    times = {}
+    for name, sql in PROBES.items():
+        samples = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            try:
+                conn.execute(sql).fetchall()
+            except sqlite3.OperationalError:
+                break       # table not present in this file
+            samples.append((time.perf_counter() - t0) * 1000)
+        if samples:
+            times[name] = round(statistics.median(samples), 2)
+    return times
+
+
+def measure(conn=None):
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        return {
+            "file_bytes": _file_bytes(),
+            "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+            "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+            "freelist": conn.execute("PRAGMA freelist_count").fetchone()[0],
+            "auto_vacuum": conn.execute("PRAGMA auto_vacuum").fetchone()[0],
+            "probes_ms": _probe(conn),
+        }
+    finally:
+        if own:
+            conn.close()
+
+
+def _log(record):
+    try:
+        os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
+
+
+# =====================================================
+# STEPS
+# =====================================================
+def convert_auto_vacuum(conn):
+    """auto_vacuum=INCREMENTAL on an existing file (rewrites it once)."""
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def incremental_vacuum(conn, pages=VACUUM_PAGES, sleep=STEP_SLEEP):
+    """Return free pages to the OS in short steps. Returns pages released;
+    0 on a file that is not auto_vacuum=INCREMENTAL (the pragma is a no-op)."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    released = 0
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    while free:
+        # execute() would step the pragma once (one page); exec runs it out
+        conn.executescript(f"PRAGMA incremental_vacuum({min(free, pages)});")
+        left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if left >= free:
+            break
+        released += free - left
+        free = left
+        time.sleep(sleep)
+    return released
+
+
+def analyze(conn):
+    conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+
+
+def checkpoint(conn):
+    if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+
+def _record(kind, before, after, steps):
+    record = {
+        "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "kind": kind,
+        "db": os.path.abspath(database.DB_PATH),
+        "before": before,
+        "after": after,
+        "steps": steps,
+    }
+    _log(record)
+    return record
+
+
+def run_maintenance():
+    """Full idle pass. Returns (and logs) a before/after record."""
+    conn = _connect()
+    try:
+        before = measure(conn)
+        steps = {}
+
+        t0 = time.perf_counter()
+        steps["pages_released"] = incremental_vacuum(conn)
+        steps["incremental_vacuum_s"] = round(time.perf_counter() - t0, 3)
+        if before["auto_vacuum"] != 2:
+            steps["needs_convert"] = True
+
+        t0 = time.perf_counter()
+        analyze(conn)
+        steps["analyze_s"] = round(time.perf_counter() - t0, 3)
+
+        t0 = time.perf_counter()
+        checkpoint(conn)
+        steps["checkpoint_s"] = round(time.perf_counter() - t0, 3)
+
+        after = measure(conn)
+    finally:
+        conn.close()
+
+    record = _record("idle", before, after, steps)
+    database.set_setting("maintenance_last_run", record["at"])
+    return record
+
+
+def run_convert():
+    """One-time switch of an older file to auto_vacuum=INCREMENTAL. Rewrites
+    the whole file and holds the write lock throughout: run it from the
+    CLI with the app closed on every desk, never from the scheduler."""
+    conn = _connect()
+    try:
+        before = measure(conn)
+        steps = {}
+        if before["auto_vacuum"] != 2:
+            t0 = time.perf_counter()
+            convert_auto_vacuum(conn)
+            steps["vacuum_convert_s"] = round(time.perf_counter() - t0, 3)
+            checkpoint(conn)
+        after = measure(conn)
+    finally:
+        conn.close()
+    return _record("convert", before, after, steps)
+
+
+def run_optimize():
+    """PRAGMA optimize: cheap, re-analyzes only tables whose stats went stale."""
+    conn = _connect()
+    t0 = time.perf_counter()
+    try:
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    record = {
+        "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "kind": "optimize",
+        "db": os.path.abspath(database.DB_PATH),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    _log(record)
+    return record
+
+
+# =====================================================
+# SCHEDULER
+# =====================================================
+class MaintenanceScheduler(threading.Thread):
+    """Runs run_maintenance() once it is due and the file has gone quiet.
+
+    Quiet means PRAGMA data_version on the scheduler's own connection has
+    not moved for idle_seconds: it changes on a commit from any other
+    connection, this process's or another desk's.
+    """
+
+    def __init__(self, interval_hours=INTERVAL_HOURS, idle_seconds=IDLE_SECONDS):
+        super().__init__(name="db-maintenance", daemon=True)
+        self.interval = interval_hours * 3600
+        self.idle_seconds = idle_seconds
+        self.last_activity = time.time()
+        self.data_version = None
+        self.watch = None
+        self.stop_event = threading.Event()
+        self.last_record = None
+        self.last_error = None
+
+    def is_due(self):
+        last = database.get_setting("maintenance_last_run")
+        if not last:
+            return True
+        try:
+            ts = datetime.strptime(last, "%Y-%m-%d %H:%M:%S").timestamp()
+        except ValueError:
+            return True
+        return time.time() - ts >= self.interval
+
+    def is_idle(self):
+        if self.watch is None:
+            self.watch = sqlite3.connect(database.DB_PATH, timeout=database.BUSY_TIMEOUT_MS / 1000,
+                                         check_same_thread=False)
+        version = self.watch.execute("PRAGMA data_version").fetchone()[0]
+        if version != self.data_version:
+            self.data_version = version
+            self.last_activity = time.time()
+        return time.time() - self.last_activity >= self.idle_seconds
+
+    def run(self):
+        try:
+            while not self.stop_event.wait(CHECK_SECONDS):
+                try:
+                    if self.is_idle() and self.is_due():
+                        self.last_record = run_maintenance()
+                        self.last_error = None
+                except Exception as e:
+                    self.last_error = str(e)
+                    self.stop_event.wait(600)
+        finally:
+            if self.watch is not None:
+                self.watch.close()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def start_maintenance_scheduler():
+    try:
+        hours = float(database.get_setting("maintenance_interval_h") or INTERVAL_HOURS)
+    except (TypeError, ValueError):
+        hours = INTERVAL_HOURS
+    if hours <= 0:
+        return None
+    sched = MaintenanceScheduler(hours)
+    sched.start()
+    return sched
+
+
+# =====================================================
+# CLI
+# =====================================================
+def _fmt(before, after):
+    lines = [
+        f"file:      {before['file_bytes'] / 2**20:.1f} MB -> {after['file_bytes'] / 2**20:.1f} MB",
+        f"free:      {before['freelist']} -> {after['freelist']} pages",
+        f"vacuum:    auto_vacuum {before['auto_vacuum']} -> {after['auto_vacuum']}",
+    ]
+    for name, ms in before["probes_ms"].items():
+        lines.append(f"  {name:<26} {ms:>8.2f} ms -> {after['probes_ms'].get(name, 0):>8.2f} ms")
+    return "\n".join(lines)
+
+
+def main():
+    p = argparse.ArgumentParser(description="data.db maintenance")
+    p.add_argument("--db", help="database file (default: data.db in the app folder)")
+    p.add_argument("cmd", choices=["run", "optimize", "status", "convert"])
+    args = p.parse_args()
+
+    if args.db:
+        database.DB_PATH = args.db
+
+    if args.cmd == "run":
+        rec = run_maintenance()
+        print(_fmt(rec["before"], rec["after"]))
+        print(f"steps:     {rec['steps']}")
+    elif args.cmd == "optimize":
+        print(f"optimize:  {run_optimize()['seconds']:.3f} s")
+    elif args.cmd == "convert":
+        rec = run_convert()
+        print(_fmt(rec["before"], rec["after"]))
+        print(f"steps:     {rec['steps'] or 'already incremental'}")
+    else:
+        m = measure()
+        print(f"file:      {m['file_bytes'] / 2**20:.1f} MB, {m['page_count']} pages, "
+              f"{m['freelist']} free, auto_vacuum={m['auto_vacuum']}"
+              + ("" if m["auto_vacuum"] == 2 else " (run 'convert' to reclaim free pages)"))
+        print(f"last run:  {database.get_setting('maintenance_last_run') or 'never'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
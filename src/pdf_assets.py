@@ -0,0 +1,109 @@
+# src/pdf_assets.py
+# Process-wide cache for PDF assets (logo image, TrueType fonts)
+#
+# Decoding the logo and parsing TTF files is the expensive part of drawing
+# them; both are done once per process here and reused by every
+# generate_invoice_pdf call. Batch workers call warm_pdf_assets() on start.
+
+import os
+import threading
+
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont, TTFError
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+LOGO_PATH = os.path.join(ASSETS_DIR, "logo.png")
+FONT_DIR = os.path.join(ASSETS_DIR, "fonts")
+
+# role: (registered name, TTF file, built-in fallback)
+TTF_FONTS = {
+    "regular": ("SanSans", "DejaVuSans.ttf", "Times-Roman"),
+    "bold": ("SanSans-Bold", "DejaVuSans-Bold.ttf", "Times-Bold"),
+}
+
+_lock = threading.Lock()
+_cache = {}
+
+
+# =====================================================
+# LOGO
+# =====================================================
+def get_logo():
+    """Decoded logo as an ImageReader, or None if the file is missing."""
+    if "logo" not in _cache:
+        with _lock:
+            if "logo" not in _cache:
+                logo = None
+                if os.path.exists(LOGO_PATH):
+                    logo = ImageReader(LOGO_PATH)
+                    logo.getRGBData()   # force decode now, not per document
+                _cache["logo"] = logo
+    return _cache["logo"]
+
+
+def draw_logo(c, x, y, width, height):
+    """Draw the cached logo on canvas c (aspect preserved, west anchor).
+
+    drawImage encodes the image once per document and reuses it for
+    every later page that draws it.
+    """
+    logo = get_logo()
+    if logo is None:
+        return False
+    c.drawImage(logo, x, y, width, height, mask="auto", preserveAspectRatio=True, anchor="w")
+    return True
+
+
+# =====================================================
+# FONTS
+# =====================================================
+def _find_font(filename):
+    local = os.path.join(FONT_DIR, filename)
+    if os.path.exists(local):
+        return local
+    return filename   # reportlab searches rl_config.TTFSearchPath
+
+
+def get_fonts():
+    """{'regular': name, 'bold': name}; TTF if available, else built-in."""
+    if "fonts" not in _cache:
+        with _lock:
+            if "fonts" not in _cache:
+                fonts = {}
+                registered = set(pdfmetrics.getRegisteredFontNames())
+                for role, (name, filename, fallback) in TTF_FONTS.items():
+                    if name in registered:
+                        fonts[role] = name
+                        continue
+                    try:
+                        pdfmetrics.registerFont(TTFont(name, _find_font(filename)))
+                        fonts[role] = name
+                    except (TTFError, OSError):
+                        fonts[role] = fallback
+                _cache["fonts"] = fonts
+    return _cache["fonts"]
+
+
+def asset_fingerprint():
+    """Identifies the assets a render used (part of the export cache key)."""
+    if "fingerprint" not in _cache:
+        logo = None
+        if os.path.exists(LOGO_PATH):
+            st = os.stat(LOGO_PATH)
+            logo = [st.st_size, int(st.st_mtime)]
+        fp = {"logo": logo, "fonts": get_fonts()}
+        with _lock:
+            _cache["fingerprint"] = fp
+    return _cache["fingerprint"]
+
+
+def warm_pdf_assets():
+    get_logo()
+    get_fonts()
+
+
+def clear_pdf_assets():
+    with _lock:
+        _cache.clear()
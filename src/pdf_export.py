@@ -0,0 +1,128 @@
+# src/pdf_export.py
+# Content-addressed PDF export
+#
+# Every export is keyed by a hash of its render inputs (header, items, title,
+# template version, assets, compression). If that hash is already indexed in
+# export_cache and the file on disk still has the recorded size, the existing
+# PDF is returned without rendering.
+
+import hashlib
+import json
+import os
+import time
+
+import pdf_generator
+from pdf_assets import asset_fingerprint
+from database import (
+    get_export_cache,
+    put_export_cache,
+    get_document,
+    read_snapshot,
+)
+
+DOC_TITLES = {
+    "INVOICE": "TAX INVOICE",
+    "DEBIT_NOTE": "DEBIT NOTE",
+}
+
+# Item fields that reach the page (ids / invoice_id do not)
+ITEM_FIELDS = (
+    "sr_no", "description", "hsn_sac", "cur", "rate", "qty", "amount",
+    "taxable_amount", "cgst_rate", "cgst_amt", "sgst_rate", "sgst_amt",
+    "igst_rate", "igst_amt", "fx_rate", "total_amt",
+)
+
+
+# =====================================================
+# HASHING
+# =====================================================
+def render_hash(header, items, title, compress=None):
+    if compress is None:
+        compress = pdf_generator.PDF_COMPRESS
+    payload = {
+        "template": pdf_generator.TEMPLATE_VERSION,
+        "assets": asset_fingerprint(),
+        "compress": bool(compress),
+        "title": title,
+        "header": {k: v for k, v in header.items() if k != "id"},
+        "items": [{k: it.get(k) for k in ITEM_FIELDS} for it in items],
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _is_valid(entry):
+    if not entry:
+        return False
+    try:
+        return os.path.getsize(entry["path"]) == entry["size"]
+    except OSError:
+        return False
+
+
+# =====================================================
+# EXPORT
+# =====================================================
+def export_invoice_pdf(header, items, title="TAX INVOICE", compress=None, force=False):
+    """Returns (path, cached)."""
+    h = render_hash(header, items, title, compress)
+
+    if not force:
+        entry = get_export_cache([h]).get(h)
+        if _is_valid(entry):
+            return entry["path"], True
+
+    path = pdf_generator.generate_invoice_pdf(header, items, title=title, compress=compress)
+    put_export_cache(h, header.get("invoice_number"), path, os.path.getsize(path))
+    return path, False
+
+
+def export_batch(docs, compress=None, progress=None):
+    """Export many documents, rendering only those whose inputs changed.
+
+    docs: iterable of (header, items, title).
+    Returns a summary dict with per-document results.
+    """
+    docs = list(docs)
+    hashes = [render_hash(h, it, t, compress) for h, it, t in docs]
+    index = get_export_cache(hashes)
+
+    t0 = time.perf_counter()
+    results = []
+    rendered = 0
+    for i, ((header, items, title), h) in enumerate(zip(docs, hashes)):
+        entry = index.get(h)
+        if _is_valid(entry):
+            results.append((entry["path"], True))
+        else:
+            path = pdf_generator.generate_invoice_pdf(
+                header, items, title=title, compress=compress
+            )
+            put_export_cache(h, header.get("invoice_number"), path, os.path.getsize(path))
+            results.append((path, False))
+            rendered += 1
+        if progress:
+            progress(i + 1, len(docs))
+
+    return {
+        "results": results,
+        "rendered": rendered,
+        "cached": len(docs) - rendered,
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def load_saved_document(invoice_id, snapshot=None):
+    """(header, items, title) for a saved invoice / debit note."""
+    doc = get_document(invoice_id, snapshot=snapshot)
+    if not doc:
+        return None
+    header, items = doc
+    return header, items, DOC_TITLES.get(header.get("type"), "TAX INVOICE")
+
+
+def export_saved_invoices(invoice_ids, compress=None, progress=None):
+    # One consistent snapshot for the whole batch; clerks keep saving meanwhile
+    with read_snapshot() as snap:
+        docs = [d for d in (load_saved_document(i, snap) for i in invoice_ids) if d]
+    return export_batch(docs, compress=compress, progress=progress)
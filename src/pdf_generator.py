@@ -2,12 +2,23 @@
 # GRID-EXACT PDF Generator (Excel-aligned)
 # SAN SHIPPING AND LOGISTICS (INDIA) PVT LTD
 
+import io
+import json
+import logging
 import os
+import time
 from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.pdfgen import canvas
 
+from fx_rates import foreign_totals
+from gst_rules import INTER, invoice_totals
+from pdf_assets import draw_logo, get_fonts
+from pdf_text import ellipsize, fit_block, fit_lines
+
+log = logging.getLogger("sanship")
+
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 OUT_DIR = os.path.join(BASE_DIR, "exports")
 os.makedirs(OUT_DIR, exist_ok=True)
@@ -15,6 +26,9 @@ os.makedirs(OUT_DIR, exist_ok=True)
 PAGE_W, PAGE_H = A4
 MARGIN = 36
 
+# Bump whenever the layout changes so cached exports are re-rendered
+TEMPLATE_VERSION = 5
+
 # ===== GRID CONFIG =====
 TABLE_ROWS = 12
 ROW_HEIGHT = 20
@@ -32,8 +46,80 @@ COLS = [
 
 TOTALS_WIDTH = 240
 
+CELL_PAD = 3
+DESC_MAX_LINES = 2
+MIN_FONT = 6
+
+LOGO_W, LOGO_H = 70, 36
+
+# Page-stream compression; off only for inspecting raw PDF operators
+PDF_COMPRESS = os.environ.get("SANSHIP_PDF_COMPRESS", "1") != "0"
+
 # =======================
 
+# ===== TIMING HOOKS (OPT-IN) =====
+# Each generate_invoice_pdf call emits one JSON record with per-phase
+# milliseconds, item count and output size, to a JSON-lines file and/or
+# to registered callbacks (e.g. a batch runner collecting stats).
+_timing = {
+    "log_path": os.environ.get("SANSHIP_PDF_TIMING_LOG") or None,
+    "callbacks": [],
+}
+
+
+def set_pdf_timing_log(path):
+    _timing["log_path"] = path or None
+
+
+def add_pdf_timing_callback(fn):
+    _timing["callbacks"].append(fn)
+
+
+def remove_pdf_timing_callback(fn):
+    if fn in _timing["callbacks"]:
+        _timing["callbacks"].remove(fn)
+
+
+def pdf_timing_enabled():
+    return bool(_timing["log_path"] or _timing["callbacks"])
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.enabled = pdf_timing_enabled()
+        self.phases = {}
+        self.t_start = self.t_last = time.perf_counter() if self.enabled else 0.0
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self.t_last) * 1000, 3)
+        self.t_last = now
+
+    def emit(self, **fields):
+        if not self.enabled:
+            return
+        record = {
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            **fields,
+            "phases_ms": self.phases,
+            "total_ms": round((time.perf_counter() - self.t_start) * 1000, 3),
+        }
+        if _timing["log_path"]:
+            try:
+                with open(_timing["log_path"], "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError:
+                pass
+        for fn in list(_timing["callbacks"]):
+            try:
+                fn(record)
+            except Exception:
+                # A broken metrics hook must not cost the clerk the PDF
+                log.exception("PDF timing callback %r failed", fn)
+
+
 def money(v):
     try:
         return f"{float(v):,.2f}"
@@ -41,12 +127,50 @@ def money(v):
         return "0.00"
 
 
-def generate_invoice_pdf(header, items, title="TAX INVOICE"):
+def set_pdf_compression(on):
+    global PDF_COMPRESS
+    PDF_COMPRESS = bool(on)
+
+
+def generate_invoice_pdf(header, items, title="TAX INVOICE", compress=None):
     ts = int(datetime.now().timestamp())
     inv = header.get("invoice_number", f"INV-{ts}").replace("/", "_")
     path = os.path.join(OUT_DIR, f"{inv}.pdf")
 
-    c = canvas.Canvas(path, pagesize=A4)
+    if compress is None:
+        compress = PDF_COMPRESS
+
+    timer = PhaseTimer()
+    data = render_invoice_pdf(header, items, title=title, compress=compress, timer=timer)
+
+    with open(path, "wb") as f:
+        f.write(data)
+    timer.mark("file_write")
+
+    timer.emit(
+        invoice_number=header.get("invoice_number", ""),
+        title=title,
+        compressed=bool(compress),
+        items=len(items),
+        bytes=len(data),
+        path=path,
+    )
+    return path
+
+
+def render_invoice_pdf(header, items, title="TAX INVOICE", compress=None, timer=None):
+    """Render the document to PDF bytes in memory (nothing is written)."""
+    if timer is None:
+        timer = PhaseTimer()
+        timer.enabled = False
+    if compress is None:
+        compress = PDF_COMPRESS
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4, pageCompression=1 if compress else 0)
+    fonts = get_fonts()
+    FR, FB = fonts["regular"], fonts["bold"]
+    timer.mark("setup")
 
     x0 = MARGIN
     y = PAGE_H - MARGIN
@@ -54,24 +178,27 @@ def generate_invoice_pdf(header, items, title="TAX INVOICE"):
     # ======================================================
     # HEADER
     # ======================================================
-    c.setFont("Times-Bold", 14)
+    draw_logo(c, x0, y - LOGO_H + 12, LOGO_W, LOGO_H)
+
+    c.setFont(FB, 14)
     c.drawCentredString(PAGE_W / 2, y, "SAN SHIPPING AND LOGISTICS (INDIA) PVT LTD")
     y -= 16
 
-    c.setFont("Times-Roman", 9)
+    c.setFont(FR, 9)
     c.drawCentredString(PAGE_W / 2, y, "International Freight Forwarding Company")
     y -= 18
 
-    c.setFont("Times-Bold", 12)
+    c.setFont(FB, 12)
     c.drawCentredString(PAGE_W / 2, y, title)
     y -= 20
 
     # Invoice No / Date
-    c.setFont("Times-Bold", 9)
+    c.setFont(FB, 9)
     c.rect(x0, y - 18, PAGE_W - 2 * MARGIN, 18)
     c.drawString(x0 + 6, y - 13, f"Invoice No: {header.get('invoice_number', '')}")
     c.drawRightString(PAGE_W - MARGIN - 6, y - 13, f"Date: {header.get('date', '')}")
     y -= 30
+    timer.mark("header")
 
     # ======================================================
     # BILL TO / CONSIGNMENT
@@ -83,15 +210,23 @@ def generate_invoice_pdf(header, items, title="TAX INVOICE"):
     c.rect(x0, y - box_h, left_w, box_h)
     c.rect(x0 + left_w, y - box_h, right_w, box_h)
 
-    c.setFont("Times-Bold", 9)
+    c.setFont(FB, 9)
     c.drawString(x0 + 6, y - 14, "BILL TO")
     c.drawString(x0 + left_w + 6, y - 14, "CONSIGNMENT DETAILS")
 
-    c.setFont("Times-Roman", 8)
+    # Wrapped to the box width; shrinks (down to MIN_FONT) before truncating
+    bt_size, bt_lead, bt_lines = fit_block(
+        header.get("bill_to") or "", FR, 8,
+        max_width=left_w - 12, max_height=box_h - 28 - 4,
+        min_size=MIN_FONT,
+    )
+    c.setFont(FR, bt_size)
     bt_y = y - 28
-    for ln in (header.get("bill_to") or "").split("\n"):
+    for ln in bt_lines:
         c.drawString(x0 + 6, bt_y, ln)
-        bt_y -= 10
+        bt_y -= bt_lead
+
+    c.setFont(FR, 8)
 
     cd_y = y - 28
     cons_fields = [
@@ -108,6 +243,7 @@ def generate_invoice_pdf(header, items, title="TAX INVOICE"):
         cd_y -= 10
 
     y -= box_h + 14
+    timer.mark("bill_to")
 
     # ======================================================
     # TABLE GRID (FIXED HEIGHT)
@@ -121,7 +257,7 @@ def generate_invoice_pdf(header, items, title="TAX INVOICE"):
         col_x.append(col_x[-1] + w)
 
     # Header
-    c.setFont("Times-Bold", 8)
+    c.setFont(FB, 8)
     c.rect(table_x, y - ROW_HEIGHT, table_w, ROW_HEIGHT)
     for i, (t, _) in enumerate(COLS):
         c.drawCentredString((col_x[i] + col_x[i + 1]) / 2, y - 14, t)
@@ -129,7 +265,7 @@ def generate_invoice_pdf(header, items, title="TAX INVOICE"):
     c.line(col_x[-1], y, col_x[-1], y - ROW_HEIGHT)
 
     # Rows (EXACT COUNT)
-    c.setFont("Times-Roman", 8)
+    c.setFont(FR, 8)
     start_y = y - ROW_HEIGHT
     for r in range(TABLE_ROWS):
         row_y = start_y - r * ROW_HEIGHT
@@ -150,9 +286,25 @@ def generate_invoice_pdf(header, items, title="TAX INVOICE"):
                 money(it.get("taxable_amount")),
             ]
             for i, v in enumerate(vals):
-                c.drawString(col_x[i] + 3, row_y - 14, str(v or ""))
+                cell_w = col_x[i + 1] - col_x[i] - 2 * CELL_PAD
+                if i == 1:
+                    # Description: wrap to two lines, shrinking if needed
+                    size, lines = fit_lines(
+                        str(v or ""), FR, 8, cell_w, DESC_MAX_LINES, MIN_FONT
+                    )
+                    c.setFont(FR, size)
+                    lead = size + 1
+                    ty = row_y - (ROW_HEIGHT + size) / 2 + (len(lines) - 1) * lead / 2 + 1
+                    for ln in lines:
+                        c.drawString(col_x[i] + CELL_PAD, ty, ln)
+                        ty -= lead
+                    c.setFont(FR, 8)
+                    continue
+
+                c.drawString(col_x[i] + CELL_PAD, row_y - 14, ellipsize(v, FR, 8, cell_w))
 
     table_bottom = start_y - TABLE_ROWS * ROW_HEIGHT
+    timer.mark("grid")
 
     # ======================================================
     # TOTALS (GRID-LOCKED)
@@ -160,37 +312,47 @@ def generate_invoice_pdf(header, items, title="TAX INVOICE"):
     tx = table_x + table_w
     ty = y - ROW_HEIGHT
 
-    c.rect(tx, ty - 4 * ROW_HEIGHT, TOTALS_WIDTH, 4 * ROW_HEIGHT)
-
-    totals = {
-        "Taxable Value": sum(float(i.get("taxable_amount", 0) or 0) for i in items),
-        "Total CGST": sum(float(i.get("cgst_amt", 0) or 0) for i in items),
-        "Total SGST": sum(float(i.get("sgst_amt", 0) or 0) for i in items),
-        "GRAND TOTAL": sum(float(i.get("total_amt", 0) or 0) for i in items),
-    }
-
-    c.setFont("Times-Bold", 9)
+    sums = invoice_totals(items)
+    # Foreign-currency lines: their own total next to the INR figures
+    foreign = foreign_totals(items)
+    totals = {f"Total {cur}": amount for cur, amount in sorted(foreign.items())}
+    totals["Taxable Value (INR)" if foreign else "Taxable Value"] = sums["taxable"]
+    if header.get("supply_type") == INTER or sums["igst"]:
+        totals["Total IGST"] = sums["igst"]
+    else:
+        totals["Total CGST"] = sums["cgst"]
+        totals["Total SGST"] = sums["sgst"]
+    totals["GRAND TOTAL"] = sums["total"]
+
+    c.rect(tx, ty - len(totals) * ROW_HEIGHT, TOTALS_WIDTH, len(totals) * ROW_HEIGHT)
+
+    c.setFont(FB, 9)
     yy = ty - 14
     for k, v in totals.items():
         c.drawString(tx + 6, yy, k)
         c.drawRightString(tx + TOTALS_WIDTH - 6, yy, money(v))
         yy -= ROW_HEIGHT
+    timer.mark("totals")
 
     # ======================================================
     # FOOTER
     # ======================================================
     fy = table_bottom - 40
-    c.setFont("Times-Roman", 8)
+    c.setFont(FR, 8)
     c.drawString(x0, fy, "This is a computer generated invoice and does not require signature.")
     fy -= 12
     c.drawString(x0, fy, "Bank Details (Sample):")
     fy -= 10
     c.drawString(x0, fy, "Bank: SAMPLE BANK | A/C No: XXXXXXXXXX | IFSC: SAMPLE0001")
 
-    c.setFont("Times-Bold", 9)
+    c.setFont(FB, 9)
     c.drawRightString(PAGE_W - MARGIN, fy, "For SAN SHIPPING AND LOGISTICS (INDIA) PVT LTD")
     c.drawRightString(PAGE_W - MARGIN, fy - 18, "Authorised Signatory")
 
     c.showPage()
+    timer.mark("footer")
+
     c.save()
-    return path
+    data = buf.getvalue()
+    timer.mark("canvas_save")
+    return data
@@ -0,0 +1,129 @@
+# src/pdf_text.py
+# Text layout for the PDF grid: wrapping, ellipsis, shrink-to-fit
+#
+# Widths are memoised per (font, size, string) for the life of the process,
+# so batch runs re-measure the same charge names and address words for free.
+# Lines are measured as the sum of their word widths (reportlab applies no
+# kerning, so this is exact).
+
+from functools import lru_cache
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+ELLIPSIS = "…"
+SIZE_STEP = 0.5
+
+
+@lru_cache(maxsize=65536)
+def string_width(text, font, size):
+    return stringWidth(text, font, size)
+
+
+def width_cache_info():
+    return string_width.cache_info()
+
+
+# =====================================================
+# PRIMITIVES
+# =====================================================
+def ellipsize(text, font, size, max_width):
+    """Cut text so that text + '…' fits max_width (unchanged if it fits)."""
+    text = str(text or "")
+    if string_width(text, font, size) <= max_width:
+        return text
+
+    budget = max_width - string_width(ELLIPSIS, font, size)
+    lo, hi = 0, len(text)
+    while lo < hi:                      # longest prefix that fits
+        mid = (lo + hi + 1) // 2
+        if string_width(text[:mid], font, size) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + ELLIPSIS
+
+
+def _split_long_word(word, font, size, max_width):
+    parts, cur = [], ""
+    for ch in word:
+        if cur and string_width(cur + ch, font, size) > max_width:
+            parts.append(cur)
+            cur = ch
+        else:
+            cur += ch
+    if cur:
+        parts.append(cur)
+    return parts
+
+
+def wrap_text(text, font, size, max_width):
+    """Greedy word wrap; keeps explicit newlines, breaks over-long words."""
+    space = string_width(" ", font, size)
+    lines = []
+
+    for para in str(text or "").split("\n"):
+        words = para.split()
+        if not words:
+            lines.append("")
+            continue
+
+        cur, cur_w = [], 0.0
+        for word in words:
+            w = string_width(word, font, size)
+            if w > max_width:
+                pieces = _split_long_word(word, font, size, max_width)
+            else:
+                pieces = [word]
+
+            for piece in pieces:
+                pw = w if len(pieces) == 1 else string_width(piece, font, size)
+                need = pw if not cur else cur_w + space + pw
+                if cur and need > max_width:
+                    lines.append(" ".join(cur))
+                    cur, cur_w = [piece], pw
+                else:
+                    cur.append(piece)
+                    cur_w = need
+        lines.append(" ".join(cur))
+
+    return lines
+
+
+# =====================================================
+# FITTING
+# =====================================================
+def fit_lines(text, font, size, max_width, max_lines, min_size=None):
+    """Shrink font until text wraps into max_lines, then ellipsize.
+
+    Returns (font_size, lines).
+    """
+    min_size = min_size or size
+    s = size
+    while True:
+        lines = wrap_text(text, font, s, max_width)
+        if len(lines) <= max_lines or s - SIZE_STEP < min_size:
+            break
+        s -= SIZE_STEP
+
+    if len(lines) > max_lines:
+        last = " ".join(lines[max_lines - 1:])
+        lines = lines[:max_lines - 1] + [ellipsize(last + ELLIPSIS, font, s, max_width)]
+    return s, lines
+
+
+def fit_block(text, font, size, max_width, max_height, min_size=None, leading=1.25):
+    """Fit multi-line text into a box. Returns (font_size, leading_pt, lines)."""
+    min_size = min_size or size
+    s = size
+    while True:
+        lead = s * leading
+        max_lines = max(1, int(max_height // lead))
+        lines = wrap_text(text, font, s, max_width)
+        if len(lines) <= max_lines or s - SIZE_STEP < min_size:
+            break
+        s -= SIZE_STEP
+
+    if len(lines) > max_lines:
+        last = lines[max_lines - 1]
+        lines = lines[:max_lines - 1] + [ellipsize(last + ELLIPSIS, font, s, max_width)]
+    return s, lead, lines
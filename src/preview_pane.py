@@ -0,0 +1,222 @@
+# src/preview_pane.py
+# Live print preview for BaseInvoiceForm
+#
+# Edits call schedule(); after DEBOUNCE_MS of quiet the form state is hashed
+# (same key as the export cache). Cached page images are shown at once,
+# otherwise the PDF is rendered in memory on a worker thread, rasterised with
+# QPdfDocument and stored in a small LRU keyed by that hash.
+
+from collections import OrderedDict
+
+from PyQt6 import QtWidgets, QtCore, QtGui
+
+try:
+    from PyQt6.QtPdf import QPdfDocument
+except ImportError:     # QtPdf is an optional Qt add-on
+    QPdfDocument = None
+
+from pdf_generator import render_invoice_pdf
+from pdf_export import render_hash
+
+DEBOUNCE_MS = 400
+RENDER_SCALE = 1.5      # pixels per PDF point
+CACHE_PAGES = 32
+
+
+# =====================================================
+# PAGE IMAGE CACHE (LRU)
+# =====================================================
+class PageCache:
+    def __init__(self, max_entries=CACHE_PAGES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        images = self._data.get(key)
+        if images is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return images
+
+    def put(self, key, images):
+        self._data[key] = images
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+_page_cache = PageCache()
+
+
+def rasterize_pdf(data, scale=RENDER_SCALE):
+    """PDF bytes -> list of QImage (one per page). Safe off the GUI thread."""
+    buf = QtCore.QBuffer()
+    buf.setData(QtCore.QByteArray(data))
+    buf.open(QtCore.QIODevice.OpenModeFlag.ReadOnly)
+
+    doc = QPdfDocument(None)
+    doc.load(buf)
+
+    images = []
+    for i in range(doc.pageCount()):
+        pt = doc.pagePointSize(i)
+        size = QtCore.QSize(int(pt.width() * scale), int(pt.height() * scale))
+        # Rendered pages are transparent; flatten onto white paper
+        page = QtGui.QImage(size, QtGui.QImage.Format.Format_RGB32)
+        page.fill(QtGui.QColor("white"))
+        painter = QtGui.QPainter(page)
+        painter.drawImage(0, 0, doc.render(i, size))
+        painter.end()
+        images.append(page)
+
+    doc.close()
+    buf.close()
+    return images
+
+
+# =====================================================
+# BACKGROUND RENDER
+# =====================================================
+class _RenderSignals(QtCore.QObject):
+    done = QtCore.pyqtSignal(int, str, object)
+    failed = QtCore.pyqtSignal(int, str)
+
+
+class _RenderJob(QtCore.QRunnable):
+    def __init__(self, generation, key, header, items, title, latest):
+        super().__init__()
+        self.generation = generation
+        self.key = key
+        self.header = header
+        self.items = items
+        self.title = title
+        self.latest = latest
+        self.signals = _RenderSignals()
+
+    def run(self):
+        # A newer edit arrived while queued: skip the work entirely
+        if self.generation != self.latest():
+            return
+        try:
+            data = render_invoice_pdf(self.header, self.items, title=self.title)
+            images = rasterize_pdf(data)
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.done.emit(self.generation, self.key, images)
+
+
+# =====================================================
+# WIDGET
+# =====================================================
+class PreviewPane(QtWidgets.QFrame):
+    def __init__(self, snapshot, parent=None):
+        """snapshot() -> (header, items, title) or None if not renderable."""
+        super().__init__(parent)
+        self.snapshot = snapshot
+        self.generation = 0
+        self.current_key = None
+
+        self.setFrameShape(QtWidgets.QFrame.Shape.StyledPanel)
+        self.setMinimumWidth(320)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+
+        bar = QtWidgets.QHBoxLayout()
+        title = QtWidgets.QLabel("PREVIEW")
+        title.setStyleSheet("font-weight: 700;")
+        self.lblStatus = QtWidgets.QLabel("")
+        bar.addWidget(title)
+        bar.addStretch()
+        bar.addWidget(self.lblStatus)
+        layout.addLayout(bar)
+
+        self.page = QtWidgets.QLabel()
+        self.page.setAlignment(QtCore.Qt.AlignmentFlag.AlignHCenter | QtCore.Qt.AlignmentFlag.AlignTop)
+
+        self.scroll = QtWidgets.QScrollArea()
+        self.scroll.setWidgetResizable(True)
+        self.scroll.setWidget(self.page)
+        layout.addWidget(self.scroll)
+
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_MS)
+        self.timer.timeout.connect(self.refresh)
+
+        self.images = []
+
+        if QPdfDocument is None:
+            self.page.setText("Preview unavailable (QtPdf not installed)")
+
+    # --------------------------------------------------
+    def schedule(self, *_):
+        if QPdfDocument is None or not self.isVisible():
+            return
+        self.timer.start()
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        self.schedule()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self._show_images()
+
+    # --------------------------------------------------
+    def refresh(self):
+        snap = self.snapshot()
+        if snap is None:
+            return
+        header, items, title = snap
+
+        key = render_hash(header, items, title)
+        self.generation += 1
+        if key == self.current_key:
+            return
+
+        cached = _page_cache.get(key)
+        if cached is not None:
+            self._apply(key, cached)
+            return
+
+        self.lblStatus.setText("Rendering…")
+        job = _RenderJob(self.generation, key, header, items, title, lambda: self.generation)
+        job.signals.done.connect(self._on_done)
+        job.signals.failed.connect(self._on_failed)
+        self.pool.start(job)
+
+    def _on_done(self, generation, key, images):
+        _page_cache.put(key, images)
+        if generation == self.generation:
+            self._apply(key, images)
+
+    def _on_failed(self, generation, msg):
+        if generation == self.generation:
+            self.lblStatus.setText("Preview failed")
+            self.page.setToolTip(msg)
+
+    # --------------------------------------------------
+    def _apply(self, key, images):
+        self.current_key = key
+        self.images = images
+        self.lblStatus.setText("")
+        self._show_images()
+
+    def _show_images(self):
+        if not self.images:
+            return
+        img = self.images[0]
+        w = max(100, self.scroll.viewport().width() - 4)
+        pix = QtGui.QPixmap.fromImage(img).scaledToWidth(
+            w, QtCore.Qt.TransformationMode.SmoothTransformation
+        )
+        self.page.setPixmap(pix)
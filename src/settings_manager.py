@@ -1,6 +1,6 @@
 # src/settings_manager.py
 from datetime import datetime
-from database import get_setting, set_setting
+from database import get_setting, take_counter
 
 INVOICE_PREFIX = "SAN/INV"
 DEBIT_PREFIX = "SAN/DN"
@@ -27,17 +27,15 @@ def current_fin_year():
 # =====================================================
 def get_next_invoice_number():
     fin = current_fin_year()
-    stored = get_setting("inv_year")
-    counter = int(get_setting("inv_counter") or 0)
+    counter = take_counter("inv", fin)
+    return f"{INVOICE_PREFIX}/{fin}/{counter:04d}"
 
-    if stored != fin:
-        counter = 1
-        set_setting("inv_year", fin)
-    else:
-        counter += 1
 
-    set_setting("inv_counter", counter)
-    return f"{INVOICE_PREFIX}/{fin}/{counter:04d}"
+def peek_invoice_numbers(n):
+    """The next n invoice numbers, without taking them (batch dry run)."""
+    fin = current_fin_year()
+    counter = int(get_setting("inv_counter") or 0) if get_setting("inv_year") == fin else 0
+    return [f"{INVOICE_PREFIX}/{fin}/{counter + i:04d}" for i in range(1, n + 1)]
 
 
 # =====================================================
@@ -45,16 +43,7 @@ def get_next_invoice_number():
 # =====================================================
 def get_next_debit_number():
     fin = current_fin_year()
-    stored = get_setting("dn_year")
-    counter = int(get_setting("dn_counter") or 0)
-
-    if stored != fin:
-        counter = 1
-        set_setting("dn_year", fin)
-    else:
-        counter += 1
-
-    set_setting("dn_counter", counter)
+    counter = take_counter("dn", fin)
     return f"{DEBIT_PREFIX}/{fin}/{counter:04d}"
 
 
@@ -63,14 +52,5 @@ def get_next_debit_number():
 # =====================================================
 def get_next_job_number():
     fin = current_fin_year()
-    stored = get_setting("job_year")
-    counter = int(get_setting("job_counter") or 0)
-
-    if stored != fin:
-        counter = 1
-        set_setting("job_year", fin)
-    else:
-        counter += 1
-
-    set_setting("job_counter", counter)
+    counter = take_counter("job", fin)
     return f"{JOB_PREFIX}/{fin}/{counter:04d}"
@@ -0,0 +1,203 @@
+# src/validation.py
+# Document validation: every rule, one pass over the document
+#
+# Rules are data: (code, severity, field, test, message). Header rules run
+# once per document against its context (GSTIN, place of supply, supply
+# type); line rules all run inside a single loop over the items, each
+# line's numbers parsed once. ERROR findings block a save; WARNING ones
+# are shown and may be accepted. The invoice form, batch_invoicing and
+# anything importing documents call the same functions.
+#
+#   findings = validate_document(header, items, gstin="27AAPFU0939F1ZV", address=addr)
+#   if errors(findings): ...
+#   per_doc = validate_batch((header, items, gstin, address) for ...)
+
+import functools
+from collections import namedtuple
+from datetime import datetime
+
+from fx_rates import BASE_CURRENCY
+from gst_rules import (
+    FOREIGN_STATE_CODE, INTER, INTRA, STATE_CODES, gstin_error, home_state_code,
+    place_of_supply, state_code, supply_type,
+)
+
+ERROR = "error"
+WARNING = "warning"
+
+# Combined GST rates in the schedule
+GST_SLABS = frozenset([0.0, 0.1, 0.25, 1.5, 3.0, 5.0, 12.0, 18.0, 28.0, 40.0])
+
+# when(d), if given, says whether a line rule applies to the document at all
+Rule = namedtuple("Rule", "code severity field test message when", defaults=(None,))
+Finding = namedtuple("Finding", "severity code row field message")
+
+
+@functools.lru_cache(maxsize=1024)      # a batch repeats the same few dates
+def _is_date(text):
+    try:
+        datetime.strptime(text or "", "%Y-%m-%d")
+        return True
+    except ValueError:
+        return False
+
+
+# =====================================================
+# RULES
+# =====================================================
+# test(d) gets the document context (see document_context); message is
+# formatted with it
+HEADER_RULES = (
+    Rule("no_items", ERROR, None, lambda d: not d["items"],
+         "Please add at least one item"),
+    Rule("date", ERROR, "date", lambda d: not _is_date(d["date"]),
+         "Date '{date}' is not YYYY-MM-DD"),
+    Rule("bill_to", WARNING, "bill_to", lambda d: not d["bill_to"],
+         "Bill-to address is empty"),
+    Rule("gstin_format", ERROR, "gstin", lambda d: d["gstin_error"] == "format",
+         "Customer GSTIN '{gstin}' is not in the 15-character GSTIN format"),
+    Rule("gstin_state", ERROR, "gstin", lambda d: d["gstin_error"] == "state",
+         "Customer GSTIN '{gstin}' starts with an unknown state code"),
+    Rule("gstin_checksum", ERROR, "gstin", lambda d: d["gstin_error"] == "checksum",
+         "Customer GSTIN '{gstin}' fails its check character"),
+    Rule("place_of_supply", ERROR, "place_of_supply",
+         lambda d: d["place"] is not None and d["place"] not in STATE_CODES,
+         "Place of supply '{place}' is not a GST state code"),
+    Rule("supply_type", ERROR, "supply_type",
+         lambda d: d["expected"] is not None and d["supply"] != d["expected"],
+         "Place of supply {place} makes this an {expected} supply, not {supply}"),
+    Rule("gstin_address", WARNING, "place_of_supply",
+         lambda d: d["gstin_state"] and d["address_state"]
+         and d["address_state"] not in (d["gstin_state"], FOREIGN_STATE_CODE),
+         "Customer GSTIN is registered in state {gstin_state} but the bill-to address is in {address_state}"),
+)
+
+# test(v, d) gets one parsed line (see _line) and the document context
+def _intra(d):
+    return d["supply"] == INTRA
+
+
+def _inter(d):
+    return d["supply"] == INTER
+
+
+def _zero_rated(d):
+    return d["zero_rated"]
+
+
+def _taxed(d):
+    return not d["zero_rated"]
+
+
+LINE_RULES = (
+    Rule("rate_qty_zero", ERROR, "rate", lambda v, d: v["rate"] == 0 or v["qty"] == 0,
+         "Row {row}: Rate or Quantity is zero"),
+    Rule("rate_qty_negative", WARNING, "rate", lambda v, d: v["rate"] < 0 or v["qty"] < 0,
+         "Row {row}: Rate or Quantity is negative"),
+    Rule("gst_missing", ERROR, "cgst_rate", lambda v, d: v["gst"] == 0,
+         "Row {row}: GST rates are empty", when=_taxed),
+    Rule("gst_zero_rated", WARNING, "igst_rate", lambda v, d: v["gst"] > 0,
+         "Row {row}: {gst:g}% GST on a zero-rated supply (place of supply abroad)", when=_zero_rated),
+    Rule("gst_slab", WARNING, "cgst_rate", lambda v, d: v["gst"] not in GST_SLABS,
+         "Row {row}: {gst:g}% is not a GST slab"),
+    Rule("gst_split", ERROR, "sgst_rate", lambda v, d: abs(v["cgst"] - v["sgst"]) > 1e-9,
+         "Row {row}: CGST {cgst:g}% and SGST {sgst:g}% must be equal", when=_intra),
+    Rule("igst_intra", ERROR, "igst_rate", lambda v, d: v["igst"] != 0,
+         "Row {row}: IGST on an intra-state supply", when=_intra),
+    Rule("cgst_inter", ERROR, "cgst_rate", lambda v, d: v["cgst"] != 0 or v["sgst"] != 0,
+         "Row {row}: CGST / SGST on an inter-state supply", when=_inter),
+    Rule("hsn_missing", WARNING, "hsn_sac", lambda v, d: not v["hsn"],
+         "Row {row}: HSN/SAC is empty"),
+    Rule("fx_missing", ERROR, "fx_rate", lambda v, d: v["foreign"] and v["fx"] in (0, 1),
+         "Row {row}: no exchange rate for {cur}"),
+)
+
+
+# =====================================================
+# ENGINE
+# =====================================================
+def _num(v):
+    try:
+        return float(v or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _line(row, it):
+    g = it.get
+    try:
+        rate, qty = float(g("rate") or 0), float(g("qty") or 0)
+        cgst, sgst, igst = float(g("cgst_rate") or 0), float(g("sgst_rate") or 0), float(g("igst_rate") or 0)
+        fx = float(g("fx_rate") or 1)
+    except (TypeError, ValueError):
+        rate, qty = _num(g("rate")), _num(g("qty"))
+        cgst, sgst, igst = _num(g("cgst_rate")), _num(g("sgst_rate")), _num(g("igst_rate"))
+        fx = _num(g("fx_rate")) or 1.0
+    cur = (g("cur") or "").strip().upper() or BASE_CURRENCY
+    return {
+        "row": row, "rate": rate, "qty": qty,
+        "cgst": cgst, "sgst": sgst, "igst": igst,
+        "gst": cgst + sgst + igst,      # slab halves (2.5, 9, 14 ...) add up exactly
+        "hsn": (g("hsn_sac") or "").strip(),
+        "cur": cur,
+        "foreign": cur != BASE_CURRENCY,
+        "fx": fx,
+    }
+
+
+def document_context(header, items, gstin=None, address=None, home=None):
+    """What the rules look at, worked out once per document."""
+    gstin = (gstin or "").strip().upper()
+    place = header.get("place_of_supply") or place_of_supply(address, gstin)
+    place = state_code(place) or (str(place) if place else None)
+    supply = header.get("supply_type") or INTRA
+    gstin_bad = gstin_error(gstin) if gstin else None
+    valid_place = place in STATE_CODES
+    return {
+        "items": items,
+        "date": header.get("date") or "",
+        "bill_to": (header.get("bill_to") or "").strip(),
+        "gstin": gstin,
+        "gstin_error": gstin_bad,
+        "gstin_state": gstin[:2] if gstin and not gstin_bad else None,
+        "address_state": state_code((address or {}).get("state_code")),
+        "place": place,
+        "supply": supply,
+        "expected": supply_type(place, home) if valid_place else None,
+        "zero_rated": place == FOREIGN_STATE_CODE,
+    }
+
+
+def validate_document(header, items, gstin=None, address=None, home=None):
+    """[Finding] for one document, header rules first, then rows in order."""
+    d = document_context(header, items, gstin, address, home or home_state_code())
+    findings = [
+        Finding(r.severity, r.code, None, r.field, r.message.format(**d))
+        for r in HEADER_RULES if r.test(d)
+    ]
+    # Only the rules that apply to this document run per line
+    tests = [(r.test, r) for r in LINE_RULES if r.when is None or r.when(d)]
+    for row, it in enumerate(items, start=1):
+        v = _line(row, it)
+        for test, r in tests:
+            if test(v, d):
+                findings.append(Finding(r.severity, r.code, row, r.field, r.message.format(**v)))
+    return findings
+
+
+def validate_batch(docs, home=None):
+    """[[Finding]] for (header, items, gstin, address) documents, in order."""
+    home = home or home_state_code()
+    return [validate_document(h, items, gstin, address, home) for h, items, gstin, address in docs]
+
+
+def errors(findings):
+    return [f for f in findings if f.severity == ERROR]
+
+
+def warnings(findings):
+    return [f for f in findings if f.severity == WARNING]
+
+
+def format_findings(findings):
+    return "\n".join(f"• {f.message}" for f in findings)
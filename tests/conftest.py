@@ -0,0 +1,45 @@
+# tests/conftest.py
+# Shared fixtures: src/ on sys.path and a fresh database per test
+#
+#   python -m pytest -q tests
+#
+# Tests never touch data.db; each one gets its own file under tmp_path,
+# in the journal mode database.py is configured for (WAL by default).
+
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Path of an empty, initialised database that database.py now uses."""
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    database.clear_cache()
+    database.init_db()
+    yield path
+    database.clear_cache()
+
+
+
+@pytest.fixture
+def generated_db(tmp_path, monkeypatch):
+    """Like db, filled by datagen at a small scale."""
+    from datagen import generate
+
+    path = str(tmp_path / "generated.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    database.clear_cache()
+    generate(path, scale=0.01, log=lambda *a: None)
+    # datagen writes with journal_mode=OFF; init_db puts the configured mode back
+    database.init_db()
+    yield path
+    database.clear_cache()
@@ -0,0 +1,50 @@
+# tests/test_backup.py
+# Online backup: saves keep their latency while a snapshot is copied
+
+import os
+import statistics
+import threading
+import time
+
+import database
+from backup import backup_now, verify_backup
+
+# Save latency bound while backup_now() runs (a save alone takes a few ms)
+MAX_P95_MS = 100.0
+MAX_MS = 1000.0
+
+
+def _save_until(stop, out, errors):
+    i = 0
+    while not stop.is_set():
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            database.insert_job({"job_no": f"SAN/JOB/BKP/{i}", "status": "OPEN"})
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        out.append((time.perf_counter() - t0) * 1000)
+        time.sleep(0.005)
+
+
+def test_write_latency_during_backup(generated_db, tmp_path):
+    dest = str(tmp_path / "backups")
+    during, errors = [], []
+    stop = threading.Event()
+    saver = threading.Thread(target=_save_until, args=(stop, during, errors))
+    saver.start()
+    try:
+        # Small steps so the copy spans many saves
+        manifest = backup_now(dest, pages=16)
+    finally:
+        stop.set()
+        saver.join()
+
+    assert errors == []
+    assert len(during) >= 10
+    p95 = statistics.quantiles(during, n=20)[-1]
+    assert p95 < MAX_P95_MS, f"p95 {p95:.1f} ms over {len(during)} saves"
+    assert max(during) < MAX_MS
+
+    res = verify_backup(os.path.join(dest, manifest["file"]))
+    assert res["ok"], res["problems"]
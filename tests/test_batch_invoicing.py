@@ -0,0 +1,27 @@
+# tests/test_batch_invoicing.py
+# Month-end billing: a failed PDF group is reported by job and fails the run
+
+import sys
+
+import batch_invoicing
+
+DATE = "2025-03-31"
+
+
+def test_pdf_errors_name_jobs_and_fail_the_run(generated_db, monkeypatch, capsys):
+    def broken(docs, compress=None, progress=None):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(batch_invoicing, "export_batch", broken)
+    report = batch_invoicing.run_batch(DATE, rebill=True, pdf=True)
+    assert report["saved"] > 0 and report["failed"] == []
+    errors = report["pdf"]["errors"]
+    # Every saved invoice's job is named under the group that failed
+    assert sum(len(job_nos) for job_nos, _ in errors) == report["saved"]
+    job_nos, err = errors[0]
+    assert all(job_nos) and err == "disk full"
+
+    # Every save succeeded, yet the run fails on the PDFs
+    monkeypatch.setattr(sys, "argv", ["batch_invoicing.py", "--date", DATE, "--rebill", "--pdf"])
+    assert batch_invoicing.main() == 1
+    assert f"{', '.join(job_nos)}: disk full" in capsys.readouterr().out
@@ -0,0 +1,56 @@
+# tests/test_charge_rates.py
+# Charge rate history: each invoice date gets the rates in force then
+
+import database
+import gst_rules
+from gst_rules import INTRA
+
+
+def _charge_id(name):
+    return next(c["id"] for c in database.list_charges() if c["charge_name"] == name)
+
+
+def _rates(row):
+    return row["cgst_rate"], row["sgst_rate"], row["igst_rate"]
+
+
+def test_rate_change_applies_from_its_effective_date(db):
+    database.add_charge("Ocean Freight", "996521", "INR", 9, 9)
+    cid = _charge_id("Ocean Freight")
+    database.update_charge(cid, "Ocean Freight", "996521", "INR", 2.5, 2.5, effective_from="2025-04-01")
+
+    assert _rates(database.get_charge_rate(cid, "2025-03-31")) == (9, 9, 18)
+    assert _rates(database.get_charge_rate(cid, "2025-04-01")) == (2.5, 2.5, 5)
+    # The master row carries the rates in force today
+    assert _rates(database.get_charge(cid)) == (2.5, 2.5, 5)
+
+
+def test_future_change_leaves_current_rates(db):
+    database.add_charge("THC", "996719", "INR", 9, 9)
+    cid = _charge_id("THC")
+    database.update_charge(cid, "THC", "996719", "INR", 14, 14, effective_from="2099-01-01")
+
+    assert _rates(database.get_charge(cid)) == (9, 9, 18)
+    assert _rates(database.get_charge_rate(cid, "2099-06-30")) == (14, 14, 28)
+
+    # Saving the rates already in force adds no history row
+    database.update_charge(cid, "THC", "996719", "INR", 9, 9, effective_from="2030-01-01")
+    assert len(database.list_charge_rates(cid)) == 2
+
+
+def test_rate_table_reprices_old_invoice_dates(db, monkeypatch):
+    monkeypatch.setattr(gst_rules, "_compiled", {"generation": None, "table": None})
+    database.add_charge("Ocean Freight", "996521", "INR", 9, 9)
+    cid = _charge_id("Ocean Freight")
+    database.update_charge(cid, "Ocean Freight", "996521", "INR", 2.5, 2.5, effective_from="2025-04-01")
+
+    table = gst_rules.rate_table()
+    assert table.lookup_charge("Ocean Freight", INTRA, "2025-03-31") == (9.0, 9.0, 0.0)
+    line = {"description": "Ocean Freight", "hsn_sac": "996521", "rate": 100.0, "qty": 1.0,
+            "cgst_rate": 2.5, "sgst_rate": 2.5}
+    gst_rules.reprice_line(line, INTRA, "2025-03-31", table)
+    assert (line["cgst_rate"], line["sgst_rate"], line["total_amt"]) == (9.0, 9.0, 118.0)
+
+    # A later change shows in the next compiled table
+    database.update_charge(cid, "Ocean Freight", "996521", "INR", 6, 6, effective_from="2025-10-01")
+    assert gst_rules.rate_table().lookup_charge("Ocean Freight", INTRA, "2025-10-01") == (6.0, 6.0, 0.0)
@@ -0,0 +1,64 @@
+# tests/test_client_mode.py
+# Client mode: compiled rate tables stay warm, own writes show at once
+
+import pytest
+
+import data_client
+import database
+import fx_rates
+from data_client import DataClient
+from data_service import start_in_thread
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """database.py in client mode against a service on db."""
+    service, port, stop = start_in_thread(token="test")
+    url = f"http://127.0.0.1:{port}"
+    c = DataClient(url, token="test")
+    calls = []
+    request = c._request
+
+    def counted(method, path, payload=None, retry=True):
+        calls.append(payload["op"] if payload else path)
+        return request(method, path, payload, retry)
+
+    monkeypatch.setattr(c, "_request", counted)
+    monkeypatch.setattr(database, "DATA_SERVICE_URL", url)
+    monkeypatch.setattr(database, "data_client", c, raising=False)
+    monkeypatch.setattr(fx_rates, "list_currency_rates", data_client.RemoteCall(c, "list_currency_rates"))
+    monkeypatch.setattr(fx_rates, "_compiled", {"generation": None, "book": None})
+    c.calls = calls
+    yield c
+    c.close()
+    stop()
+
+
+def test_rate_book_not_reloaded_per_call(client):
+    client.call("set_currency_rate", "USD", "2025-01-01", 83.0)
+    client.calls.clear()
+
+    book = fx_rates.rate_book()
+    for _ in range(50):
+        assert fx_rates.rate_book() is book
+    # One version fetch and one load, not two round trips per call
+    assert client.calls == ["table_versions", "list_currency_rates"]
+    assert book.rate("USD", "2025-06-30") == 83.0
+
+
+def test_own_write_refreshes_rate_book(client):
+    book = fx_rates.rate_book()
+    client.call("set_currency_rate", "USD", "2025-06-01", 84.5)
+
+    fresh = fx_rates.rate_book()
+    assert fresh is not book
+    assert fresh.rate("USD", "2025-06-30") == 84.5
+
+
+def test_other_desk_write_shows_after_ttl(client, monkeypatch):
+    book = fx_rates.rate_book()
+    database.set_currency_rate("EUR", "2025-01-01", 90.0)     # straight into the file
+    assert fx_rates.rate_book() is book
+
+    monkeypatch.setattr(data_client, "VERSIONS_TTL", 0.0)
+    assert fx_rates.rate_book().rate("EUR", "2025-03-01") == 90.0
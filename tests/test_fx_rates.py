@@ -0,0 +1,59 @@
+# tests/test_fx_rates.py
+# Foreign-currency lines: rate on the invoice date, then the job's rate
+
+import pytest
+
+import database
+import fx_rates
+from fx_rates import RateBook, convert_items, parse_rate
+
+ROWS = [
+    {"currency": "USD", "rate_date": "2025-01-01", "rate": 83.0},
+    {"currency": "USD", "rate_date": "2025-04-01", "rate": 85.0},
+    {"currency": "EUR", "rate_date": "2025-01-01", "rate": 90.0},
+]
+
+
+def test_rate_book_uses_the_rate_in_force_on_the_date():
+    book = RateBook(ROWS)
+    assert book.rate("USD", "2025-03-31") == 83.0
+    assert book.rate("usd", "2025-04-01") == 85.0
+    assert book.rate("USD") == 85.0                     # no date: latest
+    assert book.rate("USD", "2024-12-31") is None       # before the first rate
+    assert book.rate("GBP", "2025-04-01") is None
+    assert book.rate("INR") == book.rate("") == 1.0
+
+
+def test_parse_rate_reads_free_text():
+    assert parse_rate("83.25") == 83.25
+    assert parse_rate("1 USD = 83.25") == 83.25
+    assert parse_rate("USD 1,083.5") == 1083.5
+    assert parse_rate("n/a") is None
+
+
+def test_convert_items_fallback_order():
+    items = [
+        {"cur": "INR", "fx_rate": 5.0},
+        {"cur": "USD", "fx_rate": 84.0},                # typed: kept
+        {"cur": "USD"},                                 # book rate on the date
+        {"cur": "GBP"},                                 # job's rate
+    ]
+    assert convert_items(items, "2025-03-31", RateBook(ROWS), job_rate="1 GBP = 105") == set()
+    assert [it["fx_rate"] for it in items] == [1.0, 84.0, 83.0, 105.0]
+
+    # No book rate and no job rate: left at 1 and reported
+    items = [{"cur": "GBP"}, {"cur": "USD"}]
+    assert convert_items(items, "2024-06-30", RateBook(ROWS)) == {"GBP", "USD"}
+    assert [it["fx_rate"] for it in items] == [1.0, 1.0]
+
+
+def test_rate_book_follows_the_currency_rates_table(db, monkeypatch):
+    monkeypatch.setattr(fx_rates, "_compiled", {"generation": None, "book": None})
+    database.set_currency_rate("USD", "2025-01-01", 83.0)
+    book = fx_rates.rate_book()
+    assert fx_rates.rate_book() is book
+
+    database.set_currency_rate("USD", "2025-04-01", 85.0)
+    items = [{"cur": "USD", "rate": 10.0, "qty": 1.0}]
+    convert_items(items, "2025-04-30")
+    assert items[0]["fx_rate"] == pytest.approx(85.0)
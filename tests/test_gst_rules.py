@@ -0,0 +1,73 @@
+# tests/test_gst_rules.py
+# GST rules: CGST + SGST vs IGST by place of supply, rates by effective date
+
+import pytest
+
+import database
+from gst_rules import (
+    INTER, INTRA, RateTable, compute_line, line_rates, place_of_supply, supply_type,
+)
+
+
+def _line(**rates):
+    return {"description": "Ocean Freight", "hsn_sac": "996521", "rate": 1000.0, "qty": 2.0, **rates}
+
+
+def test_supply_type_follows_place_of_supply(db):
+    assert supply_type("27") == INTRA               # Maharashtra, ours by default
+    assert supply_type("29-Karnataka") == INTER
+    assert supply_type("96") == INTER               # abroad
+    assert supply_type(None) == INTRA               # unknown: treated as ours
+
+    database.set_setting("company_state_code", "29")
+    assert supply_type("29") == INTRA
+    assert supply_type("27") == INTER
+
+
+def test_place_of_supply_address_before_gstin():
+    assert place_of_supply({"state_code": "29"}, gstin="27AAPFU0939F1ZV") == "29"
+    assert place_of_supply({"state_code": "", "country": "USA"}) == "96"
+    assert place_of_supply({"state_code": "", "country": "India"}, gstin="33ABCDE1234F1Z5") == "33"
+    assert place_of_supply(None, gstin=None) is None
+
+
+def test_combined_rate_moves_between_cgst_sgst_and_igst():
+    inter = compute_line(_line(cgst_rate=9, sgst_rate=9), INTER)
+    assert (inter["cgst_rate"], inter["sgst_rate"], inter["igst_rate"]) == (0.0, 0.0, 18.0)
+    assert inter["igst_amt"] == pytest.approx(360.0)
+
+    intra = compute_line(_line(igst_rate=18), INTRA)
+    assert (intra["cgst_rate"], intra["sgst_rate"], intra["igst_rate"]) == (9.0, 9.0, 0.0)
+    assert intra["cgst_amt"] + intra["sgst_amt"] == pytest.approx(360.0)
+    assert intra["total_amt"] == inter["total_amt"] == pytest.approx(2360.0)
+
+
+def test_rate_table_switches_on_the_effective_date():
+    table = RateTable()
+    table.add("996521", "", 9, 9)
+    table.add("996521", "2025-04-01", 2.5, 2.5)
+
+    assert table.lookup("996521", INTRA, "2025-03-31") == (9.0, 9.0, 0.0)
+    assert table.lookup("996521", INTRA, "2025-04-01") == (2.5, 2.5, 0.0)
+    assert table.lookup("996521", INTER, "2025-04-01") == (0.0, 0.0, 5.0)
+    assert table.lookup("996521", INTRA) == (2.5, 2.5, 0.0)        # no date: latest
+    assert table.lookup("996719", INTRA, "2025-04-01") is None
+
+    # Nothing in force before the first dated row
+    dated = RateTable()
+    dated.add("996521", "2025-04-01", 9, 9)
+    assert dated.lookup("996521", INTRA, "2025-03-31") is None
+    # Same date again: the later row wins
+    dated.add("996521", "2025-04-01", 6, 6)
+    assert dated.lookup("996521", INTRA, "2025-04-01") == (6.0, 6.0, 0.0)
+
+
+def test_line_rates_typed_then_charge_then_hsn():
+    table = RateTable()
+    table.add("996521", "", 9, 9)
+    table.add("996719", "", 2.5, 2.5, charge_name="ocean freight")
+
+    assert line_rates(_line(cgst_rate=6, sgst_rate=6), INTRA, table) == (6.0, 6.0, 0.0)
+    assert line_rates(_line(), INTRA, table) == (2.5, 2.5, 0.0)            # by charge name
+    assert line_rates(_line(description="THC"), INTRA, table) == (9.0, 9.0, 0.0)
+    assert line_rates(_line(description="THC", hsn_sac="1234"), INTRA, table) == (0.0, 0.0, 0.0)
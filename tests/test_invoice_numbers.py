@@ -0,0 +1,91 @@
+# tests/test_invoice_numbers.py
+# One saved document per (type, invoice_number), enforced by the file
+
+import multiprocessing as mp
+import sqlite3
+
+import pytest
+
+import database
+import settings_manager
+
+ITEMS = [{
+    "sr_no": 1, "description": "Ocean Freight", "hsn_sac": "996521", "cur": "INR",
+    "rate": 1000.0, "qty": 1.0, "amount": 1000.0, "taxable_amount": 1000.0,
+    "cgst_rate": 9.0, "cgst_amt": 90.0, "sgst_rate": 9.0, "sgst_amt": 90.0, "total_amt": 1180.0,
+}]
+
+
+def _header(number, doc_type="INVOICE"):
+    return {"invoice_number": number, "date": "2025-03-31", "type": doc_type, "total_amount": 1180.0}
+
+
+def _count(path, number):
+    conn = sqlite3.connect(path)
+    n = conn.execute("SELECT COUNT(*) FROM invoices WHERE invoice_number=?", (number,)).fetchone()[0]
+    conn.close()
+    return n
+
+
+def test_second_desk_saving_a_taken_number_is_rejected(db):
+    # Both forms hold the same number; the first save wins
+    first, stats = database.save_invoice(_header("SAN/INV/1"), ITEMS)
+    assert stats["inserted"] == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        database.save_invoice(_header("SAN/INV/1"), [dict(ITEMS[0], rate=2000.0)])
+    with pytest.raises(sqlite3.IntegrityError):
+        database.insert_invoice(_header("SAN/INV/1"), ITEMS)
+    header, items = database.get_document(first)
+    assert items[0]["rate"] == 1000.0
+    assert _count(db, "SAN/INV/1") == 1
+
+    # Only the form that loaded (or saved) the document updates it
+    invoice_id, stats = database.save_invoice(header, [dict(items[0], rate=2000.0)])
+    assert invoice_id == first and stats["updated"] == 1
+
+
+def test_invoice_and_debit_note_share_a_number(db):
+    invoice, _ = database.save_invoice(_header("SAN/INV/9"), ITEMS)
+    debit, _ = database.save_invoice(_header("SAN/INV/9", "DEBIT_NOTE"), ITEMS)
+    assert invoice != debit
+
+    assert database.get_document(invoice_number="SAN/INV/9", doc_type="INVOICE")[0]["id"] == invoice
+    assert database.get_document(invoice_number="SAN/INV/9", doc_type="DEBIT_NOTE")[0]["id"] == debit
+
+
+def test_existing_duplicates_keep_latest_copy_unique(db):
+    conn = sqlite3.connect(db)
+    conn.execute("DROP INDEX idx_invoices_type_number")
+    conn.executemany("INSERT INTO invoices (invoice_number, type) VALUES (?, 'INVOICE')",
+                     [("SAN/INV/7",), ("SAN/INV/7",)])
+    conn.commit()
+    conn.close()
+
+    database.init_db()
+
+    latest, _ = database.get_document(invoice_number="SAN/INV/7", doc_type="INVOICE")
+    invoice_id, _ = database.save_invoice(latest, ITEMS)
+    assert invoice_id == latest["id"]
+    assert _count(db, "SAN/INV/7") == 2
+    with pytest.raises(sqlite3.IntegrityError):
+        database.insert_invoice(_header("SAN/INV/7"), ITEMS)
+
+
+def _draw(db_path, n, out):
+    database.DB_PATH = db_path
+    out.put([settings_manager.get_next_invoice_number() for _ in range(n)])
+
+
+def test_processes_never_draw_the_same_number(db):
+    # Outside any write group, as the form takes its number
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_draw, args=(db, 25, out)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    numbers = [n for _ in procs for n in out.get(timeout=120)]
+    for p in procs:
+        p.join(timeout=30)
+
+    assert len(numbers) == 75
+    assert len(set(numbers)) == 75
@@ -0,0 +1,76 @@
+# tests/test_maintenance.py
+# Idle maintenance: free-page reclaim and whole-file idle detection
+
+import sqlite3
+
+import maintenance
+
+
+def _churn(path, rows=2000):
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO jobs (job_no, status, shipper) VALUES (?, 'OPEN', ?)",
+                     [(f"SAN/JOB/CHURN/{i}", "x" * 500) for i in range(rows)])
+    conn.commit()
+    conn.execute("DELETE FROM jobs WHERE job_no LIKE 'SAN/JOB/CHURN/%'")
+    conn.commit()
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.close()
+    return free
+
+
+def test_incremental_vacuum_counts_pages_released(db):
+    free = _churn(db)
+    assert free > 0
+    conn = maintenance._connect()
+    try:
+        released = maintenance.incremental_vacuum(conn, pages=50, sleep=0)
+        left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+    assert left == 0
+    assert released == free
+
+
+def test_incremental_vacuum_noop_without_incremental_mode(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(maintenance, "LOG_PATH", str(tmp_path / "maintenance.log"))
+    conn = sqlite3.connect(db, isolation_level=None)
+    conn.execute("PRAGMA auto_vacuum=NONE")
+    conn.execute("VACUUM")
+    conn.close()
+    free = _churn(db)
+    assert free > 0
+
+    conn = maintenance._connect()
+    try:
+        assert maintenance.incremental_vacuum(conn, sleep=0) == 0
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == free
+    finally:
+        conn.close()
+
+    # The idle pass never converts; that is the explicit CLI step
+    rec = maintenance.run_maintenance()
+    assert rec["after"]["auto_vacuum"] == 0
+    assert rec["steps"]["needs_convert"]
+    assert maintenance.run_convert()["after"]["auto_vacuum"] == 2
+
+
+def test_scheduler_idle_follows_commits_from_any_connection(db, monkeypatch):
+    sched = maintenance.MaintenanceScheduler(idle_seconds=60)
+    clock = [1000.0]
+    monkeypatch.setattr(maintenance.time, "time", lambda: clock[0])
+    sched.last_activity = clock[0]
+    assert not sched.is_idle()
+
+    clock[0] += 61
+    assert sched.is_idle()
+
+    # A save on another connection (another desk, queue off) is activity
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO jobs (job_no, status) VALUES ('SAN/JOB/OTHER', 'OPEN')")
+    conn.commit()
+    conn.close()
+    assert not sched.is_idle()
+
+    clock[0] += 61
+    assert sched.is_idle()
+    sched.watch.close()
@@ -0,0 +1,30 @@
+# tests/test_pdf_timing.py
+# PDF timing hooks: a failing callback is logged, the PDF still written
+
+import logging
+import os
+
+import pdf_generator
+
+ITEMS = [{
+    "sr_no": 1, "description": "Ocean Freight", "hsn_sac": "996521", "cur": "INR",
+    "rate": 1000.0, "qty": 1.0, "amount": 1000.0, "taxable_amount": 1000.0,
+    "cgst_rate": 9.0, "cgst_amt": 90.0, "sgst_rate": 9.0, "sgst_amt": 90.0, "total_amt": 1180.0,
+}]
+
+
+def test_failing_callback_does_not_abort_generation(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(pdf_generator, "OUT_DIR", str(tmp_path))
+    monkeypatch.setitem(pdf_generator._timing, "log_path", None)
+    records = []
+
+    def broken(record):
+        raise KeyError("phases")
+
+    monkeypatch.setitem(pdf_generator._timing, "callbacks", [broken, records.append])
+    with caplog.at_level(logging.ERROR, logger="sanship"):
+        path = pdf_generator.generate_invoice_pdf({"invoice_number": "SAN/INV/1", "date": "2025-03-31"}, ITEMS)
+
+    assert os.path.getsize(path) > 0
+    assert [r["invoice_number"] for r in records] == ["SAN/INV/1"]
+    assert "PDF timing callback" in caplog.text
@@ -0,0 +1,21 @@
+# tests/test_query_trace.py
+# Query tracing: a long-lived traced connection doesn't hoard cursors
+
+import database
+
+
+def test_traced_connection_drops_finished_cursors(db, tmp_path, monkeypatch):
+    monkeypatch.setitem(database._trace, "enabled", True)
+    monkeypatch.setitem(database._trace, "log_path", str(tmp_path / "slow.log"))
+    monkeypatch.setattr(database, "_query_stats", {})
+
+    conn = database.get_conn()
+    for _ in range(1000):
+        conn.execute("SELECT key FROM settings").fetchall()
+    assert len(conn._cursors) < 10
+    # Left with rows unread: still counted once dropped
+    conn.execute("SELECT key FROM settings").fetchone()
+    conn.close()
+
+    stats = {q["sql"]: q["calls"] for q in database.query_stats()}
+    assert stats["SELECT key FROM settings"] == 1001
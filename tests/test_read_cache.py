@@ -0,0 +1,33 @@
+# tests/test_read_cache.py
+# Read cache: never serves rows a rolled-back write group left behind
+
+import pytest
+
+import database
+
+
+def test_rolled_back_group_leaves_no_cached_rows(db):
+    database.add_consignee("APEX")
+    assert [c["name"] for c in database.list_consignees()] == ["APEX"]
+
+    with pytest.raises(RuntimeError):
+        with database.write_group() as step:
+            step(database.add_consignee, "GHOST")
+            # Inside the group the uncommitted row is visible...
+            assert "GHOST" in [c["name"] for c in database.list_consignees()]
+            raise RuntimeError("save cancelled")
+
+    # ...and gone once the group rolled back
+    assert [c["name"] for c in database.list_consignees()] == ["APEX"]
+    assert [c["name"] for c in database.list_consignees_with_address_labels()] == ["APEX"]
+
+
+def test_search_calls_not_cached(db):
+    database.add_consignee("APEX LOGISTICS")
+    database.list_consignees()
+    entries = database.cache_stats()["entries"]
+
+    for q in ("APEX", "LOG", "X"):
+        assert [c["name"] for c in database.list_consignees(q)] == ["APEX LOGISTICS"]
+        database.list_consignees_with_address_labels(search=q)
+    assert database.cache_stats()["entries"] == entries
@@ -0,0 +1,70 @@
+# tests/test_validation.py
+# Document validation: header and line rules, GSTIN check character
+
+from gst_rules import INTER, INTRA, gstin_check_char, gstin_error
+from validation import ERROR, WARNING, errors, validate_batch, validate_document, warnings
+
+GSTIN = "27AAPFU0939F1ZV"
+
+
+def _item(**kw):
+    return {"description": "Ocean Freight", "hsn_sac": "996521", "cur": "INR",
+            "rate": 1000.0, "qty": 1.0, "cgst_rate": 9.0, "sgst_rate": 9.0, "igst_rate": 0.0, **kw}
+
+
+def _header(**kw):
+    return {"date": "2025-03-31", "bill_to": "APEX\nMumbai", "place_of_supply": "27",
+            "supply_type": INTRA, **kw}
+
+
+def _codes(findings):
+    return {f.code for f in findings}
+
+
+def test_gstin_check_character():
+    assert gstin_error(GSTIN) is None
+    assert gstin_check_char(GSTIN[:14]) == GSTIN[14]
+    assert gstin_error(GSTIN[:14] + "A") == "checksum"
+    assert gstin_error("00" + GSTIN[2:]) == "state"
+    assert gstin_error(GSTIN[:14]) == "format"
+    assert gstin_error(GSTIN.lower()) is None
+
+
+def test_clean_document_has_no_findings(db):
+    assert validate_document(_header(), [_item()], gstin=GSTIN) == []
+
+
+def test_header_rules(db):
+    findings = validate_document(_header(date="31/03/2025", bill_to=""), [], gstin=GSTIN[:14] + "A")
+    assert _codes(errors(findings)) == {"no_items", "date", "gstin_checksum"}
+    assert _codes(warnings(findings)) == {"bill_to"}
+
+    # Another state's place of supply needs IGST, and the GSTIN's state is noted
+    findings = validate_document(_header(place_of_supply="29"), [_item()], gstin=GSTIN,
+                                 address={"state_code": "29"})
+    assert "supply_type" in _codes(errors(findings))
+    assert "gstin_address" in _codes(warnings(findings))
+
+
+def test_line_rules_follow_supply_type(db):
+    inter = _header(place_of_supply="29", supply_type=INTER)
+    findings = validate_document(inter, [_item(), _item(cgst_rate=0, sgst_rate=0, igst_rate=18)])
+    assert [(f.code, f.row) for f in findings] == [("cgst_inter", 1)]
+
+    findings = validate_document(_header(), [_item(cgst_rate=9, sgst_rate=5), _item(rate=0, hsn_sac="")])
+    assert {(f.code, f.row) for f in findings} == {
+        ("gst_split", 1), ("gst_slab", 1), ("rate_qty_zero", 2), ("hsn_missing", 2)}
+    assert all(f.severity == (WARNING if f.code in ("gst_slab", "hsn_missing") else ERROR) for f in findings)
+
+
+def test_fx_missing_only_for_unconverted_foreign_lines(db):
+    findings = validate_document(_header(), [_item(cur="USD", fx_rate=1.0), _item(cur="USD", fx_rate=83.0),
+                                             _item(cur="INR", fx_rate=1.0)])
+    assert [(f.code, f.row) for f in findings] == [("fx_missing", 1)]
+    assert findings[0].message == "Row 1: no exchange rate for USD"
+
+
+def test_validate_batch_matches_per_document(db):
+    docs = [(_header(), [_item()], GSTIN, None), (_header(date=""), [_item(qty=0)], None, None)]
+    assert validate_batch(docs) == [validate_document(h, items, g, a) for h, items, g, a in docs]
+    assert _codes(validate_batch(docs)[1]) == {"date", "rate_qty_zero"}
@@ -0,0 +1,85 @@
+# tests/test_write_queue.py
+# Several app processes saving into one file: every save lands once
+
+import multiprocessing as mp
+import sqlite3
+import threading
+
+import database
+import settings_manager
+
+PROCS = 3
+THREADS = 3
+SAVES = 12          # per thread
+
+ITEMS = [{
+    "sr_no": 1, "description": "Ocean Freight", "hsn_sac": "996521", "cur": "INR",
+    "rate": 1000.0, "qty": 1.0, "amount": 1000.0, "taxable_amount": 1000.0,
+    "cgst_rate": 9.0, "cgst_amt": 90.0, "sgst_rate": 9.0, "sgst_amt": 90.0, "total_amt": 1180.0,
+}]
+
+
+def _numbered_save(header, items):
+    # As batch invoicing saves: number and invoice in one transaction
+    header["invoice_number"] = settings_manager.get_next_invoice_number()
+    database.insert_invoice(header, items)
+    return header["invoice_number"]
+
+
+def _worker(db_path, proc, out):
+    database.DB_PATH = db_path
+    numbers, jobs, errors = [], [], []
+    lock = threading.Lock()
+
+    def desk(t):
+        for i in range(SAVES):
+            try:
+                if i % 2:
+                    job_no = f"SAN/JOB/MP/{proc}/{t}/{i}"
+                    database.insert_job({"job_no": job_no, "status": "OPEN"})
+                    with lock:
+                        jobs.append(job_no)
+                else:
+                    header = {"date": "2025-03-31", "type": "INVOICE", "total_amount": 1180.0}
+                    [(ok, value)] = database.run_write_group([(_numbered_save, (header, ITEMS), {})])
+                    if not ok:
+                        raise value
+                    with lock:
+                        numbers.append(value)
+            except sqlite3.Error as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=desk, args=(t,)) for t in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out.put({"numbers": numbers, "jobs": jobs, "errors": errors})
+
+
+def test_multiprocess_saves_land_exactly_once(db):
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(db, n, out)) for n in range(PROCS)]
+    for p in procs:
+        p.start()
+    results = [out.get(timeout=120) for _ in procs]
+    for p in procs:
+        p.join(timeout=30)
+
+    numbers = [n for r in results for n in r["numbers"]]
+    jobs = [j for r in results for j in r["jobs"]]
+    assert [e for r in results for e in r["errors"]] == []
+    assert len(numbers) + len(jobs) == PROCS * THREADS * SAVES
+
+    conn = sqlite3.connect(db)
+    saved_numbers = [r[0] for r in conn.execute("SELECT invoice_number FROM invoices")]
+    saved_jobs = [r[0] for r in conn.execute("SELECT job_no FROM jobs")]
+    conn.close()
+
+    # Each reported save is in the file once, and no number was handed out twice
+    assert sorted(saved_numbers) == sorted(numbers)
+    assert sorted(saved_jobs) == sorted(jobs)
+    assert len(set(numbers)) == len(numbers)
+    assert len(set(jobs)) == len(jobs)